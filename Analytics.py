@@ -0,0 +1,158 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import Metrics as metrics
+
+
+# transform -> default window
+TRANSFORMS = {
+    'rolling_mean': 20,
+    'rolling_std': 20,
+    'volatility': 20,
+    'yoy': None,
+    'mom': None,
+    'diff': 1,
+    'resample': 'M',
+    'zscore': None,
+}
+
+RESAMPLE_RULES = {'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'A'}
+
+
+def _fingerprints(df) -> dict:
+    """
+    Identifies the content of each column, so a refreshed series never hits the results of an older version.
+    """
+    index_digest = hashlib.blake2b(df.index.asi8.tobytes(), digest_size=16).hexdigest()
+    values = np.ascontiguousarray(df.to_numpy(dtype='float64').T)
+
+    return {column: (index_digest, hashlib.blake2b(values[i].tobytes(), digest_size=16).hexdigest()) for i, column in enumerate(df.columns)}
+
+
+def _observations_per_year(index) -> float:
+    span = (index[-1] - index[0]).days / 365.25 if len(index) > 1 else 0
+    return (len(index) - 1) / span if span > 0 else 1.0
+
+
+def _change_since(df, offset) -> pd.DataFrame:
+    """
+    Percentage change against the last observation at or before `offset` earlier, for every column at once.
+    Works on any frequency: monthly data compares with the same month, daily data with the last business day.
+    """
+    prior = df.reindex(df.index - offset, method='pad')
+    return pd.DataFrame((df.to_numpy() / prior.to_numpy() - 1) * 100, index=df.index, columns=df.columns)
+
+
+class AnalyticsClass():
+    """
+    Derived metrics on the frames returned by the clients (DatetimeIndex, one column per series). Each transform
+    runs on all requested columns in one vectorized pandas/NumPy operation. Results are memoized per
+    (series content, transform, window), so repeated queries only compute the series that changed:
+
+        analytics = AnalyticsClass()
+        analytics.transform(fx_df, 'volatility', window=60)
+        analytics.transform(fx_df, 'resample', window='M', how='mean')
+
+    Transforms (`window` default in TRANSFORMS):
+    - rolling_mean, rolling_std: over `window` observations
+    - volatility: rolling standard deviation of the changes over `window` observations, annualized
+    - yoy, mom: percentage change against one year / one month earlier
+    - diff: change against `window` observations earlier
+    - resample: frequency conversion to W, M, Q or Y (`how`: last, mean, first, min, max)
+    - zscore: deviation from the mean in standard deviations, over the whole series or a rolling `window`
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.memo = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def transform(self, df, transform, window=None, how='last') -> pd.DataFrame:
+
+        if transform not in TRANSFORMS:
+            raise Exception(f"Invalid transform: {transform}. Valid values are: {list(TRANSFORMS)}")
+
+        window = TRANSFORMS[transform] if window is None else window
+        if transform == 'resample' and window not in RESAMPLE_RULES:
+            raise Exception(f"Invalid resample frequency: {window}. Valid values are: {list(RESAMPLE_RULES)}")
+
+        options = (transform, window, how if transform == 'resample' else None)
+        keys = {column: (column,) + fingerprint + options for column, fingerprint in _fingerprints(df).items()}
+        # The assembled frame is memoized as well, so a repeated query skips the concatenation
+        frame_key = tuple(keys.values())
+
+        with self.lock:
+            if frame_key in self.memo:
+                self.memo.move_to_end(frame_key)
+                metrics.count('analytics_memo_hits', len(keys))
+                return self.memo[frame_key].copy()
+
+            results = {column: self.memo[key] for column, key in keys.items() if key in self.memo}
+            for key in keys.values():
+                if key in self.memo:
+                    self.memo.move_to_end(key)
+
+        missing = [column for column in df.columns if column not in results]
+        metrics.count('analytics_memo_hits', len(results))
+
+        if missing:
+            with metrics.stage('transform'):
+                computed = getattr(self, f'_{transform}')(df[missing], window, how)
+
+            with self.lock:
+                for column in missing:
+                    results[column] = self.memo[keys[column]] = computed[column]
+
+        frame = pd.concat([results[column] for column in df.columns], axis=1) if len(df.columns) else pd.DataFrame(index=df.index)
+
+        with self.lock:
+            self.memo[frame_key] = frame
+            while len(self.memo) > self.max_entries:
+                self.memo.popitem(last=False)
+
+        return frame.copy()
+
+
+    def _rolling_mean(self, df, window, how):
+        return df.rolling(window, min_periods=window).mean()
+
+
+    def _rolling_std(self, df, window, how):
+        return df.rolling(window, min_periods=window).std()
+
+
+    def _volatility(self, df, window, how):
+        return df.diff().rolling(window, min_periods=window).std() * np.sqrt(_observations_per_year(df.index))
+
+
+    def _yoy(self, df, window, how):
+        return _change_since(df, pd.DateOffset(years=1))
+
+
+    def _mom(self, df, window, how):
+        return _change_since(df, pd.DateOffset(months=1))
+
+
+    def _diff(self, df, window, how):
+        return df.diff(window)
+
+
+    def _resample(self, df, window, how):
+        return df.resample(RESAMPLE_RULES[window]).agg(how)
+
+
+    def _zscore(self, df, window, how):
+
+        if window is None:
+            values = df.to_numpy()
+            mean = np.nanmean(values, axis=0)
+            std = np.nanstd(values, axis=0, ddof=1)
+            return pd.DataFrame((values - mean) / std, index=df.index, columns=df.columns)
+
+        rolling = df.rolling(window, min_periods=window)
+        return (df - rolling.mean()) / rolling.std()
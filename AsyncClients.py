@@ -0,0 +1,393 @@
+import asyncio
+import inspect
+import time
+import traceback
+from contextlib import AsyncExitStack
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+from tenacity import AsyncRetrying, retry_if_exception_type, retry_if_result, stop_after_attempt, wait_random_exponential
+
+import Metrics as metrics
+from BatchRunner import DATASETS, _call
+from BBKClient import BBKClientClass
+from ECBClient import ECBClientClass
+from Replay import _response
+from SDMXStream import CSV_ACCEPT, XML_ONLY_SOURCES, prepare
+from SeriesCache import SeriesCacheClass, key_to_str, period_start, period_end
+from Transport import RETRY_STATUS, TransportClass
+from helperFunctions import log_stats_async
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _require_aiohttp():
+    if aiohttp is None:
+        raise ImportError("The async clients require aiohttp: pip install aiohttp")
+
+
+# load_*/get_* method -> method listing its upstream series
+SERIES_METHODS = {
+    method: series_method
+    for _, series_method, load_method, _ in DATASETS.values()
+    for method in (load_method, load_method.replace('load_', 'get_'))
+}
+
+
+class AsyncTransportClass():
+    """
+    aiohttp counterpart of TransportClass: one connection pool, at most `per_host` requests in flight per
+    upstream host (bounded semaphore), a default timeout and the same jittered retries on connection errors,
+    timeouts and RETRY_STATUS, honouring Retry-After. Answers are returned as requests.Response objects, so
+    the parsing and caching code is shared with the synchronous clients.
+    """
+
+    def __init__(self, per_host=16, retries=4, backoff=0.5, max_backoff=30.0, timeout=60):
+        _require_aiohttp()
+
+        self.per_host = per_host
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.jitter = wait_random_exponential(multiplier=backoff, max=max_backoff)
+        self.semaphores = {}
+        self.session = None
+
+        self.retrying = AsyncRetrying(
+            retry=retry_if_exception_type((aiohttp.ClientError, asyncio.TimeoutError))
+                | retry_if_result(lambda response: response.status_code in RETRY_STATUS),
+            stop=stop_after_attempt(retries + 1),
+            wait=self._wait,
+            before_sleep=lambda retry_state: metrics.count('retries'),
+            retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+        )
+
+    # Same backoff and Retry-After handling as the synchronous transport
+    _wait = TransportClass._wait
+
+
+    async def send(self, request) -> requests.Response:
+        return await self.retrying.copy()(self._send_once, request)
+
+
+    async def _send_once(self, request) -> requests.Response:
+
+        host = urlsplit(request.url).netloc
+        semaphore = self.semaphores.setdefault(host, asyncio.BoundedSemaphore(self.per_host))
+
+        async with semaphore:
+            async with self._session().request(request.method, request.url, headers=dict(request.headers), data=request.body) as answer:
+                body = await answer.read()
+
+        # Unread body, like a streamed response of the synchronous transport
+        return _response(request, answer.status, dict(answer.headers), body, stream=True)
+
+
+    def _session(self):
+
+        if self.session is None:
+            # Created on first use, inside the running event loop; the semaphores limit the connections per host
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0),
+                timeout=aiohttp.ClientTimeout(sock_connect=10, sock_read=self.timeout),
+            )
+
+        return self.session
+
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class AsyncSeriesCacheClass(SeriesCacheClass):
+    """
+    SeriesCacheClass with coroutine counterparts of get and get_last. The cache logic is shared: the same
+    *_steps generators run here with their HTTP requests sent through an AsyncTransportClass. Concurrent
+    identical calls on the event loop share one download, queued periods of a key are downloaded as their union.
+    """
+
+    def __init__(self, folder_name="output", max_age=3600, transport=None, engine=None):
+        super().__init__(folder_name, max_age, engine)
+        self.transport = transport
+        self.async_flights = {}
+        self.async_key_locks = {}
+        # get_last answers of the event loop, read back by the synchronous methods (see get_last)
+        self.last_frames = {}
+
+
+    async def get_async(self, client, flow, key, startPeriod, endPeriod):
+
+        source = client.source.id
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+
+        return await self._coalesce((source, flow, key_to_str(key), start, end), self._get_async(client, flow, key, start, end))
+
+
+    async def download_async(self, client, flow, key, startPeriod, endPeriod, members=None):
+
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+
+        await self._sync_async(client, flow, key, start, end, members and {key_to_str(member): select for member, select in members.items()})
+
+
+    async def get_last_async(self, client, flow, key, lastNObservations, members=None):
+
+        identity = (client.source.id, flow, key_to_str(key), lastNObservations)
+
+        frame = await self._coalesce(identity, self._run_async(client, self._get_last_steps(client, flow, key, lastNObservations, members)))
+        self.last_frames[identity] = (time.monotonic(), frame)
+
+        return frame
+
+
+    def get_last(self, client, flow, key, lastNObservations, *args, **kwargs) -> pd.DataFrame:
+
+        # Latest observations are not covered by the period cache; reuse a recent answer of get_last_async
+        recent = self.last_frames.get((client.source.id, flow, key_to_str(key), lastNObservations))
+
+        if recent is not None and time.monotonic() - recent[0] < self.max_age:
+            return recent[1].copy()
+
+        # Further arguments (e.g. the members of a merged request) are passed through unchanged
+        return super().get_last(client, flow, key, lastNObservations, *args, **kwargs)
+
+
+    async def _coalesce(self, identity, coroutine):
+
+        flight = self.async_flights.get(identity)
+
+        if flight is not None:
+            coroutine.close()
+            metrics.count('coalesced')
+            # Callers relabel and extend their frames, so each gets its own copy
+            return (await asyncio.shield(flight)).copy()
+
+        flight = self.async_flights[identity] = asyncio.ensure_future(coroutine)
+        flight.add_done_callback(lambda _: self.async_flights.pop(identity, None))
+
+        return await asyncio.shield(flight)
+
+
+    async def _get_async(self, client, flow, key, start, end):
+
+        await self._sync_async(client, flow, key, start, end)
+
+        with metrics.stage('cache_read'):
+            return self._load(client.source.id, flow, key_to_str(key), start, end)
+
+
+    async def _sync_async(self, client, flow, key, start, end, members=None):
+
+        identity = (client.source.id, flow, key_to_str(key))
+        demand = [start, end]
+
+        key_lock = self._queue_demand(identity, demand, self.async_key_locks, asyncio.Lock)
+
+        async with key_lock, AsyncExitStack() as member_locks:
+
+            pending = self._take_demands(identity, demand)
+            if pending is None:
+                return
+
+            for member_lock in self._member_locks(identity, members, self.async_key_locks, asyncio.Lock):
+                await member_locks.enter_async_context(member_lock)
+
+            try:
+                await self._run_async(client, self._download_missing_steps(client, flow, key, min(other[0] for other in pending), max(other[1] for other in pending), members))
+            except Exception:
+                self._requeue_demands(identity, demand, pending)
+                raise
+
+
+    async def _run_async(self, client, steps):
+        """
+        Drives a *_steps generator like SeriesCacheClass._run, awaiting its I/O instead of blocking on it.
+        """
+        try:
+            request = next(steps)
+
+            while True:
+                kind, *args = request
+
+                if kind == 'send':
+                    with metrics.stage('fetch'):
+                        result = await self._send_async(client, *args)
+                elif kind == 'batch':
+                    result = list(await asyncio.gather(*(self.get_async(client, *read[1:]) for read in args[0])))
+                else:
+                    result = await self.get_async(client, *args)
+
+                request = steps.send(result)
+
+        except StopIteration as stop:
+            return stop.value
+
+
+    async def _send_async(self, client, flow, key, params, headers=None):
+        """
+        Counterpart of SDMXStream.send on the AsyncTransportClass.
+        """
+        if isinstance(key, dict):
+            # Dict keys are validated against the DSD, which sdmx downloads once per client; keep that off the loop
+            request = await asyncio.to_thread(prepare, client, flow, key, params, headers)
+        else:
+            request = prepare(client, flow, key, params, headers)
+
+        response = await self.transport.send(request)
+
+        if request.headers['Accept'] == CSV_ACCEPT and response.status_code == 406:
+            XML_ONLY_SOURCES.add(client.source.id)
+            return await self._send_async(client, flow, key, params, headers)
+
+        return response
+
+
+class AsyncClientClass():
+    """
+    Awaitable counterparts of the load_*/get_* methods of a synchronous client, returning the same frames.
+    All upstream series of a call are downloaded into the series cache on the event loop (AsyncTransportClass,
+    bounded per host), then the synchronous method builds the result from the cache in a worker thread, where
+    it no longer waits for the network. Many calls can run at once with asyncio.gather. Always headless:
+    get_* write the outputs of `save` and never prompt.
+    """
+
+    client_class = None
+
+    def __init__(self, transport=None, session=None, per_host=16):
+        self.transport = transport or AsyncTransportClass(per_host)
+        # `session` serves sdmx metadata queries (DSD lookups for dict keys), see TransportClass
+        self.client = self.client_class(session=session, headless=True)
+        self.cache = self.client.cache = AsyncSeriesCacheClass(self.client.folder_name, transport=self.transport, engine=self.client.engine)
+
+
+    async def _run(self, name, *args, **kwargs):
+
+        method = getattr(self.client, name)
+
+        arguments = inspect.signature(method).bind(*args, **kwargs)
+        arguments.apply_defaults()
+        options = arguments.arguments
+
+        try:
+            series = _call(getattr(self.client, SERIES_METHODS[name]), **options)
+        except Exception:
+            # Invalid options: the synchronous method reports them in its usual way
+            series = []
+
+        try:
+            await self._prefetch(series, options)
+        except Exception as e:
+            if not name.startswith('get_'):
+                raise
+
+            # get_* report errors as a message, like the synchronous clients
+            error_msg = f"Unexpected Error: {e}\nTraceback: {traceback.format_exc()}"
+            print(error_msg)
+
+            return error_msg
+
+        return await asyncio.to_thread(method, *args, **kwargs)
+
+
+    async def _prefetch(self, series, options):
+
+        client = self.client.ecb
+        registry = self.client.registry
+        last = options.get('lastNObservations')
+
+        if last:
+            await asyncio.gather(*(self.cache.get_last_async(client, request['flow'], request['key'], last, registry.members(request)) for request in registry.plan(series)))
+            return
+
+        start, end = options['startPeriod'], options['endPeriod']
+
+        await asyncio.gather(*(
+            self.cache.download_async(client, request['flow'], request['key'], start, end, registry.members(request))
+            for request in registry.plan_missing(self.cache, client, series, start, end)
+        ))
+
+
+    async def close(self):
+        await self.transport.close()
+
+
+    async def __aenter__(self):
+        return self
+
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+class AsyncECBClientClass(AsyncClientClass):
+    """
+    Async ECBClientClass, e.g.
+
+        async with AsyncECBClientClass() as ecb:
+            frames = await asyncio.gather(*(ecb.load_exchange_rate_data(ccy, '2010-01', '2023-12') for ccy in currencies))
+    """
+
+    client_class = ECBClientClass
+
+    @log_stats_async
+    async def load_inflation_data(self, startPeriod="1980-01", endPeriod="2099-12"):
+        return await self._run('load_inflation_data', startPeriod, endPeriod)
+
+    @log_stats_async
+    async def get_inflation_data(self, startPeriod="1980-01", endPeriod="2099-12", save=None):
+        return await self._run('get_inflation_data', startPeriod, endPeriod, save=save)
+
+    @log_stats_async
+    async def load_yield_data(self, spread=False, startPeriod="1980-01", endPeriod="2099-12", short_term="2Y", long_term="10Y"):
+        return await self._run('load_yield_data', spread, startPeriod, endPeriod, short_term, long_term)
+
+    @log_stats_async
+    async def get_yield_data(self, spread=False, startPeriod="1980-01", endPeriod="2099-12", short_term="2Y", long_term="10Y", save=None):
+        return await self._run('get_yield_data', spread, startPeriod, endPeriod, short_term, long_term, save=save)
+
+    @log_stats_async
+    async def load_term_structure(self, startPeriod="1980-01", endPeriod="2099-12", tenors=None, spreads=None):
+        return await self._run('load_term_structure', startPeriod, endPeriod, tenors, spreads)
+
+    @log_stats_async
+    async def get_term_structure(self, startPeriod="1980-01", endPeriod="2099-12", tenors=None, spreads=None, save=None):
+        return await self._run('get_term_structure', startPeriod, endPeriod, tenors, spreads, save=save)
+
+    @log_stats_async
+    async def load_exchange_rate_data(self, fx='USD', startPeriod="2001-01", endPeriod="2023-12"):
+        return await self._run('load_exchange_rate_data', fx, startPeriod, endPeriod)
+
+    @log_stats_async
+    async def get_exchange_rate_data(self, fx='USD', startPeriod="2001-01", endPeriod="2023-12", save=None):
+        return await self._run('get_exchange_rate_data', fx, startPeriod, endPeriod, save=save)
+
+
+class AsyncBBKClientClass(AsyncClientClass):
+    """
+    Async BBKClientClass.
+    """
+
+    client_class = BBKClientClass
+
+    @log_stats_async
+    async def load_euribor_data(self, startPeriod="1980-01-01", endPeriod="2099-12-31", short_term='3M', long_term=None, spread=None, lastNObservations=None):
+        return await self._run('load_euribor_data', startPeriod, endPeriod, short_term, long_term, spread, lastNObservations)
+
+    @log_stats_async
+    async def get_euribor_data(self, startPeriod="1980-01-01", endPeriod="2099-12-31", short_term='3M', long_term=None, spread=None, lastNObservations=None, save=None):
+        return await self._run('get_euribor_data', startPeriod, endPeriod, short_term, long_term, spread, lastNObservations, save=save)
+
+    @log_stats_async
+    async def load_eonia_data(self, startPeriod="2021-01-01", endPeriod="2022-12-31"):
+        return await self._run('load_eonia_data', startPeriod, endPeriod)
+
+    @log_stats_async
+    async def get_eonia_data(self, startPeriod="2021-01-01", endPeriod="2022-12-31", save=None):
+        return await self._run('get_eonia_data', startPeriod, endPeriod, save=save)
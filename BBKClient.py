@@ -1,17 +1,41 @@
 import sdmx
-import plotly.express as px
-import plotly.graph_objects as go 
 import pandas as pd
 import traceback
 import os
-from datetime import datetime
+from functools import partial
 
-from helperFunctions import log_stats
+import Metrics as metrics
+from helperFunctions import log_stats, to_frame, present
+from SeriesCache import SeriesCacheClass
+from FetchEngine import FetchEngineClass
+from Transport import TransportClass
+from OutputWriter import OutputWriterClass
+from SeriesRegistry import REGISTRY, EURIBOR_KEYS
+
+
+# EONIA was published for the last time for 2021-12-31; from 2022-01-01 on the spliced series continues with €STR
+EONIA_LAST_DAY = pd.Timestamp('2021-12-31')
+
+# (series, first day, last day) segments of the spliced EONIA/€STR series
+EONIA_ESTR_SEGMENTS = [
+    ('EONIA', pd.Timestamp('1999-01-01'), EONIA_LAST_DAY),
+    ('ESTR', EONIA_LAST_DAY + pd.Timedelta(days=1), pd.Timestamp('2099-12-31')),
+]
 
 
 class BBKClientClass():
-    def __init__(self):
+    def __init__(self, engine=None, session=None, headless=False, registry=None, store=None):
         self.ecb = sdmx.Client("BBK")
+        self.engine = engine or FetchEngineClass()
+        # Series definitions and request planning (see SeriesRegistry.py)
+        self.registry = registry or REGISTRY
+        # Optional SeriesStoreClass shared with other processes (see SeriesStore.py)
+        self.store = store
+        # Headless: no figure display and no save prompt; only outputs passed via `save` are written
+        self.headless = headless
+
+        # Pooled session with retries and timeouts; pass one TransportClass to several clients to share the pool
+        self.ecb.session = session if session is not None else TransportClass()
         
         self.folder_name = "output"
         self.save_dir = os.path.isdir(self.folder_name)
@@ -20,199 +44,63 @@ class BBKClientClass():
         if not self.save_dir:
             os.makedirs(self.folder_name)
             print(f'Created folder {self.current_dir}/{self.folder_name}')
-            
 
-    @log_stats
-    def get_euribor_data(self, startPeriod="1980-01-01", endPeriod="2099-12-31", short_term='3M', long_term=None, spread=None):
-        
-        
-        try:
-            startPeriod = datetime.strptime(startPeriod,'%Y-%m-%d')
-            endPeriod = datetime.strptime(endPeriod,'%Y-%m-%d')
-            
-            frequency_key_map = {
-                '1W': 'ST0307',
-                '1M': 'ST0310',
-                '3M': 'ST0316',
-                '6M': 'ST0325',
-                '9M': 'ST0334',
-                '12M': 'ST0343'
-            }
+        self.cache = SeriesCacheClass(self.folder_name, engine=self.engine)
+        self.writer = OutputWriterClass()
 
-            if long_term == '10Y':
-                long_term = None
-            
-                
-            if (short_term or long_term) not in frequency_key_map:
-                
-                raise Exception(f"Invalid short term: {short_term}. Valid values are: {frequency_key_map.keys()}")
 
-            else:
-                key = frequency_key_map[short_term]
-
-                data = self.ecb.data("BBK01", key=key).data[0]
-                df = sdmx.to_pandas(data, datetime="TIME_PERIOD")
-                df = df.rename(columns={key: f'EURIBOR{short_term}'})
-
-                df = df[(df.index >= startPeriod) & (df.index <= endPeriod)]
-
-                df = df.dropna()
-
-                begin_date = df.index[-1].strftime('%Y-%m-%d')
-                end_date = df.index[12].strftime('%Y-%m-%d')
-
-                if not long_term:
-                    
-                    fig = px.line(df, x=df.index, y=f'EURIBOR{short_term}')
-                    fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-                    fig.update_layout(
-                    title=go.layout.Title(
-                        text=f"<b>{short_term} Euribor</b><br><sup>{end_date} - {begin_date}</sup>",
-                        xref="paper",
-                        x=0.5
-                    ),
-                    yaxis=go.layout.YAxis(
-                    title=go.layout.yaxis.Title(
-                        text='Percent'
-                        )
-                    ),
-                    xaxis=go.layout.XAxis(
-                    title=go.layout.xaxis.Title(
-                        text='Period'
-                            )
-                        )
-                    )
-                
-                    fig.show()
-                    
-                else:
-                    key = frequency_key_map[long_term]
-
-                    data_long_term = self.ecb.data("BBK01", key=key).data[0]
-                    df_long_term = sdmx.to_pandas(data_long_term, datetime="TIME_PERIOD")
-                    df_long_term = df_long_term.rename(columns={key: f'EURIBOR{long_term}'})
-                    df_long_term = df_long_term[(df_long_term.index >= startPeriod) & (df_long_term.index <= endPeriod)]
-
-                    df_long_term = df_long_term.dropna()
-                    
-                    df = pd.concat([df, df_long_term], axis=1)
-                    
-                    if spread:
-                        df['spread'] = df[f'EURIBOR{long_term}'] - df[f'EURIBOR{short_term}']
-                        fig = px.line(df, x=df.index, y=['spread'])
-                        fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-                        fig.update_layout(
-                        title=go.layout.Title(
-                            text=f"<b>Euribor spread ({long_term}-{short_term})</b><br><sup>{end_date} - {begin_date}</sup>",
-                            xref="paper",
-                            x=0.5
-                        ),
-                        yaxis=go.layout.YAxis(
-                        title=go.layout.yaxis.Title(
-                            text='Percent'
-                            )
-                        ),
-                        xaxis=go.layout.XAxis(
-                        title=go.layout.xaxis.Title(
-                            text='Period'
-                                )
-                            )
-                        )
-                        
-                    else:
-                        fig = px.line(df, x=df.index, y=[f'EURIBOR{short_term}', f'EURIBOR{long_term}'])
-                        fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-                        fig.update_layout(
-                        title=go.layout.Title(
-                            text=f"<b>Euribor rates</b><br><sup>{end_date} - {begin_date}</sup>",
-                            xref="paper",
-                            x=0.5
-                        ),
-                        yaxis=go.layout.YAxis(
-                        title=go.layout.yaxis.Title(
-                            text='Percent'
-                            )
-                        ),
-                        xaxis=go.layout.XAxis(
-                        title=go.layout.xaxis.Title(
-                            text='Period'
-                                )
-                            )
-                        )
-                    
-                    fig.show()
+    def euribor_series(self, short_term='3M', long_term=None) -> list:
+        # '10Y' is the CLI default long term, see load_euribor_data
+        return self._euribor_names(short_term, None if long_term == '10Y' else long_term)
 
-                
-                save = input("Save output to the current folder? (y/n)")        
 
-                if save.lower() == 'y':    
+    def _euribor_names(self, short_term, long_term) -> list:
 
-                    print(f'{self.current_dir}/{self.folder_name}/EURIBOR{short_term}_{long_term}_spread-{spread}_{begin_date}-{end_date}.png')
-                        
-                    fig.write_image(f"{self.current_dir}/{self.folder_name}/EURIBOR{short_term}_{long_term}_spread-{spread}_{begin_date}-{end_date}.png")
-                    fig.write_html(f"{self.current_dir}/{self.folder_name}/EURIBOR{short_term}_{long_term}_spread-{spread}_{begin_date}-{end_date}.html")
-                    df.to_csv(f"{self.current_dir}/{self.folder_name}/EURIBOR{short_term}_{long_term}_spread-{spread}_{begin_date}-{end_date}.csv", index=True)
-                    print(f"Image saved to {self.current_dir}/{self.folder_name}.")
-                
-                return df
-    
-        except Exception as e:
-            
-            error_msg = f"Unexpected Error: {e}\nTraceback: {traceback.format_exc()}"
-            print(error_msg)
-            
-            return error_msg
+        if short_term not in EURIBOR_KEYS:
+            raise Exception(f"Invalid short term: {short_term}. Valid values are: {list(EURIBOR_KEYS)}")
+        if long_term is not None and long_term not in EURIBOR_KEYS:
+            raise Exception(f"Invalid long term: {long_term}. Valid values are: {list(EURIBOR_KEYS)}")
 
-    @log_stats 
-    def get_eonia_data(self, startPeriod="2021-01-01", endPeriod="2022-12-31"):
-        """
-        The Euro Short-Term Rate (€STR) published by the European Central Bank is determined as a substitute interest rate for the Euro Overnight Index Average (EONIA). Since October 2, 2019, the EONIA has been calculated as €STR + 8.5bp.) 
-        This function takes EONIA history until last day (2021-12-31) and continues with up-to-date €STR data.
-        """
-        
-        try: 
-            
+        tenors = [short_term, long_term] if long_term else [short_term]
 
+        return [f'EURIBOR{tenor}' for tenor in tenors]
+
+
+    @log_stats
+    def load_euribor_data(self, startPeriod="1980-01-01", endPeriod="2099-12-31", short_term='3M', long_term=None, spread=None, lastNObservations=None) -> pd.DataFrame:
+
+        # The CLI passes its yield default '10Y' as long term, which means "no long term" for Euribor
+        if long_term == '10Y':
+            long_term = None
+
+        frames = self.registry.fetch(self.cache, self.ecb, self.engine, self._euribor_names(short_term, long_term), startPeriod, endPeriod, lastNObservations, store=self.store)
+
+        with metrics.stage('transform'):
+            df = to_frame(frames[f'EURIBOR{short_term}'], [f'EURIBOR{short_term}']).dropna()
+
+            if long_term:
+                df_long_term = to_frame(frames[f'EURIBOR{long_term}'], [f'EURIBOR{long_term}']).dropna()
             
-            startPeriod = datetime.strptime(startPeriod,'%Y-%m-%d')
-            endPeriod = datetime.strptime(endPeriod,'%Y-%m-%d')
-            
-            eonia_key = 'ST0304'
-            eonia_data = self.ecb.data("BBK01", key=eonia_key).data[0]
-            eonia_df = sdmx.to_pandas(eonia_data, datetime="TIME_PERIOD")
-            eonia_df = eonia_df.rename(columns={eonia_key: f'EONIA'})
-            eonia_df = eonia_df.dropna()
-            print(eonia_df)
+                df = pd.concat([df, df_long_term], axis=1)
             
-            estr_key = 'D.EU000A2X2A25.WT' 
-            estr_data = self.ecb.data("BBMMB", key=estr_key).data[0]
-            estr_df = sdmx.to_pandas(estr_data, datetime="TIME_PERIOD")
-            estr_df = estr_df.dropna()
-        
-            index_list_estr_data = []
-            for index, _ in estr_df.iterrows():
-                index_list_estr_data.append(index)
+                if spread:
+                    df['spread'] = df[f'EURIBOR{long_term}'] - df[f'EURIBOR{short_term}']
 
-            value_list_estr_data = []
-            for _, value in estr_df.iterrows():
-                for i in value:
-                    value_list_estr_data.append(i)
+        return df
 
-            estr_df = pd.DataFrame(value_list_estr_data, index=index_list_estr_data, columns=['ESTR'])
 
-            eonia_df = eonia_df.join(estr_df, how='outer').fillna(0)           
-            eonia_df['EONIA_ESTR'] = eonia_df['EONIA'] + (eonia_df['ESTR'])
-            df = eonia_df.drop(['EONIA', 'ESTR'], axis=1)
-            df = df[(df.index >= startPeriod) & (df.index <= endPeriod)]
-        
-            begin_date = df.index[-1].strftime('%Y-%m-%d')
-            end_date = df.index[0].strftime('%Y-%m-%d')
+    def _euribor_figure(self, df, short_term, long_term, spread, begin_date, end_date):
+
+        import plotly.express as px
+        import plotly.graph_objects as go
+
+        if not long_term:
             
-            fig = px.line(df, x=df.index, y=f'EONIA_ESTR')
+            fig = px.line(df, x=df.index, y=f'EURIBOR{short_term}')
             fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
             fig.update_layout(
             title=go.layout.Title(
-                text=f"<b>EONIA / €STR</b><br><sup>{end_date} - {begin_date} / €STR-data since 2022-01-01</sup>",
+                text=f"<b>{short_term} Euribor</b><br><sup>{end_date} - {begin_date}</sup>",
                 xref="paper",
                 x=0.5
             ),
@@ -224,26 +112,167 @@ class BBKClientClass():
             xaxis=go.layout.XAxis(
             title=go.layout.xaxis.Title(
                 text='Period'
+                    )
                 )
             )
-        )
-        
-            fig.show()
+
+        else:
+            if spread:
+                fig = px.line(df, x=df.index, y=['spread'])
+                fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+                fig.update_layout(
+                title=go.layout.Title(
+                    text=f"<b>Euribor spread ({long_term}-{short_term})</b><br><sup>{end_date} - {begin_date}</sup>",
+                    xref="paper",
+                    x=0.5
+                ),
+                yaxis=go.layout.YAxis(
+                title=go.layout.yaxis.Title(
+                    text='Percent'
+                    )
+                ),
+                xaxis=go.layout.XAxis(
+                title=go.layout.xaxis.Title(
+                    text='Period'
+                        )
+                    )
+                )
                 
-            save = input("Save output to the current folder? (y/n)")        
+            else:
+                fig = px.line(df, x=df.index, y=[f'EURIBOR{short_term}', f'EURIBOR{long_term}'])
+                fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+                fig.update_layout(
+                title=go.layout.Title(
+                    text=f"<b>Euribor rates</b><br><sup>{end_date} - {begin_date}</sup>",
+                    xref="paper",
+                    x=0.5
+                ),
+                yaxis=go.layout.YAxis(
+                title=go.layout.yaxis.Title(
+                    text='Percent'
+                    )
+                ),
+                xaxis=go.layout.XAxis(
+                title=go.layout.xaxis.Title(
+                    text='Period'
+                        )
+                    )
+                )
+
+        return fig
+
+
+    @log_stats
+    def get_euribor_data(self, startPeriod="1980-01-01", endPeriod="2099-12-31", short_term='3M', long_term=None, spread=None, lastNObservations=None, save=None, show=None):
+        
+        
+        try:
+            if long_term == '10Y':
+                long_term = None
 
-            if save.lower() == 'y':    
+            df = self.load_euribor_data(startPeriod, endPeriod, short_term, long_term, spread, lastNObservations)
 
-                print(f'{self.current_dir}/{self.folder_name}/EONIA_{begin_date}-{end_date}.png')
-                    
-                fig.write_image(f"{self.current_dir}/{self.folder_name}/EONIA_{begin_date}-{end_date}.png")
-                fig.write_html(f"{self.current_dir}/{self.folder_name}/EONIA_{begin_date}-{end_date}.html")
-                df.to_csv(f"{self.current_dir}/{self.folder_name}/EONIA_{begin_date}-{end_date}.csv", index=True)
-                print(f"Image saved to {self.current_dir}/{self.folder_name}.")
+            if df.empty:
+                raise Exception(f"No Euribor observations between {startPeriod} and {endPeriod}.")
+
+            begin_date = df.index[-1].strftime('%Y-%m-%d')
+            end_date = df.index[0].strftime('%Y-%m-%d')
+
+            present(
+                partial(self._euribor_figure, df, short_term, long_term, spread, begin_date, end_date),
+                df,
+                f"{self.current_dir}/{self.folder_name}/EURIBOR{short_term}_{long_term}_spread-{spread}_{begin_date}-{end_date}",
+                show, save, self.headless, dataset=f"EURIBOR{short_term}_{long_term}_spread-{spread}", writer=self.writer
+            )
             
             return df
+    
+        except Exception as e:
+            
+            error_msg = f"Unexpected Error: {e}\nTraceback: {traceback.format_exc()}"
+            print(error_msg)
             
+            return error_msg
+
+
+    def eonia_series(self) -> list:
+        return [name for name, _, _ in EONIA_ESTR_SEGMENTS]
+
+
+    def _eonia_segments(self) -> list:
+        # The segments are fetched separately: the splice reads each one only within its own days
+        return [(self.registry.get(name)['flow'], self.registry.get(name)['key'], first_day, last_day) for name, first_day, last_day in EONIA_ESTR_SEGMENTS]
+
+
+    @log_stats
+    def load_eonia_data(self, startPeriod="2021-01-01", endPeriod="2022-12-31") -> pd.DataFrame:
+        """
+        EONIA until EONIA_LAST_DAY, €STR afterwards, as one column 'EONIA_ESTR'. The spliced series is kept in
+        the series cache and only extended by new €STR prints (see SeriesCacheClass.get_spliced).
+        """
+        if self.store is not None:
+            df = self.store.get('EONIA_ESTR', startPeriod, endPeriod)
+            if df is not None:
+                return df
+
+        df = self.cache.get_spliced(self.ecb, 'EONIA_ESTR', self._eonia_segments(), startPeriod, endPeriod)
+
+        if self.store is not None:
+            # New prints come from the €STR segment
+            self.store.put('EONIA_ESTR', df, startPeriod, endPeriod, 'BBK', self._eonia_segments()[-1][0])
+
+        return df
+
+
+    def _eonia_figure(self, df, begin_date, end_date):
+
+        import plotly.express as px
+        import plotly.graph_objects as go
+
+        fig = px.line(df, x=df.index, y=f'EONIA_ESTR')
+        fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+        fig.update_layout(
+        title=go.layout.Title(
+            text=f"<b>EONIA / €STR</b><br><sup>{end_date} - {begin_date} / €STR-data since 2022-01-01</sup>",
+            xref="paper",
+            x=0.5
+        ),
+        yaxis=go.layout.YAxis(
+        title=go.layout.yaxis.Title(
+            text='Percent'
+            )
+        ),
+        xaxis=go.layout.XAxis(
+        title=go.layout.xaxis.Title(
+            text='Period'
+            )
+        )
+        )
+
+        return fig
+
+
+    @log_stats 
+    def get_eonia_data(self, startPeriod="2021-01-01", endPeriod="2022-12-31", save=None, show=None):
+        """
+        The Euro Short-Term Rate (€STR) published by the European Central Bank is determined as a substitute interest rate for the Euro Overnight Index Average (EONIA). Since October 2, 2019, the EONIA has been calculated as €STR + 8.5bp.) 
+        This function takes EONIA history until last day (2021-12-31) and continues with up-to-date €STR data.
+        """
+        
+        try: 
+            df = self.load_eonia_data(startPeriod, endPeriod)
+        
+            begin_date = df.index[-1].strftime('%Y-%m-%d')
+            end_date = df.index[0].strftime('%Y-%m-%d')
+
+            present(
+                partial(self._eonia_figure, df, begin_date, end_date),
+                df,
+                f"{self.current_dir}/{self.folder_name}/EONIA_{begin_date}-{end_date}",
+                show, save, self.headless, dataset="EONIA", writer=self.writer
+            )
             
+            return df
 
         except Exception as e:
             
@@ -0,0 +1,279 @@
+import inspect
+import itertools
+import json
+import os
+import traceback
+
+import pandas as pd
+
+from SeriesCache import period_start, period_end
+from FetchEngine import FetchError
+from helperFunctions import requested_outputs
+
+
+# dataset -> (client, method listing the registry series, method building the output frame, method building the figure)
+DATASETS = {
+    'inflation': ('ecb', 'inflation_series', 'load_inflation_data', '_inflation_figure'),
+    'yield': ('ecb', 'yield_series', 'load_yield_data', '_yield_figure'),
+    'term_structure': ('ecb', 'term_structure_series', 'load_term_structure', '_term_structure_figure'),
+    'fx': ('ecb', 'exchange_rate_series', 'load_exchange_rate_data', '_exchange_rate_figure'),
+    'euribor': ('bbk', 'euribor_series', 'load_euribor_data', '_euribor_figure'),
+    'eonia': ('bbk', 'eonia_series', 'load_eonia_data', '_eonia_figure'),
+}
+
+OPTION_ALIASES = {
+    'currency': 'fx',
+    'shortterm': 'short_term',
+    'longterm': 'long_term',
+}
+
+# Options whose list is one value of a single job (tenors: [2Y, 10Y] -> '2Y,10Y'), not a list of jobs
+LIST_OPTIONS = ('tenors', 'spreads')
+
+
+def read_job_file(path) -> dict:
+    """
+    Reads a JSON, TOML or YAML job file. Either a list of jobs or a mapping with 'jobs' and optional 'defaults'.
+    """
+    extension = os.path.splitext(path)[1].lower()
+
+    if extension == '.json':
+        with open(path) as f:
+            spec = json.load(f)
+
+    elif extension == '.toml':
+        import tomllib
+        with open(path, 'rb') as f:
+            spec = tomllib.load(f)
+
+    elif extension in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML job files require PyYAML: pip install pyyaml") from None
+        with open(path) as f:
+            spec = yaml.safe_load(f)
+
+    else:
+        raise Exception(f"Unsupported job file: {path}. Use .json, .toml, .yaml or .yml")
+
+    if isinstance(spec, list):
+        spec = dict(jobs=spec)
+
+    return spec
+
+
+def _call(method, *args, **options):
+    """
+    Calls `method` with the subset of `options` it accepts.
+    """
+    accepted = inspect.signature(method).parameters
+    return method(*args, **{name: value for name, value in options.items() if name in accepted})
+
+
+def _defaults(method) -> dict:
+    return {name: parameter.default for name, parameter in inspect.signature(method).parameters.items() if parameter.default is not inspect.Parameter.empty}
+
+
+class BatchRunnerClass():
+    """
+    Plans a list of jobs into the minimal set of series fetches, runs them concurrently with shared clients,
+    and writes each job in the formats of its `save` option (default csv). Figures go to a RendererClass.
+    """
+
+    def __init__(self, ecb_client, bbk_client, engine, renderer=None):
+        self.clients = dict(ecb=ecb_client, bbk=bbk_client)
+        self.engine = engine
+        # Exports png/html figures of all jobs in parallel while later jobs are still being processed
+        self.renderer = renderer
+        # A renderer created by _renderer() is shut down at the end of each run; the caller's is left running
+        self.owns_renderer = False
+
+
+    def expand_jobs(self, spec) -> list:
+        """
+        Applies defaults, resolves option aliases, expands list-valued options (e.g. currency: [USD, GBP])
+        except LIST_OPTIONS, and drops duplicate jobs.
+        """
+        defaults = dict(begin='1980-01-01', end='2099-12-31')
+        defaults.update(spec.get('defaults', {}))
+
+        jobs = {}
+
+        for raw_job in spec.get('jobs', []):
+
+            job = dict(defaults)
+            job.update(raw_job)
+            job = {OPTION_ALIASES.get(name, name): value for name, value in job.items()}
+            job.update({name: ','.join(map(str, job[name])) for name in LIST_OPTIONS if isinstance(job.get(name), list)})
+
+            if job.get('dataset') not in DATASETS:
+                raise Exception(f"Invalid dataset: {job.get('dataset')}. Valid values are: {list(DATASETS)}")
+
+            expandable = [name for name, value in job.items() if isinstance(value, list)]
+
+            for values in itertools.product(*(job[name] for name in expandable)):
+                expanded = dict(job, **dict(zip(expandable, values)))
+                expanded['begin'] = str(expanded['begin'])
+                expanded['end'] = str(expanded['end'])
+                expanded.setdefault('name', self._job_name(expanded))
+                if expandable and 'name' in job:
+                    expanded['name'] = '_'.join([job['name']] + [str(value) for value in values])
+
+                identity = json.dumps({name: value for name, value in expanded.items() if name != 'name'}, sort_keys=True, default=str)
+                jobs.setdefault(identity, expanded)
+
+        return list(jobs.values())
+
+
+    def plan(self, jobs, skip_invalid=False) -> list:
+        """
+        Plans the downloads of all jobs together, as (label, callable) tasks for prefetch. Every series is planned
+        once, with the union of the periods its jobs request; series with the same period are merged into as few
+        requests as possible, and series the cache already holds are left out (see SeriesRegistryClass.plan_missing).
+        With `skip_invalid`, jobs with invalid options are left out instead of raising; they fail when they are run.
+        """
+        periods = {}
+
+        for job in jobs:
+            client_name, series_method, _, _ = DATASETS[job['dataset']]
+
+            try:
+                names = _call(getattr(self.clients[client_name], series_method), **job)
+            except Exception:
+                if not skip_invalid:
+                    raise
+                continue
+
+            for name in names:
+
+                start = period_start(job['begin'])
+                end = period_end(job['end'])
+
+                if (client_name, name) in periods:
+                    period = periods[client_name, name]
+                    periods[client_name, name] = (min(period[0], start), max(period[1], end))
+                else:
+                    periods[client_name, name] = (start, end)
+
+        names_by_period = {}
+        for (client_name, name), (start, end) in periods.items():
+            names_by_period.setdefault((client_name, start, end), []).append(name)
+
+        tasks = []
+
+        for (client_name, start, end), names in names_by_period.items():
+            client = self.clients[client_name]
+            for request in client.registry.plan_missing(client.cache, client.ecb, names, start, end):
+                tasks.append(client.registry.download_task(client.cache, client.ecb, request, start, end))
+
+        return tasks
+
+
+    def prefetch(self, plan):
+
+        try:
+            self.engine.run(plan)
+        except FetchError as e:
+            # Affected jobs retry their own series and report the error in the summary
+            for label, error in e.errors.items():
+                print(f'Prefetch of {label} failed: {error}')
+
+
+    def run(self, spec) -> pd.DataFrame:
+
+        if isinstance(spec, str):
+            spec = read_job_file(spec)
+
+        jobs = self.expand_jobs(spec)
+        # A job with invalid options reports its error in the summary instead of stopping the run
+        plan = self.plan(jobs, skip_invalid=True)
+
+        print(f'{len(jobs)} job(s), {len(plan)} request(s).')
+
+        self.prefetch(plan)
+
+        summary = {}
+
+        for job in jobs:
+
+            client_name, _, load_method, figure_method = DATASETS[job['dataset']]
+            client = self.clients[client_name]
+            path = f"{client.current_dir}/{client.folder_name}/{job['name']}"
+
+            # Named jobs append to a dataset of that name, others to one named without the period
+            dataset = job['name'] if job['name'] != self._job_name(job) else self._job_name(job, with_period=False)
+
+            try:
+                outputs = requested_outputs(job.get('save', 'csv'))
+
+                df = _call(getattr(client, load_method), startPeriod=job['begin'], endPeriod=job['end'], **job)
+                written = client.writer.write(df, outputs - {'png', 'html'}, path, dataset)
+
+                if outputs & {'png', 'html'}:
+                    options = dict(_defaults(getattr(client, load_method)), **job)
+                    fig = _call(getattr(client, figure_method), df, begin_date=df.index[-1].strftime('%Y-%m-%d'), end_date=df.index[0].strftime('%Y-%m-%d'), **options)
+                    self._renderer().submit(fig, path, outputs)
+
+                summary[path] = dict(job=job['name'], rows=len(df), output=', '.join(written), error=None)
+
+            except Exception as e:
+                print(f"Job {job['name']} failed: {e}\nTraceback: {traceback.format_exc()}")
+                summary[path] = dict(job=job['name'], rows=0, output=None, error=str(e))
+
+        if self.renderer is not None:
+            try:
+                results = self.renderer.wait()
+            finally:
+                if self.owns_renderer:
+                    self.renderer.shutdown()
+
+            for path, result in results.items():
+                entry = summary[path]
+                if isinstance(result, Exception):
+                    entry['error'] = f'Rendering failed: {result}'
+                else:
+                    entry['output'] = ', '.join(filter(None, [entry['output']] + result))
+
+        return pd.DataFrame(list(summary.values())).set_index('job')
+
+
+    def _renderer(self):
+
+        if self.renderer is None:
+            from Renderer import RendererClass
+            self.renderer = RendererClass()
+            self.owns_renderer = True
+
+        return self.renderer
+
+
+    def _job_name(self, job, with_period=True) -> str:
+
+        options = [str(value) for name, value in sorted(job.items()) if name not in ('dataset', 'begin', 'end', 'name', 'save')]
+        period = [f"{job['begin']}-{job['end']}"] if with_period else []
+
+        return '_'.join([job['dataset']] + options + period)
+
+
+def report(results) -> pd.DataFrame:
+    """
+    One row per result of a multi-dataset run: period, number of rows and latest values, or the error message
+    returned by the get_* method.
+    """
+    rows = []
+
+    for dataset, df in results.items():
+
+        if isinstance(df, str):
+            rows.append(dict(dataset=dataset, rows=0, first=None, last=None, latest=None, error=df.splitlines()[0]))
+            continue
+
+        latest = df.ffill().iloc[-1].round(4).to_dict() if len(df) else {}
+        rows.append(dict(
+            dataset=dataset, rows=len(df),
+            first=df.index.min() if len(df) else None, last=df.index.max() if len(df) else None,
+            latest=', '.join(f'{column}: {value}' for column, value in latest.items()), error=None,
+        ))
+
+    return pd.DataFrame(rows, columns=['dataset', 'rows', 'first', 'last', 'latest', 'error']).set_index('dataset')
@@ -1,15 +1,33 @@
 import sdmx
-import plotly.express as px
-import plotly.graph_objects as go 
+import numpy as np
 import pandas as pd
 import traceback
 import os
+import re
+from functools import partial
+
+import Metrics as metrics
+from helperFunctions import log_stats, to_frame, present
+from SeriesCache import SeriesCacheClass
+from FetchEngine import FetchEngineClass
+from Transport import TransportClass
+from OutputWriter import OutputWriterClass
+from SeriesRegistry import REGISTRY, TERM_STRUCTURE_TENORS, YIELD_SHORT_TERMS, YIELD_LONG_TERMS
 
-from helperFunctions import log_stats
 
 class ECBClientClass():
-    def __init__(self):
+    def __init__(self, engine=None, session=None, headless=False, registry=None, store=None):
         self.ecb = sdmx.Client("ECB")
+        self.engine = engine or FetchEngineClass()
+        # Series definitions and request planning (see SeriesRegistry.py)
+        self.registry = registry or REGISTRY
+        # Optional SeriesStoreClass shared with other processes (see SeriesStore.py)
+        self.store = store
+        # Headless: no figure display and no save prompt; only outputs passed via `save` are written
+        self.headless = headless
+
+        # Pooled session with retries and timeouts; pass one TransportClass to several clients to share the pool
+        self.ecb.session = session if session is not None else TransportClass()
         
         self.folder_name = "output"
         self.save_dir = os.path.isdir(self.folder_name)
@@ -19,65 +37,76 @@ class ECBClientClass():
             os.makedirs(self.folder_name)
             print(f'Created folder {self.current_dir}/{self.folder_name}')
 
+        self.cache = SeriesCacheClass(self.folder_name, engine=self.engine)
+        self.writer = OutputWriterClass()
+
+
+    def inflation_series(self) -> list:
+        return ['HICP']
+
 
     @log_stats
-    def get_inflation_data(self, startPeriod="1980-01", endPeriod="2099-12", save=False) -> pd.DataFrame:
+    def load_inflation_data(self, startPeriod="1980-01", endPeriod="2099-12") -> pd.DataFrame:
+
+        frames = self.registry.fetch(self.cache, self.ecb, self.engine, ['HICP'], startPeriod, endPeriod, store=self.store)
         
-        try:
-            
-            params = dict(startPeriod=startPeriod, endPeriod=endPeriod)
-            key = dict(ICP_ITEM="000000", FREQ="M", REF_AREA='U2', ICP_SUFFIX='INX', ADJUSTMENT='Y')
-            data = self.ecb.data("ICP", key=key, params=params).data[0]
-            
-            df = sdmx.to_pandas(data, datetime="TIME_PERIOD")
-            
-            index_list = []
-            for index, row in df.iterrows():
-                index_list.append(index)
-
-            value_list = []
-            for index, value in df.iterrows():
-                for i in value:
-                    value_list.append(i)
-            
-            inflation_index = pd.DataFrame(value_list, index=index_list, columns=['HICP'])
+        with metrics.stage('transform'):
+            inflation_index = to_frame(frames['HICP'], ['HICP'])
             inflation_index['HICP_ann_delta'] = inflation_index['HICP'].pct_change(12)*100
             inflation_index['HICP_ann_delta'] = inflation_index['HICP_ann_delta'].dropna()
-            begin_date = inflation_index.index[-1].strftime('%Y-%m-%d')
-            end_date = inflation_index.index[12].strftime('%Y-%m-%d')
 
-            fig = px.line(inflation_index, x=inflation_index.index, y='HICP_ann_delta')
-            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-            fig.update_layout(
-            title=go.layout.Title(
-                text=f"<b>Eurozone: Inflation rate</b><br><sup>{end_date} - {begin_date}</sup>",
-                xref="paper",
-                x=0.5
-            ),
-            yaxis=go.layout.YAxis(
-            title=go.layout.yaxis.Title(
-                text='Year-on-year inflation rate (%)'
-                )
-            ),
-            xaxis=go.layout.XAxis(
-            title=go.layout.xaxis.Title(
-                text='Period'
-                )
+        return inflation_index
+
+
+    def _inflation_figure(self, inflation_index, begin_date, end_date):
+
+        import plotly.express as px
+        import plotly.graph_objects as go
+
+        fig = px.line(inflation_index, x=inflation_index.index, y='HICP_ann_delta')
+        fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+        fig.update_layout(
+        title=go.layout.Title(
+            text=f"<b>Eurozone: Inflation rate</b><br><sup>{end_date} - {begin_date}</sup>",
+            xref="paper",
+            x=0.5
+        ),
+        yaxis=go.layout.YAxis(
+        title=go.layout.yaxis.Title(
+            text='Year-on-year inflation rate (%)'
             )
+        ),
+        xaxis=go.layout.XAxis(
+        title=go.layout.xaxis.Title(
+            text='Period'
+            )
+        )
         )
 
-            fig.show()
+        return fig
+
+
+    @log_stats
+    def get_inflation_data(self, startPeriod="1980-01", endPeriod="2099-12", save=None, show=None) -> pd.DataFrame:
+        
+        try:
             
-            save = input("Save output to the current folder? (y/n)")        
+            inflation_index = self.load_inflation_data(startPeriod, endPeriod)
 
-            if save.lower() == 'y':    
+            if inflation_index.empty:
+                raise Exception(f"No HICP observations between {startPeriod} and {endPeriod}.")
 
-                print(f'{self.current_dir}/{self.folder_name}/HICP_Eurozone_{begin_date}-{end_date}.png')
-                    
-                fig.write_image(f"{self.current_dir}/{self.folder_name}/HICP_Eurozone_{begin_date}-{end_date}.png")
-                fig.write_html(f"{self.current_dir}/{self.folder_name}/HICP_Eurozone_{begin_date}-{end_date}.html")
-                inflation_index.to_csv(f"{self.current_dir}/{self.folder_name}/HICP_Eurozone_{begin_date}-{end_date}.csv", index=True)
-                print(f"Image saved to {self.current_dir}/{self.folder_name}.")
+            # The plotted annual rate starts 12 months after the index; shorter windows have none and show their whole period
+            first_rate = inflation_index['HICP_ann_delta'].first_valid_index()
+            begin_date = inflation_index.index[-1].strftime('%Y-%m-%d')
+            end_date = (inflation_index.index[0] if first_rate is None else first_rate).strftime('%Y-%m-%d')
+
+            present(
+                partial(self._inflation_figure, inflation_index, begin_date, end_date),
+                inflation_index,
+                f"{self.current_dir}/{self.folder_name}/HICP_Eurozone_{begin_date}-{end_date}",
+                show, save, self.headless, dataset="HICP_Eurozone", writer=self.writer
+            )
             
             return inflation_index
         
@@ -89,128 +118,115 @@ class ECBClientClass():
             return error_msg
 
        
-    @log_stats
-    def get_yield_data(self, spread=False, startPeriod="1980-01", endPeriod="2099-12", short_term="2Y", long_term="10Y", save=False) -> pd.DataFrame:
+    def yield_series(self, short_term="2Y", long_term="10Y") -> list:
 
-        
-        try:
-            
-            supported_shortterm = ['3M', '6M', '9M', '1Y', '2Y']
-            supported_longterm = ['5Y','10Y', '15Y', '20Y', '30Y']
-            
-            if short_term not in supported_shortterm:
-                    raise Exception(f"Invalid short term: {short_term}. Valid values are: {supported_shortterm}")
-            if long_term not in supported_longterm:
-                    raise Exception(f"Invalid long term: {long_term}. Valid values are: {supported_longterm}")
-            
-            params = dict(startPeriod=startPeriod, endPeriod=endPeriod)
-            short_term_key = dict(REF_AREA='U2', INSTRUMENT_FM='G_N_A', DATA_TYPE_FM=f'SR_{short_term}')
-            long_term_key = dict(REF_AREA='U2', INSTRUMENT_FM='G_N_A', DATA_TYPE_FM=f'SR_{long_term}')
+        if short_term not in YIELD_SHORT_TERMS:
+            raise Exception(f"Invalid short term: {short_term}. Valid values are: {YIELD_SHORT_TERMS}")
+        if long_term not in YIELD_LONG_TERMS:
+            raise Exception(f"Invalid long term: {long_term}. Valid values are: {YIELD_LONG_TERMS}")
 
-            short_term_data = self.ecb.data("YC", key=short_term_key, params=params).data[0]
-            df_short_term_data = sdmx.to_pandas(short_term_data, datetime="TIME_PERIOD")
-            
-            long_term_data = self.ecb.data("YC", key=long_term_key, params=params).data[0]
-            df_long_term_data = sdmx.to_pandas(long_term_data, datetime="TIME_PERIOD")
+        return [f'YC_SR_{short_term}', f'YC_SR_{long_term}']
 
 
+    @log_stats
+    def load_yield_data(self, spread=False, startPeriod="1980-01", endPeriod="2099-12", short_term="2Y", long_term="10Y") -> pd.DataFrame:
+
+        # Validates the maturities
+        self.yield_series(short_term, long_term)
+        frames = self.registry.fetch(self.cache, self.ecb, self.engine, [f'YC_SR_{short_term}', f'YC_SR_{long_term}'], startPeriod, endPeriod, store=self.store)
+
+        with metrics.stage('transform'):
             ## Short Term Yield
-            index_list_short_term_data = []
-            for index, _ in df_short_term_data.iterrows():
-                index_list_short_term_data.append(index)
-
-            value_list_short_term_data = []
-            for _, value in df_short_term_data.iterrows():
-                for i in value:
-                    value_list_short_term_data.append(i)
-            
-            short_term_yield_df = pd.DataFrame(value_list_short_term_data, index=index_list_short_term_data, columns=[f'{short_term}'])
+            short_term_yield_df = to_frame(frames[f'YC_SR_{short_term}'], [f'{short_term}'])
             short_term_yield_df[f'{short_term}'] = short_term_yield_df[f'{short_term}'].dropna()
-            begin_date = short_term_yield_df.index[-1].strftime('%Y-%m-%d')
-            end_date = short_term_yield_df.index[0].strftime('%Y-%m-%d')
-            
-            
+        
             ## Long Term Yield
-            index_list_long_term_data = []
-            for index, _ in df_long_term_data.iterrows():
-                index_list_long_term_data.append(index)
-
-            value_list_long_term_data = []
-            for _, value in df_long_term_data.iterrows():
-                for i in value:
-                    value_list_long_term_data.append(i)
-            
-            long_term_yield_df = pd.DataFrame(value_list_long_term_data, index=index_list_long_term_data, columns=[f'{long_term}'])
+            long_term_yield_df = to_frame(frames[f'YC_SR_{long_term}'], [f'{long_term}'])
             long_term_yield_df[f'{long_term}'] = long_term_yield_df[f'{long_term}'].dropna()
-            begin_date = long_term_yield_df.index[-1].strftime('%Y-%m-%d')
-            end_date = long_term_yield_df.index[0].strftime('%Y-%m-%d')
 
             yield_df = pd.concat([short_term_yield_df, long_term_yield_df], axis=1)
-            
+        
             if spread:
                 yield_df['spread'] = yield_df[f'{long_term}'] - yield_df[f'{short_term}']
-            
-            if not spread:
 
-                fig = px.line(yield_df, x=yield_df.index, y=[f'{short_term}', f'{long_term}'], labels={'value': 'Yield in %', 'index': 'Period'})
+        return yield_df
 
-                fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-                
-                fig.update_layout(
-                    legend_title="Maturity",
-
-                    title=go.layout.Title(
-                        text=f"<b>Eurozone: Yield curve (spot rate)</b><br><sup>{end_date} - {begin_date}</sup>",
-                        xref="paper",
-                        x=0.5
-                    ),
-                    yaxis=go.layout.YAxis(
-                    title=go.layout.yaxis.Title(
-                        text='Yield in %'
-                        )
-                    ),
-                    xaxis=go.layout.XAxis(
-                    title=go.layout.xaxis.Title(
-                        text='Period'
-                        )
+
+    def _yield_figure(self, yield_df, spread, short_term, long_term, begin_date, end_date):
+
+        import plotly.express as px
+        import plotly.graph_objects as go
+
+        if not spread:
+
+            fig = px.line(yield_df, x=yield_df.index, y=[f'{short_term}', f'{long_term}'], labels={'value': 'Yield in %', 'index': 'Period'})
+
+            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+            
+            fig.update_layout(
+                legend_title="Maturity",
+
+                title=go.layout.Title(
+                    text=f"<b>Eurozone: Yield curve (spot rate)</b><br><sup>{end_date} - {begin_date}</sup>",
+                    xref="paper",
+                    x=0.5
+                ),
+                yaxis=go.layout.YAxis(
+                title=go.layout.yaxis.Title(
+                    text='Yield in %'
+                    )
+                ),
+                xaxis=go.layout.XAxis(
+                title=go.layout.xaxis.Title(
+                    text='Period'
                     )
                 )
-            
-            else:
-                fig = px.line(yield_df, x=yield_df.index, y=['spread'], labels={'value': 'Yield spread in %', 'index': 'Period'})
-
-                fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-
-                fig.update_layout(
-                    legend_title=f"{long_term} minus {short_term}",
-
-                    title=go.layout.Title(
-                        text=f"<b>Eurozone: Yield spread (spot rate)</b><br><sup>{end_date} - {begin_date}</sup>",
-                        xref="paper",
-                        x=0.5
-                    ),
-                    yaxis=go.layout.YAxis(
-                    title=go.layout.yaxis.Title(
-                        text='Yield in %'
-                        )
-                    ),
-                    xaxis=go.layout.XAxis(
-                    title=go.layout.xaxis.Title(
-                        text='Period'
-                        )
+            )
+        
+        else:
+            fig = px.line(yield_df, x=yield_df.index, y=['spread'], labels={'value': 'Yield spread in %', 'index': 'Period'})
+
+            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+
+            fig.update_layout(
+                legend_title=f"{long_term} minus {short_term}",
+
+                title=go.layout.Title(
+                    text=f"<b>Eurozone: Yield spread (spot rate)</b><br><sup>{end_date} - {begin_date}</sup>",
+                    xref="paper",
+                    x=0.5
+                ),
+                yaxis=go.layout.YAxis(
+                title=go.layout.yaxis.Title(
+                    text='Yield in %'
+                    )
+                ),
+                xaxis=go.layout.XAxis(
+                title=go.layout.xaxis.Title(
+                    text='Period'
                     )
                 )
+            )
+
+        return fig
 
-            fig.show()
+
+    @log_stats
+    def get_yield_data(self, spread=False, startPeriod="1980-01", endPeriod="2099-12", short_term="2Y", long_term="10Y", save=None, show=None) -> pd.DataFrame:
+
+        
+        try:
             
-            save = input("Save output to the current folder? (y/n)")        
-                
-            if save.lower() == 'y':    
-                    
-                fig.write_image(f"{self.current_dir}/{self.folder_name}/Yield_curve_{short_term}{long_term}_{begin_date}-{end_date}_spread-{spread}.png")
-                fig.write_html(f"{self.current_dir}/{self.folder_name}/Yield_curve_{short_term}{long_term}_{begin_date}-{end_date}_spread-{spread}.html")
-                yield_df.to_csv(f"{self.current_dir}/{self.folder_name}/Yield_curve_{short_term}{long_term}_{begin_date}-{end_date}_spread-{spread}.csv", index=True)
-                print(f"Output saved to {self.current_dir}/{self.folder_name}.")
+            yield_df = self.load_yield_data(spread, startPeriod, endPeriod, short_term, long_term)
+            begin_date = yield_df.index[-1].strftime('%Y-%m-%d')
+            end_date = yield_df.index[0].strftime('%Y-%m-%d')
+
+            present(
+                partial(self._yield_figure, yield_df, spread, short_term, long_term, begin_date, end_date),
+                yield_df,
+                f"{self.current_dir}/{self.folder_name}/Yield_curve_{short_term}{long_term}_{begin_date}-{end_date}_spread-{spread}",
+                show, save, self.headless, dataset=f"Yield_curve_{short_term}{long_term}_spread-{spread}", writer=self.writer
+            )
             
             return yield_df
         
@@ -222,51 +238,110 @@ class ECBClientClass():
             return error_msg
 
         
+    def _tenor_months(self, tenor) -> int:
+        # '3M' -> 3, '10Y' -> 120
+        return int(tenor[:-1]) * (12 if tenor[-1] == 'Y' else 1)
+
+
+    def _spread_pairs(self, spreads, tenors) -> list:
+        """
+        Parses spread names into (name, short tenor, long tenor). Accepts market notation ('2s10s', '3m10y', '5s30s'),
+        tenor pairs ('2Y10Y') and 'all' for every pair of `tenors`.
+        """
+        if isinstance(spreads, str):
+            spreads = spreads.split(',')
+
+        if [spread.strip().lower() for spread in spreads] == ['all']:
+            return [(f'{short}{long}', short, long) for i, short in enumerate(tenors) for long in tenors[i + 1:]]
+
+        pairs = []
+
+        for spread in spreads:
+            match = re.fullmatch(r'(\d+)([smy])(\d+)([smy])', spread.strip().lower())
+            if not match:
+                raise Exception(f"Invalid spread: {spread}. Use e.g. 2s10s, 3m10y or 2Y10Y")
+
+            months = [int(match[1]) * (1 if match[2] == 'm' else 12), int(match[3]) * (1 if match[4] == 'm' else 12)]
+            short, long = [f'{m // 12}Y' if m % 12 == 0 else f'{m}M' for m in months]
+
+            for tenor in (short, long):
+                if tenor not in tenors:
+                    raise Exception(f"Invalid tenor in spread {spread}: {tenor}. Valid values are: {tenors}")
+
+            pairs.append((spread.strip(), short, long))
+
+        return pairs
+
+
+    def term_structure_series(self, tenors=None) -> list:
+
+        tenors = tenors or TERM_STRUCTURE_TENORS
+        if isinstance(tenors, str):
+            tenors = tenors.split(',')
+
+        invalid = set(tenors) - set(TERM_STRUCTURE_TENORS)
+        if invalid:
+            raise Exception(f"Invalid tenor(s): {sorted(invalid)}. Valid values are: {TERM_STRUCTURE_TENORS}")
+
+        # Planned as one request for all maturities: DATA_TYPE_FM=SR_3M+SR_6M+...
+        return [f'YC_SR_{tenor}' for tenor in tenors]
+
+
     @log_stats
-    def get_exchange_rate_data(self, fx='USD', startPeriod="2001-01", endPeriod="2023-12", save=False):
-        
-        try:
-            params = dict(startPeriod=startPeriod, endPeriod=endPeriod)
+    def load_term_structure(self, startPeriod="1980-01", endPeriod="2099-12", tenors=None, spreads=None) -> pd.DataFrame:
+        """
+        Returns a date x tenor matrix of spot rates (columns '3M' ... '30Y', ordered by maturity), plus one column
+        per requested spread (long minus short tenor, in percentage points).
+        """
+        tenors = tenors or TERM_STRUCTURE_TENORS
+        if isinstance(tenors, str):
+            tenors = tenors.split(',')
 
-            key = f'D.{fx}.EUR.SP00.A'
-            
-            fx_data = self.ecb.data("EXR", key=key, params=params).data[0]
-            df_fx_data = sdmx.to_pandas(fx_data, datetime="TIME_PERIOD")
-            
-            begin_date = df_fx_data.index[0].strftime('%Y-%m-%d')
-            end_date = df_fx_data.index[-1].strftime('%Y-%m-%d')
-            
-            index_list_fx_data = []
-            for index, _ in df_fx_data.iterrows():
-                index_list_fx_data.append(index)
-            
-            value_list_fx_data = []
-            for _, value in df_fx_data.iterrows():
-                for i in value:
-                    value_list_fx_data.append(i)
+        # Validates the maturities
+        self.term_structure_series(tenors)
+        frames = self.registry.fetch(self.cache, self.ecb, self.engine, [f'YC_SR_{tenor}' for tenor in tenors], startPeriod, endPeriod, store=self.store)
+        df = pd.concat([frames[f'YC_SR_{tenor}'] for tenor in tenors], axis=1)
 
-                
-            df_fx_data = pd.DataFrame(value_list_fx_data, index=index_list_fx_data, columns=[f'{fx}.EUR'])
+        with metrics.stage('transform'):
+            # Series keys end with the data type, e.g. 'B.U2.EUR.4F.G_N_A.SV_C_YM.SR_10Y'
+            df.columns = [column.rsplit('.', 1)[-1].replace('SR_', '') for column in df.columns]
+            df = df[sorted(df.columns, key=self._tenor_months)]
 
-            print(df_fx_data)
-            
-            fig = px.line(df_fx_data, x=df_fx_data.index, y=[f'{fx}.EUR'], labels={'value': f'(1 EUR costs .. {fx}', 'index': 'Period'})
-            
-            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
-            
-            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified", showlegend=False)
+            if spreads:
+                pairs = self._spread_pairs(spreads, list(df.columns))
+                position = {tenor: i for i, tenor in enumerate(df.columns)}
 
-            fig.update_layout(
-                legend_title=f"Currency Pair",
+                # All spreads in one vectorized subtraction over the matrix
+                matrix = df.to_numpy()
+                short_index = np.array([position[short] for _, short, _ in pairs])
+                long_index = np.array([position[long] for _, _, long in pairs])
+                spread_matrix = matrix[:, long_index] - matrix[:, short_index]
+
+                df = pd.concat([df, pd.DataFrame(spread_matrix, index=df.index, columns=[name for name, _, _ in pairs])], axis=1)
+
+        return df
+
+
+    def _term_structure_figure(self, df, spreads, begin_date, end_date):
 
+        import plotly.express as px
+        import plotly.graph_objects as go
+
+        tenors = [column for column in df.columns if column in TERM_STRUCTURE_TENORS]
+
+        if spreads:
+            fig = px.line(df, x=df.index, y=[column for column in df.columns if column not in tenors], labels={'value': 'Yield spread in %', 'index': 'Period'})
+            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+            fig.update_layout(
+                legend_title="Spread",
                 title=go.layout.Title(
-                    text=f"<b>EUR/{fx}</b><br><sup>{begin_date} - {end_date}</sup>",
+                    text=f"<b>Eurozone: Yield spreads (spot rate)</b><br><sup>{end_date} - {begin_date}</sup>",
                     xref="paper",
                     x=0.5
                 ),
                 yaxis=go.layout.YAxis(
                 title=go.layout.yaxis.Title(
-                    text=f'1 EUR costs .. {fx}'
+                    text='Yield spread in %'
                     )
                 ),
                 xaxis=go.layout.XAxis(
@@ -275,17 +350,160 @@ class ECBClientClass():
                     )
                 )
             )
+
+        else:
+            # Curve of the last available day, maturities in years on the x axis
+            curve = df[tenors].dropna(how='all').iloc[-1]
+            fig = px.line(x=[self._tenor_months(tenor) / 12 for tenor in tenors], y=curve.to_numpy(), markers=True)
+            fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5)
+            fig.update_layout(
+                title=go.layout.Title(
+                    text=f"<b>Eurozone: Yield curve (spot rate)</b><br><sup>{curve.name.strftime('%Y-%m-%d')}</sup>",
+                    xref="paper",
+                    x=0.5
+                ),
+                yaxis=go.layout.YAxis(
+                title=go.layout.yaxis.Title(
+                    text='Yield in %'
+                    )
+                ),
+                xaxis=go.layout.XAxis(
+                title=go.layout.xaxis.Title(
+                    text='Maturity in years'
+                    )
+                )
+            )
+
+        return fig
+
+
+    @log_stats
+    def get_term_structure(self, startPeriod="1980-01", endPeriod="2099-12", tenors=None, spreads=None, save=None, show=None) -> pd.DataFrame:
+        """
+        All spot-rate maturities of the euro area yield curve in one request, optionally with spreads, e.g. spreads='2s10s,3m10y,5s30s' or 'all'.
+        """
+        
+        try:
             
-            fig.show()
+            df = self.load_term_structure(startPeriod, endPeriod, tenors, spreads)
+            begin_date = df.index[-1].strftime('%Y-%m-%d')
+            end_date = df.index[0].strftime('%Y-%m-%d')
 
-            save = input("Save output to the current folder? (y/n)")
+            spread_name = spreads.replace(',', '-') if isinstance(spreads, str) else '-'.join(spreads or [])
+
+            present(
+                partial(self._term_structure_figure, df, spreads, begin_date, end_date),
+                df,
+                f"{self.current_dir}/{self.folder_name}/Yield_term_structure_{begin_date}-{end_date}_spreads-{spread_name or None}",
+                show, save, self.headless, dataset="Yield_term_structure", writer=self.writer
+            )
             
-            if save.lower() == 'y':
-                
-                fig.write_image(f"{self.current_dir}/{self.folder_name}/FX_{fx}_EUR_{begin_date}-{end_date}.png")
-                fig.write_html(f"{self.current_dir}/{self.folder_name}/FX_{fx}_EUR_{begin_date}-{end_date}.html")
-                df_fx_data.to_csv(f"{self.current_dir}/{self.folder_name}/FX_{fx}_EUR_{begin_date}-{end_date}.csv", index=True)
-                print(f"Output saved to {self.current_dir}/{self.folder_name}.")
+            return df
+        
+        except Exception as e:
+            
+            error_msg = f"Unexpected Error: {e}\nTraceback: {traceback.format_exc()}"
+            print(error_msg)
+            
+            return error_msg
+
+
+    def _currencies(self, fx) -> list:
+        """
+        'USD', 'USD,GBP,CHF' or ['USD', 'GBP'] -> ['USD', 'GBP', ...]. '*' stands for every currency quoted against EUR.
+        """
+        if isinstance(fx, str):
+            fx = fx.split(',')
+
+        return [currency.strip().upper() for currency in fx if currency.strip()]
+
+
+    def exchange_rate_series(self, fx='USD') -> list:
+
+        # Planned as one request in SDMX OR syntax (D.USD+GBP.EUR.SP00.A); FX_* is the wildcard for all currencies
+        return self._fx_names(fx)
+
+
+    def _fx_names(self, fx) -> list:
+        currencies = self._currencies(fx)
+        return ['FX_*'] if '*' in currencies else [f'FX_{currency}' for currency in currencies]
+
+
+    @log_stats
+    def load_exchange_rate_data(self, fx='USD', startPeriod="2001-01", endPeriod="2023-12") -> pd.DataFrame:
+        """
+        Returns one column per currency ('USD.EUR', 'GBP.EUR', ...), aligned on date, in the requested order.
+        """
+        names = self._fx_names(fx)
+        frames = self.registry.fetch(self.cache, self.ecb, self.engine, names, startPeriod, endPeriod, store=self.store)
+        df_fx_data = pd.concat([frames[name] for name in names], axis=1)
+
+        with metrics.stage('transform'):
+            # Series keys look like 'D.USD.EUR.SP00.A'
+            df_fx_data.columns = [f'{column.split(".")[1]}.EUR' for column in df_fx_data.columns]
+
+            currencies = self._currencies(fx)
+            if '*' not in currencies:
+                df_fx_data = df_fx_data.reindex(columns=[f'{currency}.EUR' for currency in currencies])
+
+        return df_fx_data
+
+
+    def _exchange_rate_figure(self, df_fx_data, fx, begin_date, end_date):
+
+        import plotly.express as px
+        import plotly.graph_objects as go
+
+        fig = px.line(df_fx_data, x=df_fx_data.index, y=list(df_fx_data.columns), labels={'value': f'(1 EUR costs .. {fx}', 'index': 'Period'})
+        
+        fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified")
+        
+        fig.update_layout(template='plotly_white', width=600, height=600, title_x=0.5, hovermode="x unified", showlegend=len(df_fx_data.columns) > 1)
+
+        fig.update_layout(
+            legend_title=f"Currency Pair",
+
+            title=go.layout.Title(
+                text=f"<b>EUR/{fx}</b><br><sup>{begin_date} - {end_date}</sup>",
+                xref="paper",
+                x=0.5
+            ),
+            yaxis=go.layout.YAxis(
+            title=go.layout.yaxis.Title(
+                text=f'1 EUR costs .. {fx}'
+                )
+            ),
+            xaxis=go.layout.XAxis(
+            title=go.layout.xaxis.Title(
+                text='Period'
+                )
+            )
+        )
+
+        return fig
+
+
+    @log_stats
+    def get_exchange_rate_data(self, fx='USD', startPeriod="2001-01", endPeriod="2023-12", save=None, show=None):
+        
+        try:
+            df_fx_data = self.load_exchange_rate_data(fx, startPeriod, endPeriod)
+            fx = '-'.join(column.split('.')[0] for column in df_fx_data.columns)
+            
+            begin_date = df_fx_data.index[0].strftime('%Y-%m-%d')
+            end_date = df_fx_data.index[-1].strftime('%Y-%m-%d')
+
+            if not self.headless:
+                print(df_fx_data)
+
+            present(
+                partial(self._exchange_rate_figure, df_fx_data, fx, begin_date, end_date),
+                df_fx_data,
+                f"{self.current_dir}/{self.folder_name}/FX_{fx}_EUR_{begin_date}-{end_date}",
+                show, save, self.headless, dataset=f"FX_{fx}_EUR", writer=self.writer
+            )
+
+            return df_fx_data
             
         except Exception as e:
                 
@@ -0,0 +1,88 @@
+import contextvars
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class FetchError(Exception):
+    """
+    Raised by FetchEngineClass.run when at least one task failed.
+    `errors` maps each failed label to its exception, `results` holds the successful results (None for failures) in task order.
+    """
+
+    def __init__(self, errors, results):
+        self.errors = errors
+        self.results = results
+        super().__init__('; '.join(f'{label}: {error}' for label, error in errors.items()))
+
+
+class FetchEngineClass():
+    """
+    Runs independent series requests concurrently on a shared thread pool.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fetch')
+
+
+    def run(self, tasks) -> list:
+        """
+        Executes (label, callable) pairs and returns their results in the order of `tasks`.
+        """
+        # Each task runs in a copy of the caller's context, so its timings count towards the caller's metrics record
+        futures = [(label, self.executor.submit(contextvars.copy_context().run, func)) for label, func in tasks]
+
+        results = []
+        errors = {}
+
+        for label, future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(None)
+                errors[label] = e
+
+        if errors:
+            raise FetchError(errors, results)
+
+        return results
+
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class SingleFlightClass():
+    """
+    Coalesces concurrent calls with the same key: the first caller runs the function, callers arriving while
+    it is in flight wait for it and receive the same result (or exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flights = {}
+
+
+    def do(self, key, func) -> tuple:
+        """
+        Returns (result, shared); `shared` is True for callers that received the result of another caller's call.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = Future()
+
+        if not leader:
+            return flight.result(), True
+
+        try:
+            result = func()
+            flight.set_result(result)
+            return result, False
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
@@ -0,0 +1,215 @@
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Stages recorded per client call, in pipeline order
+STAGES = ('fetch', 'parse', 'to_pandas', 'cache_read', 'transform', 'plot', 'write')
+
+_current = contextvars.ContextVar('metrics_record', default=None)
+
+
+class CallRecord():
+    """
+    Timings and counters of one client call. Stage times are summed over all requests of the call,
+    so concurrent fetches can add up to more than the wall time.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.duration = None
+        self.error = None
+        self.stages = {}
+        self.counters = {}
+        self.lock = threading.Lock()
+
+
+    def add_time(self, stage, seconds):
+        with self.lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+    def add(self, counter, value):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+
+    def to_dict(self) -> dict:
+        return dict(
+            call=self.name,
+            started=time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            duration_s=round(self.duration, 6),
+            stages_s={stage: round(seconds, 6) for stage, seconds in self.stages.items()},
+            counters=dict(self.counters),
+            error=self.error,
+        )
+
+
+class MetricsClass():
+    """
+    Writes call records to the configured sinks: one JSON line per call, a Prometheus text file with running totals
+    (for the node_exporter textfile collector) and one cProfile dump per call. All sinks are off until configured,
+    so plain library calls leave no files behind.
+    """
+
+    def __init__(self, jsonl_path=None, prometheus_path=None, profile_dir=None):
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.profile_dir = profile_dir
+        self.totals = {}
+        self.lock = threading.Lock()
+
+
+    def emit(self, record):
+
+        with self.lock:
+            if self.jsonl_path:
+                _makedirs(self.jsonl_path)
+                with open(self.jsonl_path, 'a') as f:
+                    f.write(json.dumps(record.to_dict()) + '\n')
+
+            if self.prometheus_path:
+                self._update_totals(record)
+                self._write_prometheus()
+
+
+    def _update_totals(self, record):
+
+        totals = self.totals.setdefault(record.name, dict(calls=0, errors=0, seconds=0.0, stages={}, counters={}))
+        totals['calls'] += 1
+        totals['errors'] += record.error is not None
+        totals['seconds'] += record.duration
+
+        for stage, seconds in record.stages.items():
+            totals['stages'][stage] = totals['stages'].get(stage, 0.0) + seconds
+        for counter, value in record.counters.items():
+            totals['counters'][counter] = totals['counters'].get(counter, 0) + value
+
+
+    def _write_prometheus(self):
+
+        lines = [
+            '# HELP sdmx_client_calls_total Client calls.',
+            '# TYPE sdmx_client_calls_total counter',
+        ]
+        lines += [f'sdmx_client_calls_total{{call="{name}"}} {totals["calls"]}' for name, totals in self.totals.items()]
+
+        lines += [
+            '# HELP sdmx_client_errors_total Client calls that returned an error.',
+            '# TYPE sdmx_client_errors_total counter',
+        ]
+        lines += [f'sdmx_client_errors_total{{call="{name}"}} {totals["errors"]}' for name, totals in self.totals.items()]
+
+        lines += [
+            '# HELP sdmx_client_seconds_total Wall time of client calls.',
+            '# TYPE sdmx_client_seconds_total counter',
+        ]
+        lines += [f'sdmx_client_seconds_total{{call="{name}"}} {totals["seconds"]:.6f}' for name, totals in self.totals.items()]
+
+        lines += [
+            '# HELP sdmx_client_stage_seconds_total Time spent per stage of client calls.',
+            '# TYPE sdmx_client_stage_seconds_total counter',
+        ]
+        for name, totals in self.totals.items():
+            lines += [f'sdmx_client_stage_seconds_total{{call="{name}",stage="{stage}"}} {seconds:.6f}' for stage, seconds in totals['stages'].items()]
+
+        for name, totals in self.totals.items():
+            for counter, value in totals['counters'].items():
+                lines.append(f'sdmx_client_{counter}_total{{call="{name}"}} {value}')
+
+        # Write to a temporary file first so collectors never read a half-written file
+        _makedirs(self.prometheus_path)
+        temporary_path = f'{self.prometheus_path}.tmp'
+        with open(temporary_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(temporary_path, self.prometheus_path)
+
+
+def _makedirs(path):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+
+METRICS = MetricsClass()
+
+
+def configure(jsonl_path=None, prometheus_path=None, profile_dir=None):
+    """
+    Sets the sinks of the process-wide metrics. Arguments left at None keep their current value.
+    """
+    if jsonl_path is not None:
+        METRICS.jsonl_path = jsonl_path
+    if prometheus_path is not None:
+        METRICS.prometheus_path = prometheus_path
+    if profile_dir is not None:
+        METRICS.profile_dir = profile_dir
+
+
+@contextmanager
+def call(name):
+    """
+    Records one client call. Nested calls (e.g. load_* inside get_*) are part of the outer record.
+    """
+    if _current.get() is not None:
+        yield _current.get()
+        return
+
+    record = CallRecord(name)
+    token = _current.set(record)
+
+    profiler = None
+    if METRICS.profile_dir:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    start_time = time.perf_counter()
+
+    try:
+        yield record
+    except Exception as e:
+        record.error = str(e)
+        raise
+    finally:
+        record.duration = time.perf_counter() - start_time
+        _current.reset(token)
+
+        if profiler is not None:
+            profiler.disable()
+            os.makedirs(METRICS.profile_dir, exist_ok=True)
+            profiler.dump_stats(os.path.join(METRICS.profile_dir, f'{name}-{time.strftime("%Y%m%d-%H%M%S")}-{id(record):x}.prof'))
+
+        METRICS.emit(record)
+
+
+@contextmanager
+def stage(name):
+    """
+    Adds the time spent in the block to stage `name` of the current call. No-op outside a call.
+    """
+    record = _current.get()
+
+    if record is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record.add_time(name, time.perf_counter() - start_time)
+
+
+def count(name, value=1):
+    """
+    Adds `value` to counter `name` (e.g. bytes_received) of the current call.
+    """
+    record = _current.get()
+
+    if record is not None:
+        record.add(name, value)
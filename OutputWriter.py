@@ -0,0 +1,172 @@
+import importlib.util
+import os
+import re
+
+import pandas as pd
+
+
+# Formats written by default (save=True or answering the save prompt with y)
+DEFAULT_OUTPUTS = ('png', 'html', 'csv')
+
+OUTPUT_FORMATS = ('png', 'html', 'csv', 'parquet', 'feather')
+
+
+def _require_pyarrow():
+    if importlib.util.find_spec('pyarrow') is None:
+        raise ImportError("Parquet/Feather output requires pyarrow: pip install pyarrow")
+
+
+def _safe_name(name) -> str:
+    # Series and dataset names end up in paths, e.g. 'FX_USD,GBP_EUR' or '*'
+    return re.sub(r'[^A-Za-z0-9._=-]+', '-', str(name)).strip('-')
+
+
+class OutputWriterClass():
+    """
+    Writes a result in the requested formats. png/html/csv are files per call named after the request
+    (`path` plus extension). parquet/feather are datasets named after the series only (`dataset`), so re-runs
+    append new observations to the same dataset instead of creating new files:
+
+    - parquet: one file per series and year (output/<dataset>.parquet/series=<column>/year=<year>/data.parquet),
+      only partitions with new or revised observations are rewritten. Read with pd.read_parquet(path).
+    - feather: one uncompressed wide file by default, so readers can memory-map it
+      (pyarrow.feather.read_table(path, memory_map=True)).
+
+    New formats are added by subclassing with a `_write_<format>` method.
+    """
+
+    formats = OUTPUT_FORMATS
+
+    def __init__(self, parquet_compression='zstd', feather_compression='uncompressed', partition=True):
+        self.parquet_compression = parquet_compression
+        self.feather_compression = feather_compression
+        self.partition = partition
+
+
+    def write(self, df, outputs, path, dataset=None, fig=None) -> list:
+        """
+        Writes `df` (and `fig` for png/html) in each format of `outputs` and returns the written paths.
+        """
+        dataset_path = os.path.join(os.path.dirname(path), _safe_name(dataset or os.path.basename(path)))
+        written = []
+
+        for output in self.formats:
+            if output in outputs:
+                written.append(getattr(self, f'_write_{output}')(df, path, dataset_path, fig))
+
+        return written
+
+
+    def _write_png(self, df, path, dataset_path, fig):
+        fig.write_image(f"{path}.png")
+        return f"{path}.png"
+
+
+    def _write_html(self, df, path, dataset_path, fig):
+        fig.write_html(f"{path}.html")
+        return f"{path}.html"
+
+
+    def _write_csv(self, df, path, dataset_path, fig):
+        df.to_csv(f"{path}.csv", index=True)
+        return f"{path}.csv"
+
+
+    def _write_parquet(self, df, path, dataset_path, fig):
+
+        _require_pyarrow()
+
+        if not self.partition:
+            target = f"{dataset_path}.parquet"
+            _merge(df, target, pd.read_parquet).to_parquet(target, compression=self.parquet_compression)
+            return target
+
+        root = f"{dataset_path}.parquet"
+        index_name = df.index.name or 'TIME_PERIOD'
+
+        for column in df.columns:
+            series = df[column].dropna()
+
+            for year, observations in series.groupby(series.index.year):
+
+                folder = os.path.join(root, f"series={_safe_name(column)}", f"year={year}")
+                target = os.path.join(folder, "data.parquet")
+                os.makedirs(folder, exist_ok=True)
+
+                new = observations.rename('value').to_frame()
+                new.index.name = index_name
+
+                existing = _read_existing(new, target, pd.read_parquet)
+                merged = _combine(new, existing)
+
+                # A re-run mostly returns observations already stored; only partitions with new or revised rows are rewritten
+                if existing is not None and merged.equals(existing):
+                    continue
+
+                merged.to_parquet(target, compression=self.parquet_compression)
+
+        return root
+
+
+    def _write_feather(self, df, path, dataset_path, fig):
+
+        _require_pyarrow()
+
+        target = f"{dataset_path}.feather"
+        index_name = df.index.name or 'TIME_PERIOD'
+
+        def read_feather(existing_path):
+            return pd.read_feather(existing_path).set_index(index_name)
+
+        merged = _merge(df, target, read_feather)
+        merged.reset_index().to_feather(target, compression=self.feather_compression)
+
+        return target
+
+
+def _merge(new, target, read) -> pd.DataFrame:
+    """
+    Combines `new` with the data already stored at `target`: new values win, observations only stored keep their value.
+    """
+    return _combine(new, _read_existing(new, target, read))
+
+
+def _read_existing(new, target, read):
+    """
+    The data stored at `target` indexed like `new`, or None.
+    """
+    if not os.path.exists(target):
+        return None
+
+    existing = read(target)
+    existing.index = pd.DatetimeIndex(existing.index, name=new.index.name)
+
+    return existing
+
+
+def _combine(new, existing) -> pd.DataFrame:
+
+    if existing is None:
+        return new
+
+    return new.combine_first(existing)[list(dict.fromkeys(list(existing.columns) + list(new.columns)))]
+
+
+def read_parquet_dataset(path, series=None, years=None) -> pd.DataFrame:
+    """
+    Reads a partitioned parquet dataset written by OutputWriterClass back into a wide frame.
+    `series` and `years` restrict the partitions that are read.
+    """
+    _require_pyarrow()
+
+    filters = []
+    if series is not None:
+        filters.append(('series', 'in', [_safe_name(name) for name in series]))
+    if years is not None:
+        filters.append(('year', 'in', list(years)))
+
+    long = pd.read_parquet(path, filters=filters or None)
+    wide = long.reset_index().pivot(index=long.index.name or 'TIME_PERIOD', columns='series', values='value')
+    wide.columns = list(wide.columns)
+
+    return wide
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+import Metrics as metrics
+from PublicationCalendar import PublicationCalendarClass
+from SeriesCache import period_start, period_end
+from SeriesRegistry import REGISTRY
+
+
+# frequency -> resample rule; B is TARGET business days
+FREQUENCIES = {'D': 'D', 'B': 'D', 'W': 'W', 'M': 'M', 'Q': 'Q', 'Y': 'A'}
+
+FILL_POLICIES = ('ffill', 'none', 'interpolate')
+
+# Series built by a client method instead of a registry definition
+DERIVED_SERIES = {
+    'EONIA_ESTR': ('bbk', 'load_eonia_data'),
+}
+
+
+def _column_names(name, key, columns) -> list:
+    """
+    Panel column names: the series name, or for a family requested with a wildcard (e.g. 'FX_*', key
+    'D..EUR.SP00.A') one name per member ('FX_USD', 'FX_GBP', ...) built from the wildcard position of the keys.
+    """
+    if len(columns) == 1 or isinstance(key, dict) or '*' not in name:
+        return [name] if len(columns) == 1 else [f'{name}_{column}' for column in columns]
+
+    position = key.split('.').index('')
+    prefix, suffix = name.split('*')
+
+    return [f"{prefix}{str(column).split('.')[position]}{suffix}" for column in columns]
+
+
+def align(frames, startPeriod=None, endPeriod=None, frequency='B', fill='ffill', limit=None, how='last') -> pd.DataFrame:
+    """
+    Aligns `frames` (DatetimeIndex, any frequency) into one wide frame on a common calendar. All columns are placed on
+    the union of their dates in one pass (one sorted index, one float64 matrix), then converted to `frequency` with
+    one resample over the whole matrix (`how` aggregates the observations within a period) and filled:
+    - ffill: the last observation is carried forward, at most `limit` periods
+    - none: periods without an observation stay empty
+    - interpolate: linear in time between observations, at most `limit` periods
+    """
+    if frequency not in FREQUENCIES:
+        raise Exception(f"Invalid frequency: {frequency}. Valid values are: {list(FREQUENCIES)}")
+    if fill not in FILL_POLICIES:
+        raise Exception(f"Invalid fill policy: {fill}. Valid values are: {list(FILL_POLICIES)}")
+
+    columns = [column for frame in frames for column in frame.columns]
+    if len(set(columns)) != len(columns):
+        raise Exception(f"Duplicate panel columns: {sorted({column for column in columns if columns.count(column) > 1})}")
+
+    with metrics.stage('transform'):
+
+        # Union of all dates as int64 nanoseconds, then every column is scattered into its rows
+        dates = [frame.index.asi8 for frame in frames]
+        union = np.unique(np.concatenate(dates)) if dates else np.array([], dtype='int64')
+        matrix = np.full((len(union), len(columns)), np.nan)
+
+        position = 0
+        for frame, frame_dates in zip(frames, dates):
+            rows = np.searchsorted(union, frame_dates)
+            matrix[rows, position:position + len(frame.columns)] = frame.to_numpy(dtype='float64')
+            position += len(frame.columns)
+
+        panel = pd.DataFrame(matrix, index=pd.DatetimeIndex(union.view('datetime64[ns]'), name='TIME_PERIOD'), columns=columns)
+
+        if panel.empty:
+            return panel
+
+        panel = panel.resample(FREQUENCIES[frequency]).agg(how)
+
+        if fill == 'ffill':
+            panel = panel.ffill(limit=limit)
+        elif fill == 'interpolate':
+            panel = panel.interpolate(method='time', limit=limit, limit_area='inside')
+
+        if frequency == 'B':
+            # TARGET business days, weekends and closing days dropped
+            panel = panel.reindex(pd.date_range(panel.index[0], panel.index[-1], freq=PublicationCalendarClass().business_day, name='TIME_PERIOD'))
+
+        start = period_start(startPeriod) if startPeriod is not None else panel.index[0]
+        end = period_end(endPeriod) if endPeriod is not None else panel.index[-1]
+
+        return panel.loc[start:end]
+
+
+class PanelBuilderClass():
+    """
+    Builds one date-indexed panel from any set of series of the registry (see SeriesRegistry.py), plus the spliced
+    'EONIA_ESTR'. Series of all sources are fetched with as few requests as possible through the clients' caches
+    (and series stores), then aligned on one calendar:
+
+        panel = PanelBuilderClass(ecb, bbk).build(['HICP', 'YC_SR_10Y', 'FX_USD', 'EURIBOR3M', 'EONIA_ESTR'], '2015-01', '2023-12', frequency='M')
+    """
+
+    def __init__(self, ecb_client, bbk_client, registry=None):
+        self.clients = dict(ecb=ecb_client, bbk=bbk_client)
+        self.registry = registry or REGISTRY
+
+
+    def build(self, names, startPeriod="1980-01-01", endPeriod="2099-12-31", frequency='B', fill='ffill', limit=None, how='last') -> pd.DataFrame:
+
+        if isinstance(names, str):
+            names = names.split(',')
+        names = list(dict.fromkeys(name.strip() for name in names if name.strip()))
+
+        frames = dict.fromkeys(names)
+
+        # Registry series, one fetch per source
+        by_source = {}
+        for name in names:
+            if name not in DERIVED_SERIES:
+                by_source.setdefault(self.registry.get(name)['source'], []).append(name)
+
+        for source, source_names in by_source.items():
+            client = self.clients[source.lower()]
+            fetched = self.registry.fetch(client.cache, client.ecb, client.engine, source_names, startPeriod, endPeriod, store=client.store)
+
+            for name in source_names:
+                frame = fetched[name]
+                frames[name] = frame.set_axis(_column_names(name, self.registry.get(name)['key'], frame.columns), axis=1)
+
+        for name in names:
+            if name in DERIVED_SERIES:
+                client_name, method = DERIVED_SERIES[name]
+                frames[name] = getattr(self.clients[client_name], method)(startPeriod, endPeriod)
+
+        return align([frames[name] for name in names], startPeriod, endPeriod, frequency, fill, limit, how)
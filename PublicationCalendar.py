@@ -0,0 +1,112 @@
+import datetime
+
+import pandas as pd
+from pandas.tseries.holiday import AbstractHolidayCalendar, EasterMonday, GoodFriday, Holiday
+from pandas.tseries.offsets import CustomBusinessDay
+
+
+class TARGETCalendar(AbstractHolidayCalendar):
+    """
+    TARGET2 closing days; the ECB and the Bundesbank publish no new daily observations on these days.
+    """
+    rules = [
+        Holiday('New Year', month=1, day=1),
+        GoodFriday,
+        EasterMonday,
+        Holiday('Labour Day', month=5, day=1),
+        Holiday('Christmas Day', month=12, day=25),
+        Holiday('Boxing Day', month=12, day=26),
+    ]
+
+
+class DailyRelease():
+    """
+    A release at `time` (Frankfurt) on every TARGET business day.
+    """
+
+    def __init__(self, time):
+        self.time = time
+
+
+    def days(self, start, business_day):
+        """
+        Release days from `start` on.
+        """
+        day = business_day.rollforward(start)
+
+        while True:
+            yield day
+            day = day + business_day
+
+
+class MonthlyRelease():
+    """
+    Releases at `time` (Frankfurt) on the given days of every month; a day that is no TARGET business day moves
+    to the next one.
+    """
+
+    def __init__(self, days_of_month, time):
+        self.days_of_month = sorted(days_of_month)
+        self.time = time
+
+
+    def days(self, start, business_day):
+        """
+        Release days from `start` on.
+        """
+        month = start.to_period('M')
+
+        while True:
+            for day_of_month in self.days_of_month:
+                day = business_day.rollforward(month.start_time + pd.Timedelta(days=day_of_month - 1))
+                if day >= start:
+                    yield day
+            month += 1
+
+
+# (source, dataflow) -> release rule
+RELEASE_RULES = {
+    ('ECB', 'EXR'): DailyRelease(datetime.time(16, 0)),     # euro foreign exchange reference rates, around 16:00 CET
+    ('ECB', 'YC'): DailyRelease(datetime.time(12, 0)),      # euro area yield curves, noon for the previous business day
+    # HICP: flash estimate around the turn of the month, full release with the index around the 17th
+    ('ECB', 'ICP'): MonthlyRelease([1, 17], datetime.time(11, 0)),
+    ('BBK', 'BBK01'): DailyRelease(datetime.time(12, 0)),   # money market rates, after the 11:00 Euribor fixing
+    ('BBK', 'BBMMB'): DailyRelease(datetime.time(9, 0)),    # €STR, published at 08:00 CET by the ECB
+}
+
+DEFAULT_RELEASE_RULE = DailyRelease(datetime.time(12, 0))
+
+
+class PublicationCalendarClass():
+    """
+    Next publication time of a dataflow, used to expire cached answers exactly when new data can appear
+    instead of after a fixed interval. `lag` covers the delay until the new observations reach the API.
+    """
+
+    def __init__(self, release_rules=RELEASE_RULES, lag=datetime.timedelta(minutes=15), timezone='Europe/Berlin'):
+        self.release_rules = release_rules
+        self.lag = pd.Timedelta(lag)
+        self.timezone = timezone
+        self.business_day = CustomBusinessDay(calendar=TARGETCalendar())
+
+
+    def next_release(self, source, flow, after=None) -> pd.Timestamp:
+        """
+        First release time (plus lag) of `flow` after `after` (default: now), timezone-aware.
+        """
+        after = pd.Timestamp.now(tz=self.timezone) if after is None else pd.Timestamp(after).tz_convert(self.timezone)
+        rule = self.release_rules.get((source, flow), DEFAULT_RELEASE_RULE)
+
+        for day in rule.days(after.normalize().tz_localize(None), self.business_day):
+            release = pd.Timestamp.combine(day.date(), rule.time).tz_localize(self.timezone) + self.lag
+            if release > after:
+                return release
+
+
+    def ttl(self, series, now=None) -> float:
+        """
+        Seconds until the first of the (source, flow) pairs in `series` publishes new data.
+        """
+        now = pd.Timestamp.now(tz=self.timezone) if now is None else pd.Timestamp(now).tz_convert(self.timezone)
+
+        return min((self.next_release(source, flow, now) - now).total_seconds() for source, flow in series)
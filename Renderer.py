@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _start_worker():
+    import plotly.graph_objects as go
+    import plotly.io as pio
+
+    # Starts this worker's kaleido/Chromium subprocess once; it then serves every figure the worker renders
+    pio.to_image(go.Figure(), format='png')
+
+
+def _render(figure_json, path, outputs) -> list:
+    import plotly.io as pio
+
+    fig = pio.from_json(figure_json)
+    written = []
+
+    if 'png' in outputs:
+        fig.write_image(f"{path}.png")
+        written.append(f"{path}.png")
+    if 'html' in outputs:
+        fig.write_html(f"{path}.html")
+        written.append(f"{path}.html")
+
+    return written
+
+
+class RendererClass():
+    """
+    Exports figures to PNG/HTML on a pool of worker processes, each keeping one kaleido renderer warm.
+    Figures are built by the caller and sent to the workers as plotly JSON, so fetching and figure building
+    continue while earlier figures are still being rendered.
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.executor = None
+        self.pending = []
+
+
+    def submit(self, fig, path, outputs):
+        """
+        Queues `fig` for export to `path`.png / .html (`outputs` out of 'png', 'html') and returns the future.
+        """
+        if self.executor is None:
+            # spawn: the workers must not inherit locks held by the fetch threads of this process
+            self.executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('spawn'), initializer=_start_worker)
+
+        future = self.executor.submit(_render, fig.to_json(), path, sorted(set(outputs) & {'png', 'html'}))
+        self.pending.append((path, future))
+
+        return future
+
+
+    def wait(self) -> dict:
+        """
+        Waits for all queued figures. Returns {path: written files or the exception raised while rendering}.
+        """
+        results = {}
+
+        for path, future in self.pending:
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                results[path] = e
+
+        self.pending = []
+
+        return results
+
+
+    def render(self, figures) -> dict:
+        """
+        Renders a list of (fig, path, outputs) in parallel, see wait().
+        """
+        for fig, path, outputs in figures:
+            self.submit(fig, path, outputs)
+
+        return self.wait()
+
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
@@ -0,0 +1,145 @@
+import hashlib
+import io
+import json
+import os
+from urllib.parse import urlsplit
+
+import requests
+from urllib3 import HTTPResponse
+
+from Transport import TransportClass
+
+
+# Not part of the fixture key: a replayed query answers conditional requests from the recorded ETag instead
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+
+class FixtureMissing(Exception):
+    pass
+
+
+class FixtureStoreClass():
+    """
+    Raw HTTP responses on disk, one <name>.json (URL, status, headers) plus <name>.body per request.
+    Names start with the dataflow (or structure resource) of the query, e.g. 'BBK01_3f2a9c01d4e7.json'.
+    """
+
+    def __init__(self, folder_name="fixtures"):
+        self.folder_name = folder_name
+
+
+    def name(self, request) -> str:
+
+        identity = f"{request.method} {request.url} {request.headers.get('Accept', '')}"
+        digest = hashlib.sha1(identity.encode()).hexdigest()[:12]
+
+        # .../data/<flow>/<key>?... for data queries, .../<resource>/<agency>/<id>/... for structures
+        segments = urlsplit(request.url).path.strip('/').split('/')
+        if 'data' in segments and segments.index('data') + 1 < len(segments):
+            prefix = segments[segments.index('data') + 1]
+        else:
+            prefix = next((segment for segment in segments if segment.endswith('structure') or segment.endswith('scheme')), 'request')
+
+        return f"{prefix}_{digest}"
+
+
+    def save(self, request, response, body):
+
+        os.makedirs(self.folder_name, exist_ok=True)
+        name = self.name(request)
+
+        with open(os.path.join(self.folder_name, f"{name}.body"), 'wb') as f:
+            f.write(body)
+
+        with open(os.path.join(self.folder_name, f"{name}.json"), 'w') as f:
+            json.dump(dict(url=request.url, status=response.status_code, headers=dict(response.headers)), f, indent=1)
+
+
+    def load(self, request):
+
+        name = self.name(request)
+        path = os.path.join(self.folder_name, name)
+
+        if not os.path.exists(f"{path}.json"):
+            raise FixtureMissing(f"No recorded response for {request.url} in {self.folder_name}/; record it with --record {self.folder_name}")
+
+        with open(f"{path}.json") as f:
+            meta = json.load(f)
+        with open(f"{path}.body", 'rb') as f:
+            body = f.read()
+
+        return meta, body
+
+
+def _response(request, status, headers, body, stream) -> requests.Response:
+    """
+    Builds a requests.Response around stored bytes that behaves like a network response, streamed or not.
+    """
+    # The body is stored decoded
+    headers = {name: value for name, value in headers.items() if name.lower() not in ('content-encoding', 'transfer-encoding', 'content-length')}
+
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers)
+    response.url = request.url
+    response.request = request
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    response.raw = HTTPResponse(io.BytesIO(body), headers=headers, status=status, preload_content=False)
+
+    if not stream:
+        response.content
+
+    return response
+
+
+def _without_conditional_headers(request):
+
+    request = request.copy()
+    for name in CONDITIONAL_HEADERS:
+        request.headers.pop(name, None)
+
+    return request
+
+
+class RecordingTransportClass(TransportClass):
+    """
+    TransportClass that saves every response to a FixtureStoreClass. Conditional headers are dropped while
+    recording, so fixtures always hold complete answers.
+    """
+
+    def __init__(self, folder_name="fixtures", **kwargs):
+        super().__init__(**kwargs)
+        self.store = FixtureStoreClass(folder_name)
+
+
+    def send(self, request, **kwargs):
+
+        request = _without_conditional_headers(request)
+        stream = kwargs.pop('stream', False)
+
+        response = super().send(request, stream=False, **kwargs)
+        self.store.save(request, response, response.content)
+
+        return _response(request, response.status_code, response.headers, response.content, stream)
+
+
+class ReplayTransportClass(requests.Session):
+    """
+    Serves recorded responses from a FixtureStoreClass without network access. Raises FixtureMissing for
+    queries that were not recorded. Conditional requests matching the recorded ETag get 304 Not Modified.
+    """
+
+    def __init__(self, folder_name="fixtures"):
+        super().__init__()
+        self.store = FixtureStoreClass(folder_name)
+
+
+    def send(self, request, **kwargs):
+
+        meta, body = self.store.load(_without_conditional_headers(request))
+        etag = meta['headers'].get('ETag')
+
+        if etag and request.headers.get('If-None-Match') == etag:
+            return _response(request, 304, dict(ETag=etag), b'', kwargs.get('stream', False))
+
+        return _response(request, meta['status'], meta['headers'], body, kwargs.get('stream', False))
@@ -0,0 +1,175 @@
+import csv
+import io
+import math
+from array import array
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import sdmx
+from sdmx.reader import get_reader_for_content_type
+
+import Metrics as metrics
+from helperFunctions import to_frame
+
+
+CSV_MEDIA_TYPE = 'application/vnd.sdmx.data+csv'
+CSV_ACCEPT = f'{CSV_MEDIA_TYPE};version=1.0.0'
+
+# Sources that answered 406 Not Acceptable to SDMX-CSV; they are asked for SDMX-ML right away
+XML_ONLY_SOURCES = set()
+
+
+def prepare(client, flow, key, params, headers=None):
+    """
+    Builds the data query of client.data() without sending it, asking for SDMX-CSV where the source accepts it.
+    `headers` is a dict or a callable returning extra headers for the request URL.
+    """
+    request = client.data(flow, key=key, params=params, dry_run=True)
+    request.headers.update((headers(request.url) if callable(headers) else headers) or {})
+
+    if client.source.id not in XML_ONLY_SOURCES:
+        request.headers['Accept'] = CSV_ACCEPT
+
+    return request
+
+
+def send(client, flow, key, params, headers=None):
+    """
+    Sends the data query of client.data() and returns the response. SDMX-CSV is requested where the source
+    accepts it; the body is then left unread (stream=True) so read_frame can parse it while it arrives.
+    """
+    request = prepare(client, flow, key, params, headers)
+    use_csv = request.headers['Accept'] == CSV_ACCEPT
+
+    response = client.session.send(request, stream=use_csv)
+
+    if use_csv and response.status_code == 406:
+        response.close()
+        XML_ONLY_SOURCES.add(client.source.id)
+        return send(client, flow, key, params, headers)
+
+    return response
+
+
+def read_frame(response, chunk_rows=100000) -> pd.DataFrame:
+    """
+    Parses a data response into a wide frame (one column per series key, e.g. 'D.USD.EUR.SP00.A').
+    SDMX-CSV is read incrementally into column arrays; other content types go through the sdmx reader.
+    """
+    if response.headers.get('content-type', '').startswith(CSV_MEDIA_TYPE):
+        chunks = [
+            pd.DataFrame(dict(series=series, period=periods, value=np.frombuffer(values, dtype='float64')))
+            for series, periods, values in iter_csv_columns(response, chunk_rows)
+        ]
+        metrics.count('bytes_received', response.raw.tell())
+
+        with metrics.stage('to_pandas'):
+            return columns_to_frame(chunks)
+
+    metrics.count('bytes_received', len(response.content))
+
+    with metrics.stage('parse'):
+        reader = get_reader_for_content_type(response.headers.get('content-type'))()
+        message = reader.read_message(BytesIO(response.content))
+
+    if not message.data:
+        return pd.DataFrame()
+
+    with metrics.stage('to_pandas'):
+        return to_frame(sdmx.to_pandas(message.data[0], datetime="TIME_PERIOD"))
+
+
+def iter_csv_columns(response, chunk_rows=100000):
+    """
+    Reads SDMX-CSV from the still open `response` and yields (series, periods, values) column arrays of at most
+    `chunk_rows` observations. Series names are shared per key, values are packed doubles.
+    """
+    with metrics.stage('parse'):
+        response.raw.decode_content = True
+        # Otherwise urllib3 closes the stream after the last byte, before TextIOWrapper has seen the end of it
+        response.raw.auto_close = False
+        rows = csv.reader(io.TextIOWrapper(response.raw, encoding=response.encoding or 'utf-8', newline=''))
+
+        header = next(rows, None)
+        if header is None:
+            return
+
+        # Columns: DATAFLOW, the dimensions in DSD order, TIME_PERIOD, OBS_VALUE, attributes
+        time_column = header.index('TIME_PERIOD')
+        value_column = header.index('OBS_VALUE')
+
+        names = {}
+        series, periods, values = [], [], array('d')
+
+    while True:
+        with metrics.stage('parse'):
+            for row in rows:
+                if not row:
+                    continue
+
+                dimensions = tuple(row[1:time_column])
+                name = names.get(dimensions)
+                if name is None:
+                    name = names[dimensions] = '.'.join(dimensions)
+
+                series.append(name)
+                periods.append(row[time_column])
+                values.append(float(row[value_column]) if row[value_column] else math.nan)
+
+                if len(values) >= chunk_rows:
+                    break
+            else:
+                row = None
+                response.close()
+
+        if values:
+            yield series, periods, values
+            series, periods, values = [], [], array('d')
+
+        if row is None:
+            return
+
+
+def columns_to_frame(chunks) -> pd.DataFrame:
+    """
+    Pivots the long (series, period, value) chunks of iter_csv_columns into one wide frame.
+    """
+    if not chunks:
+        return pd.DataFrame()
+
+    long = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+
+    return to_frame(long.pivot(index='period', columns='series', values='value'))
+
+
+def iter_chunks(client, flow, key, startPeriod, endPeriod, freq='YS', chunk_rows=100000):
+    """
+    Yields the series of one query as consecutive wide frames, one request per period window (pandas offset
+    alias `freq`, default one calendar year), so a large panel can be written to disk chunk by chunk:
+
+        for i, chunk in enumerate(iter_chunks(client, 'EXR', 'D..EUR.SP00.A', '1999-01', '2023-12')):
+            chunk.to_csv(path, mode='a', header=i == 0)
+
+    Columns can differ between chunks when series start or end within the period.
+    """
+    start = pd.Period(startPeriod).start_time if isinstance(startPeriod, str) else pd.Timestamp(startPeriod)
+    end = pd.Period(endPeriod).end_time.normalize() if isinstance(endPeriod, str) else pd.Timestamp(endPeriod)
+
+    boundaries = [start] + [boundary for boundary in pd.date_range(start, end, freq=freq) if boundary > start]
+
+    for window_start, next_start in zip(boundaries, boundaries[1:] + [end + pd.Timedelta(days=1)]):
+
+        params = dict(startPeriod=window_start.strftime('%Y-%m-%d'), endPeriod=(next_start - pd.Timedelta(days=1)).strftime('%Y-%m-%d'))
+
+        with metrics.stage('fetch'):
+            response = send(client, flow, key, params)
+
+        if response.status_code == 404:
+            response.close()
+            continue
+        response.raise_for_status()
+
+        frame = read_frame(response, chunk_rows)
+        if not frame.empty:
+            yield frame
@@ -0,0 +1,120 @@
+import time
+import traceback
+
+import pandas as pd
+
+import Metrics as metrics
+from BatchRunner import BatchRunnerClass, DATASETS, _call, read_job_file
+from PublicationCalendar import PublicationCalendarClass
+
+
+# The queries init.py runs without options, so they are answered from warm data
+DEFAULT_JOBS = dict(jobs=[
+    dict(dataset='inflation'),
+    dict(dataset='yield', shortterm='3M', longterm='10Y'),
+    dict(dataset='term_structure'),
+    dict(dataset='fx', currency='USD'),
+    dict(dataset='euribor', shortterm='3M'),
+    dict(dataset='eonia'),
+])
+
+
+class SchedulerClass():
+    """
+    Keeps the data of a set of jobs (batch job file format, see BatchRunner.py) warm: right after each publication
+    of a dataflow (PublicationCalendarClass), the jobs reading it are run once, so new observations are already
+    in the series cache, and in the series store of the clients if they have one, when an interactive query asks
+    for them.
+    """
+
+    def __init__(self, ecb_client, bbk_client, engine, jobs=None, calendar=None):
+        self.runner = BatchRunnerClass(ecb_client, bbk_client, engine)
+        self.calendar = calendar or PublicationCalendarClass()
+
+        if isinstance(jobs, str):
+            jobs = read_job_file(jobs)
+
+        self.jobs = self.runner.expand_jobs(jobs or DEFAULT_JOBS)
+        # job name -> (source, flow) pairs it reads
+        self.flows = {job['name']: self._job_flows(job) for job in self.jobs}
+
+
+    def next_releases(self, now=None) -> dict:
+        """
+        (source, flow) -> next publication of every dataflow read by the jobs.
+        """
+        flows = dict.fromkeys(flow for job_flows in self.flows.values() for flow in job_flows)
+        return {(source, flow): self.calendar.next_release(source, flow, now) for source, flow in flows}
+
+
+    def warm(self, flows=None) -> pd.DataFrame:
+        """
+        Revalidates the dataflows `flows` ((source, flow) pairs; all if None) and runs the jobs reading them.
+        Returns one row per job with the number of rows and the last observation.
+        """
+        jobs = [job for job in self.jobs if flows is None or set(self.flows[job['name']]) & set(flows)]
+
+        with metrics.call('scheduled_warm_up'):
+
+            for job in jobs:
+                client = self.runner.clients[DATASETS[job['dataset']][0]]
+                for source, flow in self.flows[job['name']]:
+                    client.cache.expire(source, flow)
+
+            self.runner.prefetch(self.runner.plan(jobs))
+
+            summary = []
+
+            for job in jobs:
+                client_name, _, load_method, _ = DATASETS[job['dataset']]
+
+                try:
+                    # Reads from the warm cache and fills the series store
+                    df = _call(getattr(self.runner.clients[client_name], load_method), startPeriod=job['begin'], endPeriod=job['end'], **job)
+                    summary.append(dict(job=job['name'], rows=len(df), last=df.index.max() if len(df) else None, error=None))
+
+                except Exception as e:
+                    print(f"Job {job['name']} failed: {e}\nTraceback: {traceback.format_exc()}")
+                    summary.append(dict(job=job['name'], rows=0, last=None, error=str(e)))
+
+        return pd.DataFrame(summary, columns=['job', 'rows', 'last', 'error']).set_index('job')
+
+
+    def run(self, cycles=None):
+        """
+        Warms all jobs, then waits for the next publication and warms the jobs of the published dataflows,
+        `cycles` times (forever if None).
+        """
+        print(self.warm())
+
+        cycle = 0
+
+        while cycles is None or cycle < cycles:
+
+            releases = self.next_releases()
+            due = min(releases.values())
+            flows = [flow for flow, release in releases.items() if release == due]
+
+            print(f"Next warm-up at {due:%Y-%m-%d %H:%M %Z}: {', '.join(f'{source} {flow}' for source, flow in flows)}")
+            self._sleep_until(due)
+
+            print(self.warm(flows))
+            cycle += 1
+
+
+    def _sleep_until(self, due):
+
+        while True:
+            remaining = (due - pd.Timestamp.now(tz=due.tz)).total_seconds()
+            if remaining <= 0:
+                return
+            # Short naps, so a suspended machine catches up soon after waking
+            time.sleep(min(remaining, 60))
+
+
+    def _job_flows(self, job) -> list:
+
+        client_name, series_method, _, _ = DATASETS[job['dataset']]
+        client = self.runner.clients[client_name]
+
+        return client.registry.flows(_call(getattr(client, series_method), **job))
@@ -0,0 +1,593 @@
+import sqlite3
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import partial
+
+import pandas as pd
+from requests.exceptions import HTTPError
+
+import Metrics as metrics
+from helperFunctions import to_frame
+from SDMXStream import send, read_frame
+from FetchEngine import SingleFlightClass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    source TEXT NOT NULL,
+    flow TEXT NOT NULL,
+    key TEXT NOT NULL,
+    series TEXT NOT NULL,
+    period TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (source, flow, key, series, period)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    source TEXT NOT NULL,
+    flow TEXT NOT NULL,
+    key TEXT NOT NULL,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    checked REAL NOT NULL,
+    PRIMARY KEY (source, flow, key)
+);
+CREATE TABLE IF NOT EXISTS validators (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT
+);
+"""
+
+DATE_FORMAT = '%Y-%m-%d'
+
+# Coverage start of a key whose whole history was downloaded (sources without period parameters)
+HISTORY_START = pd.Timestamp('1900-01-01')
+
+
+def key_to_str(key) -> str:
+    if isinstance(key, dict):
+        # List values select several codes, as in 'DATA_TYPE_FM=SR_2Y+SR_10Y'
+        return ','.join(f'{dim}={"+".join(key[dim]) if isinstance(key[dim], (list, tuple)) else key[dim]}' for dim in sorted(key))
+    return str(key)
+
+
+def period_start(period) -> pd.Timestamp:
+    if isinstance(period, str):
+        return pd.Period(period).start_time
+    return pd.Timestamp(period)
+
+
+def period_end(period) -> pd.Timestamp:
+    # '2021-12' covers the whole of December, as it does for the SDMX endPeriod parameter
+    if isinstance(period, str):
+        return pd.Period(period).end_time
+    return pd.Timestamp(period)
+
+
+def merge_periods(periods) -> list:
+    """
+    Union of (first, last) periods as sorted, non-overlapping periods.
+    """
+    merged = []
+
+    for first, last in sorted(periods):
+        if merged and first <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], last))
+        else:
+            merged.append((first, last))
+
+    return merged
+
+
+class SeriesCacheClass():
+    """
+    Persistent SQLite store of SDMX observations keyed by (source, dataflow, series key).
+    Only the part of a requested period that is not covered yet is downloaded; the rest is served from disk.
+
+    Concurrent calls in one process are coalesced: identical calls share one download and one parsed result,
+    and calls for other periods of a key that is being downloaded are downloaded together afterwards, as one
+    request covering the union of their periods.
+
+    Several series of a dataflow can be downloaded with one merged request (SDMX OR syntax, e.g. 'ST0316+ST0343',
+    see download); their observations are still stored and covered under each series' own key.
+    """
+
+    def __init__(self, folder_name="output", max_age=3600, engine=None):
+        self.path = os.path.join(folder_name, "series_cache.sqlite")
+        self.max_age = max_age
+        # FetchEngineClass running batches of nested reads concurrently (see _run); without one they run in turn
+        self.engine = engine
+        # (source, parameter) pairs an endpoint rejected; those queries are filtered client-side instead
+        self.unsupported_params = set()
+
+        self.flights = SingleFlightClass()
+        # (source, flow, key) -> lock serializing downloads of the key, and the periods waiting for it
+        self.key_locks = {}
+        self.demands = {}
+        self.demands_lock = threading.Lock()
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+    def get(self, client, flow, key, startPeriod, endPeriod) -> pd.DataFrame:
+
+        source = client.source.id
+        key_id = key_to_str(key)
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+
+        frame, shared = self.flights.do((source, flow, key_id, start, end), partial(self._get, client, flow, key, start, end))
+
+        if shared:
+            metrics.count('coalesced')
+            # Callers relabel and extend their frames, so each gets its own copy
+            return frame.copy()
+
+        return frame
+
+
+    def _get(self, client, flow, key, start, end) -> pd.DataFrame:
+
+        self._sync(client, flow, key, start, end)
+
+        with metrics.stage('cache_read'):
+            return self._load(client.source.id, flow, key_to_str(key), start, end)
+
+
+    def missing(self, client, flow, key, startPeriod, endPeriod) -> bool:
+        """
+        Whether a get of the period would download anything for `key`.
+        """
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+
+        return bool(self._missing_periods(client.source.id, flow, key_to_str(key), start, end, pd.Timestamp.now().normalize()))
+
+
+    def download(self, client, flow, key, startPeriod, endPeriod, members=None):
+        """
+        Downloads what the store is missing of the period without reading it back. With `members` ({series key:
+        function selecting its columns of a frame of `key`}), `key` is a merged request for those series, e.g.
+        'ST0316+ST0343': only the periods some member is missing are requested, and every member is stored and
+        covered under its own key, where get finds it.
+        """
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+
+        self._sync(client, flow, key, start, end, members and {key_to_str(member): select for member, select in members.items()})
+
+
+    def _sync(self, client, flow, key, start, end, members=None):
+        """
+        Downloads what the store is missing of [start, end]. Runs one call per key at a time; the periods of
+        calls that queued up meanwhile are downloaded by the next of them in one go, as their union.
+        """
+        identity = (client.source.id, flow, key_to_str(key))
+        demand = [start, end]
+
+        key_lock = self._queue_demand(identity, demand, self.key_locks, threading.Lock)
+
+        with key_lock, ExitStack() as member_locks:
+
+            pending = self._take_demands(identity, demand)
+            if pending is None:
+                return
+
+            for member_lock in self._member_locks(identity, members, self.key_locks, threading.Lock):
+                member_locks.enter_context(member_lock)
+
+            try:
+                self._run(client, self._download_missing_steps(client, flow, key, min(other[0] for other in pending), max(other[1] for other in pending), members))
+            except Exception:
+                self._requeue_demands(identity, demand, pending)
+                raise
+
+
+    def _queue_demand(self, identity, demand, locks, lock_type):
+        """
+        Queues `demand` for the key and returns the lock (of `lock_type`, kept in `locks`) serializing its downloads.
+        """
+        with self.demands_lock:
+            self.demands.setdefault(identity, []).append(demand)
+            return locks.setdefault(identity, lock_type())
+
+
+    def _member_locks(self, identity, members, locks, lock_type) -> list:
+        """
+        The download locks of the member keys of a merged request, in a fixed order. Holding them keeps a member
+        from being downloaded at the same time on its own or as part of another merged request.
+        """
+        source, flow, key_id = identity
+
+        with self.demands_lock:
+            return [locks.setdefault((source, flow, member), lock_type()) for member in sorted(members or {}) if member != key_id]
+
+
+    def _take_demands(self, identity, demand):
+        """
+        Returns all periods queued for the key, or None if `demand` was downloaded by an earlier call as part of its union.
+        """
+        with self.demands_lock:
+            pending = self.demands[identity]
+            if not any(other is demand for other in pending):
+                return None
+            self.demands[identity] = []
+
+        if len(pending) > 1:
+            metrics.count('merged_periods', len(pending) - 1)
+
+        return pending
+
+
+    def _requeue_demands(self, identity, demand, pending):
+        # After a failed download the queued calls retry their own periods
+        with self.demands_lock:
+            self.demands[identity].extend(other for other in pending if other is not demand)
+
+
+    def _run(self, client, steps):
+        """
+        Drives a *_steps generator. The generators contain the cache logic and yield their I/O: ('send', flow,
+        key, params, headers) for an HTTP request, answered with the response of SDMXStream.send,
+        ('get', flow, key, start, end) for a nested cached read, answered by get(), and ('batch', [gets]) for
+        independent nested reads, answered with the list of their results; a batch runs concurrently on the
+        engine. AsyncSeriesCacheClass drives the same generators on an event loop.
+        """
+        try:
+            request = next(steps)
+
+            while True:
+                kind, *args = request
+
+                if kind == 'send':
+                    with metrics.stage('fetch'):
+                        result = send(client, *args)
+                elif kind == 'batch':
+                    result = self._gather(client, args[0])
+                else:
+                    result = self.get(client, *args)
+
+                request = steps.send(result)
+
+        except StopIteration as stop:
+            return stop.value
+
+
+    def _gather(self, client, reads) -> list:
+
+        tasks = [(f'{flow} {key_to_str(key)}', partial(self.get, client, flow, key, start, end)) for _, flow, key, start, end in reads]
+
+        if self.engine is None or len(tasks) < 2:
+            return [func() for _, func in tasks]
+
+        return self.engine.run(tasks)
+
+
+    def _download_missing_steps(self, client, flow, key, start, end, members=None):
+
+        source = client.source.id
+        today = pd.Timestamp.now().normalize()
+        # A plain request is its own only member
+        members = members or {key_to_str(key): None}
+
+        needed = {member: self._missing_periods(source, flow, member, start, end, today) for member in members}
+
+        # Members downloaded together share their coverage, so they usually miss the same periods
+        for first, last in merge_periods(period for periods in needed.values() for period in periods):
+
+            frame = yield from self._download_steps(client, flow, key, first, last)
+            # Without period parameters the answer is the whole history, which covers every period of every member
+            full_history = (source, 'startPeriod') in self.unsupported_params
+
+            for member, select in members.items():
+
+                if not full_history and not any(first <= member_first and member_last <= last for member_first, member_last in needed[member]):
+                    continue
+
+                member_frame = frame if select is None or frame.empty else select(frame)
+                coverage = self._extended_coverage(self._coverage(source, flow, member), first, last, member_frame, today, full_history)
+                self._store(source, flow, member, member_frame, *coverage)
+
+            if full_history:
+                break
+
+
+    def _missing_periods(self, source, flow, key_id, start, end, today) -> list:
+        """
+        The periods of [start, end] to download for the key, each adjacent to its cached coverage.
+        """
+        coverage = self._coverage(source, flow, key_id)
+
+        if coverage is None:
+            return [(start, end)]
+
+        covered_start, covered_end, checked = coverage
+        periods = []
+
+        if start < covered_start:
+            periods.append((start, covered_start))
+
+        recently_checked = end >= today and time.time() - checked < self.max_age
+
+        if end > covered_end and not recently_checked:
+            # Re-request the last cached period as well so late revisions are picked up
+            periods.append((covered_end, end))
+
+        return periods
+
+
+    def _extended_coverage(self, coverage, first, last, frame, today, full_history=False) -> tuple:
+        """
+        (start, end, checked) of a coverage after downloading [first, last]. A period reaching the present is
+        covered up to its latest observation and marked as checked now. A `full_history` answer covers everything
+        up to its latest observation.
+        """
+        covered_start, covered_end, checked = coverage or (first, first, 0)
+        covered_start = min(covered_start, HISTORY_START if full_history else first)
+
+        if last < today:
+            covered_end = max(covered_end, last)
+
+        if last >= today or full_history:
+            checked = time.time()
+            if not frame.empty:
+                covered_end = max(covered_end, frame.index.max())
+
+        return covered_start, covered_end, checked
+
+
+    def expire(self, source, flow):
+        """
+        Marks the cached periods of `flow` that reach the present as unchecked, so the next get revalidates them
+        regardless of max_age, e.g. right after a publication. Spliced series of `source` are expired as well.
+        """
+        with self._connect() as conn:
+            conn.execute("UPDATE coverage SET checked=0 WHERE source=? AND flow IN (?, 'SPLICE') AND checked>0", (source, flow))
+
+
+    def get_last(self, client, flow, key, lastNObservations, members=None) -> pd.DataFrame:
+        """
+        The latest `lastNObservations` of `key`. With `members` (see download), each member's observations are
+        stored under its own key.
+        """
+        frame, shared = self.flights.do((client.source.id, flow, key_to_str(key), lastNObservations), partial(self._run, client, self._get_last_steps(client, flow, key, lastNObservations, members)))
+
+        if shared:
+            metrics.count('coalesced')
+            return frame.copy()
+
+        return frame
+
+
+    def _get_last_steps(self, client, flow, key, lastNObservations, members=None):
+
+        source = client.source.id
+        frame = yield from self._query_steps(client, flow, key, dict(lastNObservations=lastNObservations))
+
+        if (source, 'lastNObservations') in self.unsupported_params:
+            frame = frame.tail(lastNObservations)
+
+        for member, select in (members or {key_to_str(key): None}).items():
+            self._store(source, flow, key_to_str(member), frame if select is None or frame.empty else select(frame))
+
+        return frame
+
+
+    def get_spliced(self, client, name, segments, startPeriod, endPeriod) -> pd.DataFrame:
+        """
+        Returns the series `name` spliced from `segments`: (flow, key, first day, last day) tuples, each contributing
+        its observations between its first and last day. The spliced series is stored as series `name` of the
+        pseudo-dataflow 'SPLICE', so a query is a slice of the stored series; only periods not spliced yet are read
+        from the segments, which for an ongoing series means the new prints of its last segment.
+        """
+        return self._run(client, self._spliced_steps(client, name, segments, startPeriod, endPeriod))
+
+
+    def _spliced_steps(self, client, name, segments, startPeriod, endPeriod):
+
+        source = client.source.id
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+        today = pd.Timestamp.now().normalize()
+
+        coverage = self._coverage(source, 'SPLICE', name)
+
+        if coverage is None:
+            missing = [(start, end)]
+            covered_start, covered_end, checked = start, start, 0
+        else:
+            covered_start, covered_end, checked = coverage
+            missing = []
+
+            if start < covered_start:
+                missing.append((start, covered_start - pd.Timedelta(days=1)))
+
+            recently_checked = end >= today and time.time() - checked < self.max_age
+
+            if end > covered_end and not recently_checked:
+                # From the last spliced day on, so revisions of the latest print are picked up
+                missing.append((covered_end, end))
+
+        # The segment reads of all missing periods in one batch, so a cold query fetches EONIA and €STR concurrently
+        reads = [
+            (period, flow, key, max(missing_start, first_day), min(missing_end, last_day))
+            for period, (missing_start, missing_end) in enumerate(missing)
+            for flow, key, first_day, last_day in segments
+            if max(missing_start, first_day) <= min(missing_end, last_day)
+        ]
+        frames = (yield ('batch', [('get', flow, key, first, last) for _, flow, key, first, last in reads])) if reads else []
+
+        for period, (missing_start, missing_end) in enumerate(missing):
+
+            pieces = [
+                frame.iloc[:, 0].dropna().rename(name)
+                for (read_period, *_), frame in zip(reads, frames)
+                if read_period == period and not frame.empty
+            ]
+
+            spliced = pd.concat(pieces).to_frame() if pieces else pd.DataFrame()
+
+            covered_start = min(covered_start, missing_start)
+            if missing_end < today:
+                covered_end = max(covered_end, missing_end)
+            else:
+                checked = time.time()
+                if not spliced.empty:
+                    covered_end = max(covered_end, spliced.index.max())
+
+            self._store(source, 'SPLICE', name, spliced, covered_start, covered_end, checked)
+
+        with metrics.stage('cache_read'):
+            return self._load(source, 'SPLICE', name, start, end)
+
+
+    def _download_steps(self, client, flow, key, start, end):
+        """
+        Requests [start, end] of the key. Sources that reject period parameters return the whole history, which
+        is kept as a whole, so later periods are served from the store instead of downloading it again.
+        """
+        params = dict(startPeriod=start.strftime(DATE_FORMAT), endPeriod=end.strftime(DATE_FORMAT))
+        return (yield from self._query_steps(client, flow, key, params, conditional=True))
+
+
+    def _query_steps(self, client, flow, key, params, conditional=False):
+        """
+        Sends `params` to the server unless the source already rejected them once.
+        Callers filter locally when a parameter ends up in `unsupported_params`.
+        With `conditional`, an unchanged answer to a repeated query comes back as an empty frame (see _request_steps).
+        """
+
+        source = client.source.id
+
+        if any((source, name) in self.unsupported_params for name in params):
+            return (yield from self._request_steps(client, flow, key, {}))
+
+        try:
+            return (yield from self._request_steps(client, flow, key, params, conditional))
+        except HTTPError as e:
+            # 400 Bad Request or 501 Not Implemented: the endpoint may not know one of the parameters
+            if e.response is None or e.response.status_code not in (400, 501):
+                raise
+
+        # Only blame the parameters if the same query succeeds without them
+        df = yield from self._request_steps(client, flow, key, {})
+        print(f'{source} rejected {", ".join(params)}, falling back to local filtering.')
+        self.unsupported_params.update((source, name) for name in params)
+
+        return df
+
+
+    def _request_steps(self, client, flow, key, params, conditional=False):
+        """
+        Same steps as client.data(), split up so fetch, parse and to_pandas are timed separately; the answer is
+        streamed as SDMX-CSV where the source supports it (see SDMXStream).
+        With `conditional`, the ETag/Last-Modified of the previous answer to the same URL is sent along; on
+        304 Not Modified nothing is downloaded or parsed and an empty frame is returned, as everything the URL
+        returns is already stored. Only safe for URLs whose full answer is stored, hence off for local filtering.
+        """
+        response = yield ('send', flow, key, params, self._validators if conditional else None)
+
+        try:
+            response.raise_for_status()
+        except HTTPError as e:
+            # SDMX endpoints answer 404 when a period holds no observations
+            if e.response is not None and e.response.status_code == 404:
+                return pd.DataFrame()
+            raise
+
+        metrics.count('requests')
+
+        if response.status_code == 304:
+            metrics.count('not_modified')
+            return pd.DataFrame()
+
+        frame = read_frame(response)
+
+        if conditional:
+            self._save_validators(response.request.url, response.headers)
+
+        return frame
+
+
+    def _validators(self, url) -> dict:
+
+        with self._connect() as conn:
+            row = conn.execute("SELECT etag, last_modified FROM validators WHERE url=?", (url,)).fetchone()
+
+        headers = {}
+        if row is not None and row[0]:
+            headers['If-None-Match'] = row[0]
+        if row is not None and row[1]:
+            headers['If-Modified-Since'] = row[1]
+
+        return headers
+
+
+    def _save_validators(self, url, headers):
+
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+
+        if not (etag or last_modified):
+            return
+
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO validators VALUES (?, ?, ?)", (url, etag, last_modified))
+
+
+    def _coverage(self, source, flow, key_id):
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT start, end, checked FROM coverage WHERE source=? AND flow=? AND key=?",
+                (source, flow, key_id)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return pd.Timestamp(row[0]), pd.Timestamp(row[1]), row[2]
+
+
+    def _store(self, source, flow, key_id, frame, start=None, end=None, checked=None):
+
+        rows = []
+        if not frame.empty:
+            stacked = frame.stack().dropna()
+            for (period, series), value in stacked.items():
+                rows.append((source, flow, key_id, series, period.strftime(DATE_FORMAT), float(value)))
+
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO observations VALUES (?, ?, ?, ?, ?, ?)", rows)
+            if start is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?, ?)",
+                (source, flow, key_id, start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT), checked)
+            )
+
+
+    def _load(self, source, flow, key_id, start, end) -> pd.DataFrame:
+
+        with self._connect() as conn:
+            rows = pd.read_sql_query(
+                "SELECT period, series, value FROM observations "
+                "WHERE source=? AND flow=? AND key=? AND period BETWEEN ? AND ? ORDER BY period",
+                conn,
+                params=(source, flow, key_id, start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT))
+            )
+
+        return to_frame(rows.pivot(index='period', columns='series', values='value'))
@@ -0,0 +1,278 @@
+from functools import partial
+
+from SeriesCache import key_to_str
+
+
+# Spot-rate maturities of the YC dataflow (DATA_TYPE_FM=SR_<tenor>), ordered by maturity
+TERM_STRUCTURE_TENORS = ['3M', '6M', '9M'] + [f'{years}Y' for years in range(1, 31)]
+
+# Maturities of the yield curve and its spread (see ECBClientClass.yield_series)
+YIELD_SHORT_TERMS = ['3M', '6M', '9M', '1Y', '2Y']
+YIELD_LONG_TERMS = ['5Y', '10Y', '15Y', '20Y', '30Y']
+
+# Euribor maturity -> BBK01 series
+EURIBOR_KEYS = {
+    '1W': 'ST0307',
+    '1M': 'ST0310',
+    '3M': 'ST0316',
+    '6M': 'ST0325',
+    '9M': 'ST0334',
+    '12M': 'ST0343',
+}
+
+# name -> definition. Keys are SDMX key strings ('D.USD.EUR.SP00.A') or dimension dicts. A '{code}' placeholder
+# defines a family of series: 'FX_{code}' resolves 'FX_USD' to the key 'D.USD.EUR.SP00.A' ('FX_*': all currencies).
+SERIES = {
+    'HICP': dict(
+        source='ECB', flow='ICP', key=dict(ICP_ITEM="000000", FREQ="M", REF_AREA='U2', ICP_SUFFIX='INX', ADJUSTMENT='Y'),
+        frequency='M', unit='Index', description='HICP overall index, euro area, seasonally adjusted',
+    ),
+    **{
+        f'YC_SR_{tenor}': dict(
+            source='ECB', flow='YC', key=dict(REF_AREA='U2', INSTRUMENT_FM='G_N_A', DATA_TYPE_FM=f'SR_{tenor}'),
+            frequency='B', unit='Percent', description=f'Euro area government bond spot rate, {tenor}',
+        )
+        for tenor in TERM_STRUCTURE_TENORS
+    },
+    'FX_{code}': dict(
+        source='ECB', flow='EXR', key='D.{code}.EUR.SP00.A',
+        frequency='D', unit='Currency units per EUR', description='ECB euro foreign exchange reference rate',
+    ),
+    **{
+        f'EURIBOR{tenor}': dict(
+            source='BBK', flow='BBK01', key=key,
+            frequency='B', unit='Percent', description=f'Euribor {tenor}',
+        )
+        for tenor, key in EURIBOR_KEYS.items()
+    },
+    'EONIA': dict(
+        source='BBK', flow='BBK01', key='ST0304',
+        frequency='B', unit='Percent', description='EONIA, last published for 2021-12-31',
+    ),
+    'ESTR': dict(
+        source='BBK', flow='BBMMB', key='D.EU000A2X2A25.WT',
+        frequency='B', unit='Percent', description='Euro short-term rate (€STR)',
+    ),
+}
+
+
+def _key_parts(key) -> tuple:
+    # Dimension dicts are compared in sorted dimension order, key strings by position
+    if isinstance(key, dict):
+        return tuple(key[dimension] for dimension in sorted(key))
+    return tuple(key.split('.'))
+
+
+def _contains(wildcard, parts) -> bool:
+    # An empty code matches any code at its position, e.g. ('D', '', 'EUR', ...) contains ('D', 'USD', 'EUR', ...)
+    return all(code in ('', other) for code, other in zip(wildcard, parts))
+
+
+def _merge_keys(keys) -> list:
+    """
+    Merges keys that differ in one position only into one key with the codes joined by '+', e.g.
+    ('ST0316',), ('ST0343',) -> ('ST0316+ST0343',). Returns (merged parts, [original parts]) pairs.
+    """
+    remaining = [(parts, [parts]) for parts in dict.fromkeys(keys)]
+    merged = []
+
+    for position in range(len(keys[0]) if keys else 0):
+
+        groups = {}
+        for parts, members in remaining:
+            groups.setdefault(parts[:position] + parts[position + 1:], []).append((parts, members))
+
+        remaining = []
+        for group in groups.values():
+            if len(group) == 1:
+                remaining.extend(group)
+                continue
+
+            codes = '+'.join(parts[position] for parts, _ in group)
+            merged_parts = group[0][0][:position] + (codes,) + group[0][0][position + 1:]
+            merged.append((merged_parts, [member for _, members in group for member in members]))
+
+    return merged + remaining
+
+
+class SeriesRegistryClass():
+    """
+    Declarative series definitions (source, dataflow, key, frequency, unit) and a planner that turns a list of
+    series names into the minimal set of upstream requests: series of the same dataflow whose keys differ in one
+    dimension are fetched with one request using the SDMX OR syntax ('ST0316+ST0343', 'SR_2Y+SR_10Y').
+    New series only need a definition:
+
+        registry.register('EURIBOR2W', source='BBK', flow='BBK01', key='ST0308', frequency='B', unit='Percent')
+    """
+
+    def __init__(self, definitions=SERIES):
+        self.definitions = dict(definitions)
+
+
+    def register(self, name, source, flow, key, frequency=None, unit=None, description=None):
+        self.definitions[name] = dict(source=source, flow=flow, key=key, frequency=frequency, unit=unit, description=description)
+
+
+    def get(self, name) -> dict:
+        """
+        Returns the definition of `name`, resolving members of '{code}' families.
+        """
+        if name in self.definitions:
+            return self.definitions[name]
+
+        for family, definition in self.definitions.items():
+            if '{code}' not in family:
+                continue
+
+            prefix, suffix = family.split('{code}')
+            if name.startswith(prefix) and name.endswith(suffix) and len(name) > len(prefix) + len(suffix):
+                code = name[len(prefix):len(name) - len(suffix)]
+                # An empty key position is a wildcard
+                code = '' if code == '*' else code
+                key = definition['key']
+                key = {dimension: value.format(code=code) for dimension, value in key.items()} if isinstance(key, dict) else key.format(code=code)
+                return dict(definition, key=key)
+
+        raise Exception(f"Unknown series: {name}. Known series are: {list(self.definitions)}")
+
+
+    def plan(self, names) -> list:
+        """
+        Resolves `names` into requests: dicts with source, flow, key and the names of the series they contain.
+        A wildcard series (e.g. 'FX_*') absorbs the series of its dataflow it contains (e.g. 'FX_USD').
+        """
+        groups = {}
+
+        for name in dict.fromkeys(names):
+            definition = self.get(name)
+            key = definition['key']
+            shape = tuple(sorted(key)) if isinstance(key, dict) else len(key.split('.'))
+            groups.setdefault((definition['source'], definition['flow'], shape), []).append((name, _key_parts(key)))
+
+        requests = []
+
+        for (source, flow, shape), members in groups.items():
+
+            names_by_parts = {}
+            for name, parts in members:
+                names_by_parts.setdefault(parts, []).append(name)
+
+            # Keys contained in a wildcard key are answered by its request; merging them would give keys like 'D.+USD.EUR.SP00.A'
+            roots = [parts for parts in names_by_parts if not any(other != parts and _contains(other, parts) for other in names_by_parts)]
+            contained = {root: [parts for parts in names_by_parts if _contains(root, parts)] for root in roots}
+            assigned = set()
+
+            for merged_parts, original_parts in _merge_keys(roots):
+
+                if isinstance(shape, tuple):
+                    key = {dimension: (value.split('+') if '+' in value else value) for dimension, value in zip(shape, merged_parts)}
+                else:
+                    key = '.'.join(merged_parts)
+
+                series = []
+                for root in original_parts:
+                    for parts in contained[root]:
+                        if parts not in assigned:
+                            assigned.add(parts)
+                            series.extend(names_by_parts[parts])
+
+                requests.append(dict(source=source, flow=flow, key=key, series=series))
+
+        return requests
+
+
+    def flows(self, names) -> list:
+        """
+        The (source, flow) pairs publishing `names`.
+        """
+        return list(dict.fromkeys((self.get(name)['source'], self.get(name)['flow']) for name in names))
+
+
+    def columns(self, name, frame):
+        """
+        The columns of `frame` belonging to series `name`: those containing all (non-wildcard) codes of its key,
+        e.g. 'B.U2.EUR.4F.G_N_A.SV_C_YM.SR_10Y' for YC_SR_10Y.
+        """
+        codes = {code for code in _key_parts(self.get(name)['key']) if code}
+        return frame[[column for column in frame.columns if codes <= set(str(column).split('.'))]]
+
+
+    def select(self, frame, request) -> dict:
+        """
+        Splits the frame returned for `request` into one frame per series name.
+        """
+        if len(request['series']) == 1:
+            return {request['series'][0]: frame}
+
+        return {name: self.columns(name, frame) for name in request['series']}
+
+
+    def members(self, request) -> dict:
+        """
+        {series key: function selecting its columns} of the series of `request`, so the cache stores the answer
+        of a merged request under each series' own key (see SeriesCacheClass.download).
+        """
+        return {key_to_str(self.get(name)['key']): partial(self.columns, name) for name in request['series']}
+
+
+    def plan_missing(self, cache, client, names, startPeriod, endPeriod) -> list:
+        """
+        The requests (see plan) for the series of `names` that `cache` is missing for the period. Series it holds
+        are left out, whichever request they were downloaded with, so every series is downloaded only once.
+        """
+        missing = [name for name in dict.fromkeys(names) if cache.missing(client, self.get(name)['flow'], self.get(name)['key'], startPeriod, endPeriod)]
+        return self.plan(missing)
+
+
+    def download_task(self, cache, client, request, startPeriod, endPeriod) -> tuple:
+        """
+        (label, callable) downloading `request` into `cache`, for FetchEngineClass.run.
+        """
+        return (f"{request['flow']} {key_to_str(request['key'])}", partial(cache.download, client, request['flow'], request['key'], startPeriod, endPeriod, self.members(request)))
+
+
+    def fetch(self, cache, client, engine, names, startPeriod, endPeriod, lastNObservations=None, store=None) -> dict:
+        """
+        Fetches the series `names` of `client`'s source through `cache`, concurrently on `engine`. Returns {name: frame}.
+        The series the cache is missing are downloaded first, with as few requests as possible, then every series
+        is read under its own key. With a SeriesStoreClass `store`, series it holds for the period are read from it
+        and fetched series are added to it.
+        """
+        names = list(dict.fromkeys(names))
+        frames = {}
+
+        if store is not None and not lastNObservations:
+            for name in names:
+                frame = store.get(name, startPeriod, endPeriod)
+                if frame is not None:
+                    frames[name] = frame
+
+        pending = [name for name in names if name not in frames]
+
+        for name in pending:
+            if self.get(name)['source'] != client.source.id:
+                raise Exception(f"Series {name} is published by {self.get(name)['source']}, not {client.source.id}")
+
+        if lastNObservations:
+            plan = self.plan(pending)
+            tasks = [(f"{request['flow']} {key_to_str(request['key'])}", partial(cache.get_last, client, request['flow'], request['key'], lastNObservations, self.members(request))) for request in plan]
+
+            for request, frame in zip(plan, engine.run(tasks)):
+                frames.update(self.select(frame, request))
+
+            return frames
+
+        engine.run([self.download_task(cache, client, request, startPeriod, endPeriod) for request in self.plan_missing(cache, client, pending, startPeriod, endPeriod)])
+
+        tasks = [(name, partial(cache.get, client, self.get(name)['flow'], self.get(name)['key'], startPeriod, endPeriod)) for name in pending]
+
+        for name, frame in zip(pending, engine.run(tasks)):
+            frames[name] = frame
+
+            if store is not None:
+                store.put(name, frame, startPeriod, endPeriod, self.get(name)['source'], self.get(name)['flow'])
+
+        return frames
+
+
+REGISTRY = SeriesRegistryClass()
@@ -0,0 +1,161 @@
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+import Metrics as metrics
+from PublicationCalendar import PublicationCalendarClass
+from SeriesCache import period_start, period_end
+
+
+class SeriesStoreClass():
+    """
+    Compact store of the series returned by the clients: per series an int64 date index (nanoseconds since the
+    epoch) and a float64 value matrix (observations x columns), in memory-mapped .npy files under `directory`.
+    Every process opening the same directory maps the same files, so N workers read one copy of a history from
+    the page cache instead of holding N DataFrames. Frames returned by `get` are read-only views of the mapped
+    arrays (call .copy() to modify them).
+
+    Files are written under a new version and published by atomically replacing the small `<series>.json`
+    pointer, so readers never see a partly written series. A stored period that reaches the present is stale
+    once its dataflow has published again (see PublicationCalendarClass); older periods are kept.
+    """
+
+    def __init__(self, directory="output/series_store", calendar=None):
+        self.directory = directory
+        self.calendar = calendar or PublicationCalendarClass()
+        # series -> (version, dates, values) mapped by this process
+        self.mapped = {}
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+
+    def get(self, name, startPeriod, endPeriod):
+        """
+        Returns the period of series `name` as a read-only frame without copying, or None when the store does not
+        hold the whole period or the stored data is stale.
+        """
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+
+        meta = self._meta(name)
+
+        if meta is None or not (pd.Timestamp(meta['start']) <= start and end <= pd.Timestamp(meta['end'])) or self._stale(meta, end):
+            metrics.count('store_misses')
+            return None
+
+        try:
+            dates, values = self._map(name, meta['version'])
+        except FileNotFoundError:
+            # Replaced by another process between reading the pointer and mapping the files
+            metrics.count('store_misses')
+            return None
+
+        with metrics.stage('cache_read'):
+            first, last = np.searchsorted(dates, [start.value, (end + pd.Timedelta(days=1)).value])
+            index = pd.DatetimeIndex(dates[first:last].view('datetime64[ns]'), name='TIME_PERIOD')
+            frame = pd.DataFrame(values[first:last], index=index, columns=meta['columns'], copy=False)
+
+        metrics.count('store_hits')
+
+        return frame
+
+
+    def put(self, name, frame, startPeriod, endPeriod, source, flow):
+        """
+        Stores `frame`, the period startPeriod-endPeriod of series `name` published in `flow` of `source`. An
+        overlapping or adjacent stored period is merged, also when it is stale, with the new observations taking
+        precedence; a stored period that does not touch the new one is replaced.
+        """
+        start = period_start(startPeriod).normalize()
+        end = period_end(endPeriod).normalize()
+        checked = time.time()
+
+        meta = self._meta(name)
+
+        if meta is not None and pd.Timestamp(meta['start']) <= end + pd.Timedelta(days=1) and start <= pd.Timestamp(meta['end']) + pd.Timedelta(days=1):
+            try:
+                dates, values = self._map(name, meta['version'])
+            except FileNotFoundError:
+                # Replaced by another process meanwhile; its period is not known here
+                dates = None
+
+            if dates is not None:
+                stored = pd.DataFrame(values, index=pd.DatetimeIndex(dates.view('datetime64[ns]'), name='TIME_PERIOD'), columns=meta['columns'])
+                frame = frame.combine_first(stored)
+
+                # A stored end beyond the new period keeps the time it was checked, so it still goes stale
+                if pd.Timestamp(meta['end']) > end:
+                    checked = meta['checked']
+
+                start = min(start, pd.Timestamp(meta['start']))
+                end = max(end, pd.Timestamp(meta['end']))
+
+        if frame.empty:
+            return
+
+        with metrics.stage('write'):
+            version = time.time_ns()
+            path = self._path(name)
+
+            np.save(f'{path}.{version}.dates.npy', frame.index.asi8)
+            np.save(f'{path}.{version}.values.npy', np.ascontiguousarray(frame.to_numpy(dtype='float64')))
+
+            pointer = dict(
+                version=version, columns=[str(column) for column in frame.columns], source=source, flow=flow,
+                start=start.strftime('%Y-%m-%d'), end=end.strftime('%Y-%m-%d'), checked=checked,
+            )
+            with open(f'{path}.json.tmp', 'w') as f:
+                json.dump(pointer, f)
+            os.replace(f'{path}.json.tmp', f'{path}.json')
+
+        if meta is not None:
+            for suffix in ('dates', 'values'):
+                try:
+                    # Processes still mapping the old version keep it until they unmap it (POSIX)
+                    os.remove(f'{path}.{meta["version"]}.{suffix}.npy')
+                except OSError:
+                    pass
+
+
+    def _stale(self, meta, end) -> bool:
+
+        checked = pd.Timestamp(meta['checked'], unit='s', tz='UTC')
+        if end < checked.tz_localize(None).normalize():
+            return False
+
+        return self.calendar.next_release(meta['source'], meta['flow'], after=checked) <= pd.Timestamp.now(tz='UTC')
+
+
+    def _meta(self, name):
+        try:
+            with open(f'{self._path(name)}.json') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+
+    def _map(self, name, version) -> tuple:
+
+        with self.lock:
+            mapped = self.mapped.get(name)
+
+            if mapped is None or mapped[0] != version:
+                path = self._path(name)
+                mapped = self.mapped[name] = (
+                    version,
+                    np.load(f'{path}.{version}.dates.npy', mmap_mode='r'),
+                    np.load(f'{path}.{version}.values.npy', mmap_mode='r'),
+                )
+
+        return mapped[1], mapped[2]
+
+
+    def _path(self, name) -> str:
+        # Series names such as 'FX_*' become file names such as 'FX_%2A'
+        return os.path.join(self.directory, quote(name, safe=''))
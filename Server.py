@@ -0,0 +1,244 @@
+import json
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import pandas as pd
+
+import Metrics as metrics
+from Analytics import AnalyticsClass, TRANSFORMS
+from BatchRunner import DATASETS, _call
+from PublicationCalendar import PublicationCalendarClass
+
+
+# endpoint -> dataset of BatchRunner.DATASETS
+ROUTES = {
+    '/hicp': 'inflation',
+    '/yield': 'yield',
+    '/term-structure': 'term_structure',
+    '/fx': 'fx',
+    '/euribor': 'euribor',
+    '/eonia': 'eonia',
+}
+
+# query parameter -> argument of the load_* methods
+QUERY_PARAMETERS = {
+    'begin': 'startPeriod',
+    'end': 'endPeriod',
+    'short': 'short_term',
+    'long': 'long_term',
+    'spread': 'spread',
+    'spreads': 'spreads',
+    'tenors': 'tenors',
+    'ccy': 'fx',
+    'last': 'lastNObservations',
+    'transform': 'transform',
+    'window': 'window',
+    'how': 'how',
+}
+
+
+# Period of queries without begin/end, the same as the CLI's (the load_* defaults of some datasets are narrower)
+DEFAULT_QUERY = dict(startPeriod='1980-01-01', endPeriod='2099-12-31')
+
+
+class BadRequest(Exception):
+    pass
+
+
+class HotCacheClass():
+    """
+    In-memory LRU cache of serialized answers. Each entry expires at its own time, so answers can be kept
+    until the next publication of their data instead of for a fixed period.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+
+    def get(self, key):
+
+        with self.lock:
+            entry = self.entries.get(key)
+
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value, expires - time.monotonic()
+
+
+    def put(self, key, value, ttl):
+
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def _parse_query(query) -> dict:
+
+    options = dict(DEFAULT_QUERY)
+
+    for name, value in parse_qsl(query, keep_blank_values=True):
+
+        if name not in QUERY_PARAMETERS:
+            raise BadRequest(f"Unknown parameter: {name}. Valid parameters are: {list(QUERY_PARAMETERS)}")
+
+        name = QUERY_PARAMETERS[name]
+
+        if name == 'spread':
+            value = value.lower() in ('', '1', 'true', 'yes')
+        elif name == 'lastNObservations':
+            try:
+                value = int(value)
+            except ValueError:
+                raise BadRequest(f"Invalid last: {value}. Expected a number of observations") from None
+        elif name == 'transform' and value not in TRANSFORMS:
+            raise BadRequest(f"Invalid transform: {value}. Valid values are: {list(TRANSFORMS)}")
+        elif name == 'window':
+            value = int(value) if value.isdigit() else value.upper()
+        elif name == 'tenors':
+            value = [tenor.strip().upper() for tenor in value.split(',') if tenor.strip()]
+
+        options[name] = value
+
+    return options
+
+
+class ServiceClass():
+    """
+    Answers endpoint queries from warm ECB/BBK clients. Answers are kept in a HotCacheClass until the next
+    publication of their dataflows (see PublicationCalendarClass). The `transform` parameter applies an
+    AnalyticsClass transform (with `window` and `how`) to the result.
+
+    The series caches of the clients skip refreshes within their max_age, so a dataflow whose publication is due
+    is expired there before the next answer reading it is loaded (see SeriesCacheClass.expire).
+    """
+
+    def __init__(self, ecb_client, bbk_client, calendar=None, cache=None, analytics=None):
+        self.clients = dict(ecb=ecb_client, bbk=bbk_client)
+        self.calendar = calendar or PublicationCalendarClass()
+        self.cache = cache or HotCacheClass()
+        self.analytics = analytics or AnalyticsClass()
+        # (source, flow) -> next publication; the series cache is revalidated once it has passed
+        self.revalidate_at = {}
+        self.revalidate_lock = threading.Lock()
+
+
+    def query(self, path, query) -> tuple:
+        """
+        Returns (status, JSON body, seconds the body stays valid) for a request to `path` with query string `query`.
+        """
+        if path in ('', '/'):
+            return 200, json.dumps(dict(endpoints=list(ROUTES), parameters=list(QUERY_PARAMETERS))).encode(), 0
+
+        if path not in ROUTES:
+            return 404, json.dumps(dict(error=f"Unknown endpoint: {path}. Valid endpoints are: {list(ROUTES)}")).encode(), 0
+
+        with metrics.call(f'serve {path}') as record:
+            try:
+                options = _parse_query(query)
+                key = (path, tuple(sorted((name, str(value)) for name, value in options.items())))
+
+                cached = self.cache.get(key)
+                if cached is not None:
+                    metrics.count('hot_cache_hits')
+                    body, ttl = cached
+                    return 200, body, ttl
+
+                metrics.count('hot_cache_misses')
+
+                client_name, series_method, load_method, _ = DATASETS[ROUTES[path]]
+                client = self.clients[client_name]
+
+                try:
+                    series = _call(getattr(client, series_method), **options)
+                except Exception as e:
+                    raise BadRequest(str(e)) from None
+
+                self._revalidate(client, client.registry.flows(series))
+                df = _call(getattr(client, load_method), **options)
+
+                if 'transform' in options:
+                    try:
+                        df = self.analytics.transform(df, options['transform'], options.get('window'), options.get('how', 'last'))
+                    except Exception as e:
+                        raise BadRequest(str(e)) from None
+                body = df.to_json(orient='split', date_format='iso').encode()
+
+                ttl = self.calendar.ttl(client.registry.flows(series))
+                self.cache.put(key, body, ttl)
+
+                return 200, body, ttl
+
+            except BadRequest as e:
+                record.error = str(e)
+                return 400, json.dumps(dict(error=str(e))).encode(), 0
+
+            except Exception as e:
+                print(f"Unexpected Error: {e}\nTraceback: {traceback.format_exc()}")
+                record.error = f"Unexpected Error: {e}"
+                return 502, json.dumps(dict(error=f"Unexpected Error: {e}")).encode(), 0
+
+
+    def _revalidate(self, client, flows):
+        """
+        Expires the series cache of the (source, flow) pairs `flows` that published since the service last
+        revalidated them, and on their first query, as the cache may predate the service.
+        """
+        now = pd.Timestamp.now(tz='UTC')
+
+        with self.revalidate_lock:
+            for source, flow in flows:
+                if self.revalidate_at.get((source, flow), now) <= now:
+                    client.cache.expire(source, flow)
+                    self.revalidate_at[source, flow] = self.calendar.next_release(source, flow, now)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        url = urlsplit(self.path)
+        status, body, ttl = self.server.service.query(url.path.rstrip('/'), url.query)
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', f'max-age={int(ttl)}' if ttl else 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(ecb_client, bbk_client, host='127.0.0.1', port=8000, cache_size=256):
+    """
+    Serves the endpoints of ROUTES as JSON (pandas orient='split': columns, index, data) until interrupted, e.g.
+
+        GET /yield?short=2Y&long=10Y&spread=1&begin=2020-01&end=2023-12
+        GET /fx?ccy=USD,GBP
+    """
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    server.daemon_threads = True
+    server.service = ServiceClass(ecb_client, bbk_client, cache=HotCacheClass(cache_size))
+
+    print(f'Serving {", ".join(ROUTES)} on http://{host}:{server.server_port}/ (Ctrl+C to stop)')
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
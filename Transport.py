@@ -0,0 +1,61 @@
+import random
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, retry_if_exception_type, retry_if_result, stop_after_attempt, wait_random_exponential
+
+import Metrics as metrics
+
+
+# Transient answers of the ECB/BBK endpoints that are worth another attempt
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+class TransportClass(requests.Session):
+    """
+    requests.Session shared by all sdmx.Client instances: keep-alive connection pool, default timeout and
+    retries with jittered exponential backoff (honouring Retry-After) on connection errors and RETRY_STATUS.
+    Assign it to `client.session`; metadata queries of sdmx (e.g. DSD lookups) then use it as well.
+    """
+
+    def __init__(self, pool_size=10, retries=4, backoff=0.5, max_backoff=30.0, timeout=(10, 60)):
+        super().__init__()
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+        # (connect, read) timeout in seconds, used when the caller passes none
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.jitter = wait_random_exponential(multiplier=backoff, max=max_backoff)
+
+        self.retrying = Retrying(
+            retry=retry_if_exception_type((requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                | retry_if_result(lambda response: response.status_code in RETRY_STATUS),
+            stop=stop_after_attempt(retries + 1),
+            wait=self._wait,
+            before_sleep=lambda retry_state: metrics.count('retries'),
+            # After the last attempt hand back the final response (or raise the final exception) unchanged
+            retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+        )
+
+
+    def send(self, request, **kwargs):
+
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+
+        return self.retrying(super().send, request, **kwargs)
+
+
+    def _wait(self, retry_state) -> float:
+
+        delay = self.jitter(retry_state)
+
+        if not retry_state.outcome.failed:
+            retry_after = retry_state.outcome.result().headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                delay = max(delay, min(int(retry_after) + random.uniform(0, 1), self.max_backoff))
+
+        return delay
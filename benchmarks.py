@@ -0,0 +1,278 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from functools import partial
+
+import pandas as pd
+
+
+def bench_bbk_date_filter(startPeriod="2022-01-01", endPeriod="2022-01-31", key="ST0316"):
+    """
+    Full BBK01 history sliced in pandas (previous behaviour) against the server-side startPeriod/endPeriod query.
+    """
+    import sdmx
+
+    client = sdmx.Client("BBK")
+    results = []
+
+    for label, params in [('full history + local slice', {}), ('server-side period', dict(startPeriod=startPeriod, endPeriod=endPeriod))]:
+
+        start_time = time.perf_counter()
+        message = client.data("BBK01", key=key, params=params)
+        df = sdmx.to_pandas(message.data[0], datetime="TIME_PERIOD")
+        df = df[(df.index >= startPeriod) & (df.index <= endPeriod)]
+        total = time.perf_counter() - start_time
+
+        transfer = message.response.elapsed.total_seconds()
+        results.append(dict(
+            benchmark=label,
+            bytes=len(message.response.content),
+            rows=len(df),
+            http_s=round(transfer, 3),
+            parse_s=round(total - transfer, 3),
+        ))
+
+    return pd.DataFrame(results).set_index('benchmark')
+
+
+def bench_frame_conversion(years=25, repeat=5):
+    """
+    The former nested iterrows() loops against helperFunctions.to_frame on a synthetic daily EXR-shaped frame.
+    """
+    import numpy as np
+    from helperFunctions import to_frame
+
+    index = pd.date_range('1999-01-04', periods=years * 261, freq='B', name='TIME_PERIOD')
+    columns = pd.MultiIndex.from_tuples([('D', 'USD', 'EUR', 'SP00', 'A')], names=['FREQ', 'CURRENCY', 'CURRENCY_DENOM', 'EXR_TYPE', 'EXR_SUFFIX'])
+    df = pd.DataFrame(np.random.default_rng(0).normal(1.1, 0.1, (len(index), 1)), index=index, columns=columns)
+
+    def iterrows_conversion():
+        index_list = []
+        for index, _ in df.iterrows():
+            index_list.append(index)
+
+        value_list = []
+        for _, value in df.iterrows():
+            for i in value:
+                value_list.append(i)
+
+        return pd.DataFrame(value_list, index=index_list, columns=['USD.EUR'])
+
+    results = []
+    for label, func in [('iterrows', iterrows_conversion), ('to_frame', lambda: to_frame(df, ['USD.EUR']))]:
+        timings = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start_time)
+        results.append(dict(benchmark=label, rows=len(df), best_ms=round(min(timings) * 1000, 3)))
+
+    results = pd.DataFrame(results).set_index('benchmark')
+    results['speedup'] = (results.loc['iterrows', 'best_ms'] / results['best_ms']).round(1)
+
+    return results
+
+
+def _synthetic_responses(n_series, n_obs):
+    """
+    The same panel as a generic SDMX-ML message and as SDMX-CSV, wrapped in requests.Response objects.
+    """
+    import io
+    import requests
+    import sdmx
+    from sdmx import model
+    from sdmx.message import DataMessage
+    from urllib3 import HTTPResponse
+
+    dsd = model.DataStructureDefinition(id='EXR', maintainer=model.Agency(id='ECB'), version='1.0')
+    for dimension in ['FREQ', 'CURRENCY']:
+        dsd.dimensions.getdefault(dimension)
+    dsd.dimensions.getdefault('TIME_PERIOD', cls=model.TimeDimension)
+    dsd.measures.getdefault('OBS_VALUE')
+
+    periods = pd.date_range('1990-01-01', periods=n_obs, freq='D').strftime('%Y-%m-%d')
+    data_set = model.GenericDataSet(structured_by=dsd)
+    csv_lines = ['DATAFLOW,FREQ,CURRENCY,TIME_PERIOD,OBS_VALUE']
+
+    for i in range(n_series):
+        series_key = dsd.make_key(model.SeriesKey, dict(FREQ='D', CURRENCY=f'C{i:02d}'))
+        observations = [
+            model.Observation(series_key=series_key, dimension=dsd.make_key(model.Key, dict(TIME_PERIOD=period)), value=j * 0.001)
+            for j, period in enumerate(periods)
+        ]
+        data_set.add_obs(observations, series_key)
+        csv_lines += [f'ECB:EXR(1.0),D,C{i:02d},{period},{j * 0.001}' for j, period in enumerate(periods)]
+
+    message = DataMessage(data=[data_set], dataflow=model.DataflowDefinition(id='EXR', structure=dsd))
+    payloads = {
+        'sdmx-ml (object graph)': (sdmx.to_xml(message).replace(b'structureID="EXR"', b'structureID="EXR" dimensionAtObservation="TIME_PERIOD"'), 'application/vnd.sdmx.genericdata+xml;version=2.1'),
+        'sdmx-csv (streamed)': ('\n'.join(csv_lines).encode(), 'application/vnd.sdmx.data+csv;version=1.0.0'),
+    }
+
+    def make_response(body, content_type):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = content_type
+        response.raw = HTTPResponse(io.BytesIO(body), preload_content=False)
+        return response
+
+    return {label: partial(make_response, *payload) for label, payload in payloads.items()}
+
+
+def bench_streaming_parse(n_series=5, n_obs=4000):
+    """
+    Peak Python heap (tracemalloc) and time of SDMXStream.read_frame for the same panel as SDMX-ML and as SDMX-CSV.
+    """
+    import tracemalloc
+    from SDMXStream import read_frame
+
+    results = []
+
+    for label, make_response in _synthetic_responses(n_series, n_obs).items():
+
+        response = make_response()
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        df = read_frame(response)
+        elapsed = time.perf_counter() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results.append(dict(
+            benchmark=label,
+            observations=int(df.count().sum()),
+            frame_mb=round(df.memory_usage().sum() / 2**20, 2),
+            peak_mb=round(peak / 2**20, 2),
+            seconds=round(elapsed, 3),
+        ))
+
+    return pd.DataFrame(results).set_index('benchmark')
+
+
+def bench_render(n_figures=50, workers=None):
+    """
+    Exporting a report pack of `n_figures` PNG+HTML figures (25 years of daily data each), one after the other in
+    this process against RendererClass with `workers` warm kaleido processes (default: one per CPU, up to 4).
+    PNG export is CPU-bound in Chromium, so the gain grows with the number of cores.
+    """
+    import tempfile
+    import numpy as np
+    import plotly.express as px
+    from Renderer import RendererClass
+
+    index = pd.date_range('1999-01-04', periods=25 * 261, freq='B')
+    rng = np.random.default_rng(0)
+    figures = [px.line(x=index, y=rng.normal(0, 1, len(index)).cumsum(), title=f'Series {i}') for i in range(n_figures)]
+
+    results = []
+
+    with tempfile.TemporaryDirectory() as folder:
+
+        start_time = time.perf_counter()
+        for i, fig in enumerate(figures):
+            fig.write_image(os.path.join(folder, f'sequential_{i}.png'))
+            fig.write_html(os.path.join(folder, f'sequential_{i}.html'))
+        results.append(dict(benchmark='sequential (one kaleido)', figures=n_figures, seconds=round(time.perf_counter() - start_time, 2)))
+
+        renderer = RendererClass(workers)
+        start_time = time.perf_counter()
+        rendered = renderer.render([(fig, os.path.join(folder, f'parallel_{i}'), {'png', 'html'}) for i, fig in enumerate(figures)])
+        elapsed = time.perf_counter() - start_time
+
+        failed = [result for result in rendered.values() if isinstance(result, Exception)]
+        if failed:
+            raise failed[0]
+
+        renderer.shutdown()
+
+        results.append(dict(benchmark=f'RendererClass ({renderer.max_workers} workers, incl. start-up)', figures=n_figures, seconds=round(elapsed, 2)))
+
+    results = pd.DataFrame(results).set_index('benchmark')
+    results['figures_per_s'] = (results['figures'] / results['seconds']).round(1)
+
+    return results
+
+
+# Wall-clock import budget per scenario (ms), see bench_import_time
+IMPORT_BUDGET_MS = {
+    'init.py -h': 150,
+    'import ECBClient': 2500,
+    'import BBKClient': 2500,
+}
+
+HEAVY_MODULES = ('sdmx', 'pandas', 'plotly', 'kaleido')
+
+
+def bench_import_time():
+    """
+    Start-up cost of the CLI and client modules from `python -X importtime`, checked against IMPORT_BUDGET_MS.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    scenarios = {
+        'init.py -h': [os.path.join(here, 'init.py'), '-h'],
+        'import ECBClient': ['-c', 'import ECBClient'],
+        'import BBKClient': ['-c', 'import BBKClient'],
+    }
+
+    results = []
+
+    for label, arguments in scenarios.items():
+
+        start_time = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, cwd=here, capture_output=True, text=True, check=True)
+        wall_ms = (time.perf_counter() - start_time) * 1000
+
+        # Lines look like 'import time:   self [us] |  cumulative | imported package'
+        imported = {}
+        for line in completed.stderr.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, package = line[len('import time:'):].split('|')
+            imported[package.strip()] = int(self_us)
+
+        results.append(dict(
+            scenario=label,
+            wall_ms=round(wall_ms, 1),
+            import_ms=round(sum(imported.values()) / 1000, 1),
+            heavy_modules=','.join(module for module in HEAVY_MODULES if module in imported) or '-',
+            budget_ms=IMPORT_BUDGET_MS[label],
+            within_budget=wall_ms <= IMPORT_BUDGET_MS[label],
+        ))
+
+    return pd.DataFrame(results).set_index('scenario')
+
+
+BENCHMARKS = {
+    'bbk-date-filter': bench_bbk_date_filter,
+    'frame-conversion': bench_frame_conversion,
+    'import-time': bench_import_time,
+    'streaming-parse': bench_streaming_parse,
+    'render': bench_render,
+}
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks for the ECB/BBK clients.')
+    parser.add_argument('benchmark', nargs='*', help=f'Benchmarks to run (default: all). Available: {", ".join(BENCHMARKS)}')
+    args = parser.parse_args()
+
+    unknown = set(args.benchmark) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f'Unknown benchmark(s): {", ".join(sorted(unknown))}')
+
+    over_budget = []
+
+    for name in args.benchmark or BENCHMARKS:
+        print(f'## {name}')
+        result = BENCHMARKS[name]()
+        print(result)
+        print()
+
+        if 'within_budget' in result and not result['within_budget'].all():
+            over_budget.append(name)
+
+    if over_budget:
+        sys.exit(f'Over budget: {", ".join(over_budget)}')
@@ -1,18 +1,121 @@
-import time
 from functools import wraps
 
+import pandas as pd
+
+import Metrics as metrics
+from OutputWriter import OutputWriterClass, OUTPUT_FORMATS, DEFAULT_OUTPUTS
+
 def log_stats(func):
+    """
+    Records the call in the metrics sinks (see Metrics.py): total time and per-stage timings.
+    Calls returning an error message string (the get_* convention) are recorded as errors.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
+        with metrics.call(func.__name__) as record:
+            result = func(*args, **kwargs)
 
-        print(f"Called function: {func.__name__}")
-        print(f"Arguments: {args}, {kwargs}")
-        print(f"Return value: {result}")
-        print(f"Execution time: {end_time - start_time:.2f} seconds")
+            if isinstance(result, str) and record.error is None:
+                record.error = result.splitlines()[0]
 
         return result
 
     return wrapper
+
+
+def log_stats_async(func):
+    """
+    log_stats for coroutine functions.
+    """
+    @wraps(func)
+    async def wrapper(*args, **kwargs):
+        with metrics.call(func.__name__) as record:
+            result = await func(*args, **kwargs)
+
+            if isinstance(result, str) and record.error is None:
+                record.error = result.splitlines()[0]
+
+        return result
+
+    return wrapper
+
+
+def to_frame(df, columns=None) -> pd.DataFrame:
+    """
+    Converts a sdmx.to_pandas result into a float64 frame with a sorted DatetimeIndex in one vectorized step.
+    Columns are renamed to `columns`, or flattened to dotted series keys (e.g. 'D.USD.EUR.SP00.A') if not given.
+    """
+    if isinstance(df, pd.Series):
+        df = df.to_frame()
+
+    if columns is None:
+        columns = ['.'.join(map(str, column)) if isinstance(column, tuple) else str(column) for column in df.columns]
+
+    if isinstance(df.index, pd.PeriodIndex):
+        index = df.index.to_timestamp()
+    else:
+        index = pd.to_datetime(df.index)
+
+    frame = pd.DataFrame(df.to_numpy(dtype='float64'), index=pd.DatetimeIndex(index, name='TIME_PERIOD'), columns=columns)
+
+    if not frame.index.is_monotonic_increasing:
+        frame = frame.sort_index()
+
+    return frame
+
+
+def requested_outputs(save, headless=False):
+    """
+    Normalizes the `save` argument of the client methods into a set of output formats.
+    None means "ask the user" in interactive mode and "nothing" in headless mode.
+    """
+    if save is None:
+        return set() if headless else None
+
+    if save is True:
+        return set(DEFAULT_OUTPUTS)
+
+    if save is False:
+        return set()
+
+    if isinstance(save, str):
+        save = save.split(',')
+
+    outputs = {output.strip().lower() for output in save if output.strip()}
+    invalid = outputs - set(OUTPUT_FORMATS)
+
+    if invalid:
+        raise Exception(f"Invalid output format(s): {sorted(invalid)}. Valid values are: {list(OUTPUT_FORMATS)}")
+
+    return outputs
+
+
+def present(build_figure, df, path, show=None, save=None, headless=False, dataset=None, writer=None):
+    """
+    Shows and/or writes a result. `build_figure` is only called when the figure is displayed or written,
+    so headless data-only calls never touch plotly. `path` is the output path without extension, `dataset`
+    the name of the parquet/feather dataset new observations are appended to (see OutputWriter).
+    """
+    show = not headless if show is None else show
+    outputs = requested_outputs(save, headless)
+    writer = writer or OutputWriterClass()
+
+    fig = None
+    if show or outputs is None or outputs & {'png', 'html'}:
+        with metrics.stage('plot'):
+            fig = build_figure()
+
+    if show:
+        fig.show()
+
+    if outputs is None:
+        answer = input("Save output to the current folder? (y/n)")
+        outputs = set(DEFAULT_OUTPUTS) if answer.lower() == 'y' else set()
+
+    with metrics.stage('write'):
+        written = writer.write(df, outputs, path, dataset, fig)
+
+    if written:
+        print(f"Output saved: {', '.join(written)}.")
+
+    return fig
@@ -1,6 +1,4 @@
 import argparse
-from ECBClient import ECBClientClass
-from BBKClient import BBKClientClass
 
 
 if __name__ == '__main__':    
@@ -11,44 +9,193 @@ if __name__ == '__main__':
     group_inflation.add_argument('-i', '--inflation', help='Retrieves inflation data. When no period is provided, it retrieves maximum available data history.', action='store_true')
 
     group_yield = parser.add_argument_group('YIELD')
+    group_yield.add_argument('-ts', '--term-structure', help='Retrieves all spot-rate maturities (3M to 30Y) in one request as a date x tenor table. Combine with --spreads.', action='store_true')
+    group_yield.add_argument('--spreads', metavar='SPREADS', help='Spreads added to --term-structure, e.g. 2s10s,3m10y,5s30s, or all for every pair of maturities.')
     group_yield.add_argument('-y', '--yield-curve', help='Retrieves yield curve data. When no period is provided, it retrieves maximum available data history. When neither --shortterm nor --longterm is given, it retrieves the 2Y10Y Spot Yield.', action='store_true')
+    group_yield.add_argument('--yield-short', metavar='TENOR', help="Short-term maturity of --yield-curve, overriding --shortterm, e.g. when -st sets the Euribor maturity of the same run. ['3M', '6M', '9M', '1Y', '2Y']")
+    group_yield.add_argument('--yield-long', metavar='TENOR', help="Long-term maturity of --yield-curve, overriding --longterm. ['5Y', '10Y', '15Y', '20Y', '30Y']")
     
     group_fx = parser.add_argument_group('EXCHANGE RATE')
     group_fx.add_argument('-fx', '--exchange-rate', help='Retrieves exchange rate data. When no period is provided, it retrieves maximum available data history.', action='store_true')
-    group_fx.add_argument('-c', '--currency', help='Define the currency for which exchange rate data should be retrieved', default='USD')
+    group_fx.add_argument('-c', '--currency', help='Define the currency for which exchange rate data should be retrieved. Several currencies (e.g. USD,GBP,CHF) are fetched in one request and returned as one table; * retrieves all currencies.', default='USD')
 
 
     parser.add_argument('-b', '--begin', type=str, help='Start date in YYYY-MM format. Can be used with each flag. When provided, --end must be defined as well.', default='1980-01-01')
     parser.add_argument('-e', '--end', type=str, help='End date in YYYY-MM format. Can be used with each flag. When provided, --begin must be defined as well.', default='2099-12-31')
     parser.add_argument('-s', '--spread', help='Returns spread of long and short term series.', action='store_true')
-    parser.add_argument('-st', '--shortterm', help="Define short-term period for time series. Works with --yield-curve and --euribor. (Yield: ['3M', '6M', '9M', '1Y', '2Y'], Euribor: ['1W', '1M', '3M', '6M', '9M', '12M']", default='3M')
-    parser.add_argument('-lt', '--longterm', help="Define short-term period for time series. Works with --yield-curve and --euribor. (Yield: ['5Y','10Y', '15Y', '20Y', '30Y'], Euribor: ['1W', '1M', '3M', '6M', '9M', '12M'])", default='10Y')
+    parser.add_argument('-st', '--shortterm', help="Define short-term period for time series. Works with --yield-curve and --euribor; --yield-short and --euribor-short set it per dataset. (Yield: ['3M', '6M', '9M', '1Y', '2Y'], Euribor: ['1W', '1M', '3M', '6M', '9M', '12M']", default='3M')
+    parser.add_argument('-lt', '--longterm', help="Define long-term period for time series. Works with --yield-curve and --euribor; --yield-long and --euribor-long set it per dataset. (Yield: ['5Y','10Y', '15Y', '20Y', '30Y'], Euribor: ['1W', '1M', '3M', '6M', '9M', '12M'])", default='10Y')
+    parser.add_argument('-w', '--workers', type=int, help='Maximum number of series requests that run concurrently.', default=4)
+    parser.add_argument('--retries', type=int, help='Retries of a request after connection errors, timeouts and HTTP 429/5xx answers.', default=4)
+    parser.add_argument('--timeout', type=float, help='Read timeout of a request in seconds.', default=60)
 
     
     group_euribor = parser.add_argument_group('EURIBOR')
     group_euribor.add_argument('-eur', '--euribor', help='Retrieves Euribor data. When no period is provided, it retrieves maximum available data history.', action='store_true')
+    group_euribor.add_argument('--euribor-short', metavar='TENOR', help="Short-term maturity of --euribor, overriding --shortterm, e.g. when -st sets the yield curve maturity of the same run. ['1W', '1M', '3M', '6M', '9M', '12M']")
+    group_euribor.add_argument('--euribor-long', metavar='TENOR', help="Long-term maturity of --euribor, overriding --longterm. ['1W', '1M', '3M', '6M', '9M', '12M']")
     
     group_eonia = parser.add_argument_group('EONIA')
     group_eonia.add_argument('-eon', '--eonia', help='Retrieves Eonia data. When no period is provided, it retrieves maximum available data history. This function takes EONIA history until last day (2021-12-31) and continues with up-to-date €STR data.', action='store_true')
 
+    parser.add_argument('--headless', help='Non-interactive mode: no figure is displayed and there is no save prompt. Combine with --save to write output files.', action='store_true')
+    parser.add_argument('--save', nargs='?', const='png,html,csv', metavar='FORMATS', help='Writes the output without prompting. Optionally choose the formats from png, html, csv, parquet and feather, e.g. --save csv,parquet (default: png,html,csv).')
+    parser.add_argument('--batch', metavar='JOB_FILE', help='Runs all jobs of a JSON/TOML/YAML job file with shared clients and writes each job to output/ (CSV unless the job sets save).')
+    parser.add_argument('--serve', help='Runs a local HTTP/JSON service (/hicp, /yield, /term-structure, /fx, /euribor, /eonia) with warm clients and an in-memory cache that expires with the next ECB/BBK publication.', action='store_true')
+    parser.add_argument('--host', help='Address the --serve service listens on.', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='Port the --serve service listens on.', default=8000)
+    parser.add_argument('--hot-cache', type=int, metavar='N', help='Maximum number of answers the --serve service keeps in memory.', default=256)
+    parser.add_argument('--schedule', nargs='?', const=True, metavar='JOB_FILE', help='Runs until interrupted and refreshes the data of the jobs in JOB_FILE (default: the queries of -i, -y, -ts, -fx, -eur and -eon without further options) right after each ECB/BBK publication, so later queries read warm local data.')
+    parser.add_argument('--panel', metavar='SERIES', help='Aligns the given series (e.g. HICP,YC_SR_10Y,FX_USD,EURIBOR3M,EONIA_ESTR; see SeriesRegistry.py) into one date-indexed table, written as one file per --save format (default: parquet).')
+    parser.add_argument('--frequency', choices=['D', 'B', 'W', 'M', 'Q', 'Y'], help='Calendar of the --panel table; B is TARGET business days.', default='B')
+    parser.add_argument('--fill', choices=['ffill', 'none', 'interpolate'], help='How --panel fills periods without an observation.', default='ffill')
+    parser.add_argument('--store', metavar='DIR', help='Keeps the fetched series in memory-mapped arrays in DIR, shared by all processes that use the same DIR, and reads them from there while they are current.')
+    parser.add_argument('--render-workers', type=int, metavar='N', help='Worker processes exporting the PNG/HTML figures of a batch run in parallel (default: up to 4).')
+    parser.add_argument('--record', metavar='DIR', help='Saves every raw SDMX response to DIR, for later use with --replay.')
+    parser.add_argument('--replay', metavar='DIR', help='Offline mode: serves all requests from responses recorded with --record instead of the ECB/BBK APIs.')
+    parser.add_argument('--metrics', nargs='?', const='output/metrics.jsonl', metavar='PATH', help='Appends one JSON line with per-stage timings per call to PATH (default: output/metrics.jsonl).')
+    parser.add_argument('--prometheus', metavar='PATH', help='Also writes running metric totals as a Prometheus text file, e.g. for the node_exporter textfile collector.')
+    parser.add_argument('--profile', metavar='DIR', help='Writes one cProfile dump per call to DIR.')
+
     args = parser.parse_args()
 
-    if args.inflation:
-        ecb_client = ECBClientClass()
-        ecb_client.get_inflation_data(args.begin, args.end)
-    
-    elif args.yield_curve:
-        ecb_client = ECBClientClass()
-        ecb_client.get_yield_data(args.spread, args.begin, args.end, args.shortterm, args.longterm)
-    
-    elif args.exchange_rate:
-        ecb_client = ECBClientClass()
-        ecb_client.get_exchange_rate_data(args.currency, args.begin, args.end)
+    import Metrics
+    Metrics.configure(args.metrics, args.prometheus, args.profile)
+
+    # sdmx, pandas and plotly are only imported on the code paths that need them, so -h and argument errors stay fast
+    from FetchEngine import FetchEngineClass
+    engine = FetchEngineClass(max_workers=args.workers)
+
+    if args.replay:
+        from Replay import ReplayTransportClass
+        transport = ReplayTransportClass(args.replay)
+    elif args.record:
+        from Replay import RecordingTransportClass
+        transport = RecordingTransportClass(args.record, pool_size=max(args.workers, 4), retries=args.retries, timeout=(10, args.timeout))
+    else:
+        from Transport import TransportClass
+        transport = TransportClass(pool_size=max(args.workers, 4), retries=args.retries, timeout=(10, args.timeout))
+
+    store = None
+    if args.store:
+        from SeriesStore import SeriesStoreClass
+        store = SeriesStoreClass(args.store)
+
+    if args.batch:
+        from ECBClient import ECBClientClass
+        from BBKClient import BBKClientClass
+        from BatchRunner import BatchRunnerClass
+        from Renderer import RendererClass
+
+        ecb_client = ECBClientClass(engine, session=transport, headless=args.headless, store=store)
+        bbk_client = BBKClientClass(engine, session=transport, headless=args.headless, store=store)
+        renderer = RendererClass(args.render_workers)
+        print(BatchRunnerClass(ecb_client, bbk_client, engine, renderer).run(args.batch))
+        renderer.shutdown()
+
+    elif args.serve:
+        from ECBClient import ECBClientClass
+        from BBKClient import BBKClientClass
+        from Server import serve
+
+        ecb_client = ECBClientClass(engine, session=transport, headless=True, store=store)
+        bbk_client = BBKClientClass(engine, session=transport, headless=True, store=store)
+        serve(ecb_client, bbk_client, args.host, args.port, args.hot_cache)
+
+    elif args.schedule:
+        from ECBClient import ECBClientClass
+        from BBKClient import BBKClientClass
+        from Scheduler import SchedulerClass
+
+        ecb_client = ECBClientClass(engine, session=transport, headless=True, store=store)
+        bbk_client = BBKClientClass(engine, session=transport, headless=True, store=store)
+
+        try:
+            SchedulerClass(ecb_client, bbk_client, engine, jobs=None if args.schedule is True else args.schedule).run()
+        except KeyboardInterrupt:
+            pass
+
+    elif args.panel:
+        from ECBClient import ECBClientClass
+        from BBKClient import BBKClientClass
+        from Panel import PanelBuilderClass
+        from OutputWriter import OutputWriterClass
+        from helperFunctions import requested_outputs
+
+        ecb_client = ECBClientClass(engine, session=transport, headless=True, store=store)
+        bbk_client = BBKClientClass(engine, session=transport, headless=True, store=store)
+
+        panel = PanelBuilderClass(ecb_client, bbk_client).build(args.panel, args.begin, args.end, args.frequency, args.fill)
+        print(panel)
+
+        # One wide file per format instead of the per-series parquet partitions
+        name = f"Panel_{args.panel.replace(',', '_')}_{args.frequency}"
+        outputs = requested_outputs(args.save or 'parquet') - {'png', 'html'}
+        written = OutputWriterClass(partition=False).write(panel, outputs, f"{ecb_client.current_dir}/{ecb_client.folder_name}/{name}_{args.begin}-{args.end}", name)
+
+        if written:
+            print(f"Output saved: {', '.join(written)}.")
+
+    else:
+        # All dataset flags of the run; each client is built once and shared by its datasets
+        queries = [dataset for dataset, selected in [
+            ('inflation', args.inflation), ('yield', args.yield_curve), ('term_structure', args.term_structure),
+            ('fx', args.exchange_rate), ('euribor', args.euribor), ('eonia', args.eonia),
+        ] if selected]
+
+        # Maturities per dataset: -st/-lt apply to both the yield curve and Euribor unless overridden
+        tenors = {
+            'yield': dict(short_term=args.yield_short or args.shortterm, long_term=args.yield_long or args.longterm),
+            'euribor': dict(short_term=args.euribor_short or args.shortterm, long_term=args.euribor_long or args.longterm),
+        }
+
+        if args.yield_curve or args.euribor:
+            from SeriesRegistry import YIELD_SHORT_TERMS, YIELD_LONG_TERMS, EURIBOR_KEYS
+
+            checks = []
+            if args.yield_curve:
+                checks += [('--yield-short', tenors['yield']['short_term'], YIELD_SHORT_TERMS), ('--yield-long', tenors['yield']['long_term'], YIELD_LONG_TERMS)]
+            if args.euribor:
+                # A long term of 10Y (the default) means no long term for Euribor, see BBKClientClass.euribor_series
+                checks += [('--euribor-short', tenors['euribor']['short_term'], list(EURIBOR_KEYS)), ('--euribor-long', tenors['euribor']['long_term'], list(EURIBOR_KEYS) + ['10Y'])]
+
+            # Checked before anything is fetched, so a combined run does not fail dataset by dataset
+            for option, tenor, valid in checks:
+                if tenor not in valid:
+                    parser.error(f"{tenor} is not a valid {option.strip('-').replace('-', ' ')} maturity (valid: {', '.join(valid)}). Set it with {option} when -st/-lt do not fit every dataset of the run.")
+
+        if queries:
+            from BatchRunner import BatchRunnerClass, DATASETS, report
+
+            ecb_client = bbk_client = None
+
+            if any(DATASETS[dataset][0] == 'ecb' for dataset in queries):
+                from ECBClient import ECBClientClass
+                ecb_client = ECBClientClass(engine, session=transport, headless=args.headless, store=store)
+
+            if any(DATASETS[dataset][0] == 'bbk' for dataset in queries):
+                from BBKClient import BBKClientClass
+                bbk_client = BBKClientClass(engine, session=transport, headless=args.headless, store=store)
+
+            calls = {
+                'inflation': lambda: ecb_client.get_inflation_data(args.begin, args.end, save=args.save),
+                'yield': lambda: ecb_client.get_yield_data(args.spread, args.begin, args.end, save=args.save, **tenors['yield']),
+                'term_structure': lambda: ecb_client.get_term_structure(args.begin, args.end, spreads=args.spreads, save=args.save),
+                'fx': lambda: ecb_client.get_exchange_rate_data(args.currency, args.begin, args.end, save=args.save),
+                'euribor': lambda: bbk_client.get_euribor_data(args.begin, args.end, spread=args.spread, save=args.save, **tenors['euribor']),
+                'eonia': lambda: bbk_client.get_eonia_data(args.begin, args.end, save=args.save),
+            }
+
+            if len(queries) > 1:
+                # The series of all datasets are downloaded together, so independent requests overlap
+                runner = BatchRunnerClass(ecb_client, bbk_client, engine)
+                jobs = [
+                    dict(dataset=dataset, begin=args.begin, end=args.end, spread=args.spread, fx=args.currency, spreads=args.spreads, **tenors.get(dataset, {}))
+                    for dataset in queries
+                ]
+                runner.prefetch(runner.plan(jobs, skip_invalid=True))
 
-    elif args.euribor:
-        bbk_client = BBKClientClass()
-        bbk_client.get_euribor_data(args.begin, args.end, args.shortterm, args.longterm, args.spread)
+            results = {dataset: calls[dataset]() for dataset in queries}
 
-    elif args.eonia:
-        bbk_client = BBKClientClass()
-        bbk_client.get_eonia_data(args.begin, args.end)
\ No newline at end of file
+            if len(queries) > 1:
+                print(report(results).to_string())
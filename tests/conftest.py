@@ -0,0 +1,83 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from Replay import ReplayTransportClass
+
+
+# Synthetic ECB/BBK answers recorded by make_fixtures.py
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+
+class CountingReplayClass(ReplayTransportClass):
+    """
+    ReplayTransportClass that records the URLs it serves and how many of them were in flight at once.
+    `delay` holds every answer back, so concurrent callers overlap.
+    """
+
+    def __init__(self, folder_name=FIXTURES, delay=0):
+        super().__init__(folder_name)
+        self.delay = delay
+        self.urls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+
+    def send(self, request, **kwargs):
+
+        with self.lock:
+            self.urls.append(request.url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        try:
+            time.sleep(self.delay)
+            return super().send(request, **kwargs)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+    def data_urls(self) -> list:
+        return [url for url in self.urls if '/data/' in url]
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # The clients keep their cache and outputs in ./output
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def engine():
+    from FetchEngine import FetchEngineClass
+
+    engine = FetchEngineClass()
+    yield engine
+    engine.shutdown()
+
+
+@pytest.fixture
+def transport():
+    return CountingReplayClass()
+
+
+@pytest.fixture
+def ecb(workdir, engine, transport):
+    from ECBClient import ECBClientClass
+    return ECBClientClass(engine, session=transport, headless=True)
+
+
+@pytest.fixture
+def bbk(workdir, engine, transport):
+    from BBKClient import BBKClientClass
+    return BBKClientClass(engine, session=transport, headless=True)
@@ -0,0 +1,254 @@
+"""
+Writes the fixtures of the test suite to tests/fixtures: the answers of a synthetic ECB/BBK upstream to the
+queries the tests and benchmarks send, recorded through the clients in the FixtureStoreClass layout of
+ReplayTransportClass (see Replay.py). Re-run after changing a query of the tests:
+
+    python tests/make_fixtures.py
+"""
+import contextlib
+import io
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import zlib
+from urllib.parse import urlsplit, parse_qsl
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import pandas as pd
+import requests
+import sdmx
+from sdmx import model
+from sdmx.message import StructureMessage
+
+from Replay import FixtureStoreClass, _response, _without_conditional_headers
+
+
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+# Last observation of the synthetic upstream; the refresh scenarios publish one more week (NEXT_PUBLISHED)
+PUBLISHED = '2024-06-28'
+NEXT_PUBLISHED = '2024-07-05'
+
+# flow -> dimensions in DSD order and the codes of each
+DIMENSIONS = {
+    'ICP': dict(FREQ=['M'], REF_AREA=['U2'], ADJUSTMENT=['Y'], ICP_ITEM=['000000'], STS_INSTITUTION=['4'], ICP_SUFFIX=['INX']),
+    'YC': dict(
+        FREQ=['B'], REF_AREA=['U2'], CURRENCY=['EUR'], PROVIDER_FM=['4F'], INSTRUMENT_FM=['G_N_A'], PROVIDER_FM_ID=['SV_C_YM'],
+        DATA_TYPE_FM=['SR_3M', 'SR_6M', 'SR_9M'] + [f'SR_{years}Y' for years in range(1, 31)],
+    ),
+    'EXR': dict(FREQ=['D'], CURRENCY=['USD', 'GBP', 'CHF', 'JPY'], CURRENCY_DENOM=['EUR'], EXR_TYPE=['SP00'], EXR_SUFFIX=['A']),
+    'BBK01': dict(BBK_ID=['ST0304', 'ST0310', 'ST0316', 'ST0325', 'ST0343']),
+    'BBMMB': dict(BBK_STD_FREQ=['D'], BBK_STD_ID=['EU000A2X2A25'], BBK_STD_SUFFIX=['WT']),
+}
+
+# series key -> first and last day with observations (default: 1999-01-04 to the published day)
+HISTORY = {
+    'ST0304': ('1999-01-04', '2021-12-31'),            # EONIA
+    'D.EU000A2X2A25.WT': ('2019-10-01', None),         # €STR
+    'ST0325': ('2019-01-02', None),                    # full history of the fallback tests
+}
+
+# Keys of sources that answer 400 to period parameters
+NO_PERIODS = {'ST0325'}
+
+
+def value(key, day) -> float:
+    """
+    Deterministic synthetic observation of series `key` on `day`.
+    """
+    return round(zlib.crc32(key.encode()) % 500 / 100 + day.toordinal() % 97 / 100, 4)
+
+
+class SyntheticUpstreamClass(requests.Session):
+    """
+    Answers SDMX data queries with generated SDMX-CSV and dataflow queries with a generated DSD, and saves every
+    answer to a FixtureStoreClass, as RecordingTransportClass does with the live APIs.
+    """
+
+    def __init__(self, folder_name=FIXTURES):
+        super().__init__()
+        self.store = FixtureStoreClass(folder_name)
+        self.published = PUBLISHED
+
+
+    def send(self, request, **kwargs):
+
+        request = _without_conditional_headers(request)
+        segments = urlsplit(request.url).path.strip('/').split('/')
+
+        if 'data' in segments:
+            status, headers, body = self._data(segments[segments.index('data') + 1], segments[segments.index('data') + 2], dict(parse_qsl(urlsplit(request.url).query)))
+        else:
+            status, headers, body = self._structure(segments[segments.index('dataflow') + 2])
+
+        response = _response(request, status, headers, body, stream=False)
+        self.store.save(request, response, body)
+
+        return _response(request, status, headers, body, kwargs.get('stream', False))
+
+
+    def _data(self, flow, key, params):
+
+        dimensions = DIMENSIONS[flow]
+        codes = [code.split('+') if code else dimensions[dimension] for dimension, code in zip(dimensions, key.split('.'))]
+
+        if NO_PERIODS & set(itertools.chain(*codes)) and params.keys() & {'startPeriod', 'endPeriod'}:
+            return 400, {}, b''
+
+        start = params.get('startPeriod', '1999-01-01')
+        end = min(params.get('endPeriod', '2099-12-31'), self.published)
+
+        lines = [','.join(['DATAFLOW'] + list(dimensions) + ['TIME_PERIOD', 'OBS_VALUE'])]
+
+        for series in itertools.product(*codes):
+
+            series_key = '.'.join(series)
+            first, last = HISTORY.get(series_key, ('1999-01-04', None))
+            days = pd.bdate_range(max(start, first), min(end, last or self.published))
+
+            if flow == 'ICP':
+                days = days.to_period('M').unique().to_timestamp()
+
+            if 'lastNObservations' in params:
+                days = days[-int(params['lastNObservations']):]
+
+            for day in days:
+                period = day.strftime('%Y-%m' if flow == 'ICP' else '%Y-%m-%d')
+                lines.append(f'{flow},{",".join(series)},{period},{value(series_key, day)}')
+
+        if len(lines) == 1:
+            # SDMX endpoints answer 404 when a period holds no observations
+            return 404, {}, b''
+
+        return 200, {'Content-Type': 'application/vnd.sdmx.data+csv; version=1.0.0; charset=utf-8'}, '\n'.join(lines).encode()
+
+
+    def _structure(self, flow):
+
+        agency = model.Agency(id='ECB')
+        dsd = model.DataStructureDefinition(id=f'ECB_{flow}1', maintainer=agency, version='1.0', is_final=True)
+
+        for dimension in DIMENSIONS[flow]:
+            dsd.dimensions.getdefault(dimension)
+        dsd.dimensions.getdefault('TIME_PERIOD', cls=model.TimeDimension)
+        dsd.measures.getdefault('OBS_VALUE')
+
+        message = StructureMessage()
+        message.structure[dsd.id] = dsd
+        message.dataflow[flow] = model.DataflowDefinition(id=flow, maintainer=agency, version='1.0', structure=dsd, is_final=True)
+
+        return 200, {'Content-Type': 'application/vnd.sdmx.structure+xml; version=2.1'}, sdmx.to_xml(message)
+
+
+def cache_scenario(ecb, bbk, upstream):
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-01-01', '2020-06-30')
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2019-07-01', '2020-06-30')
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2021-01-01', '2021-06-30')
+
+
+def refresh_scenario(ecb, bbk, upstream):
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2024-01-01', '2099-12-31')
+    upstream.published = NEXT_PUBLISHED
+    bbk.cache.expire('BBK', 'BBK01')
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2024-01-01', '2099-12-31')
+
+
+def fallback_scenario(ecb, bbk, upstream):
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0325', '2020-01-01', '2020-06-30')
+
+
+def batch_scenario(ecb, bbk, upstream):
+    from BatchRunner import BatchRunnerClass
+    BatchRunnerClass(ecb, bbk, bbk.engine).run(BATCH_JOBS)
+
+
+def panel_scenario(ecb, bbk, upstream):
+    from Panel import PanelBuilderClass
+    PanelBuilderClass(ecb, bbk).build(['EURIBOR3M', 'FX_USD', 'HICP'], '2020-01-01', '2020-06-30')
+    PanelBuilderClass(ecb, bbk).build(['FX_*'], '2020-01-01', '2020-06-30')
+
+
+def splice_scenario(ecb, bbk, upstream):
+    bbk.load_eonia_data('2021-12-01', '2022-01-31')
+
+
+def short_window_scenario(ecb, bbk, upstream):
+    bbk.get_euribor_data(short_term='3M', lastNObservations=5)
+    ecb.get_inflation_data('2020-01', '2020-06')
+
+
+def cli_scenario(ecb, bbk, upstream):
+    # init.py -y -eur --yield-short 2Y --euribor-long 12M -b 2020-01-01 -e 2020-06-30
+    from BatchRunner import BatchRunnerClass
+
+    period = dict(begin='2020-01-01', end='2020-06-30', spread=False, fx='USD', spreads=None)
+    runner = BatchRunnerClass(ecb, bbk, bbk.engine)
+    runner.prefetch(runner.plan([dict(period, dataset='yield', short_term='2Y', long_term='10Y'), dict(period, dataset='euribor', short_term='3M', long_term='12M')], skip_invalid=True))
+
+    ecb.get_yield_data(False, '2020-01-01', '2020-06-30', short_term='2Y', long_term='10Y')
+    bbk.get_euribor_data('2020-01-01', '2020-06-30', short_term='3M', long_term='12M', spread=False)
+
+
+def benchmark_scenario(client_name, method, kwargs):
+    # Benchmarks start every round with an empty cache
+    return lambda ecb, bbk, upstream: getattr(dict(ecb=ecb, bbk=bbk)[client_name], method)(**kwargs)
+
+
+BATCH_JOBS = dict(
+    defaults=dict(begin='2020-01-01', end='2020-06-30'),
+    jobs=[
+        dict(dataset='euribor', shortterm='3M', longterm='12M'),
+        dict(dataset='fx', currency=['USD', 'GBP']),
+    ],
+)
+
+# (client, get_* method, arguments) measured by test_benchmarks.py
+BENCHMARK_CALLS = [
+    ('ecb', 'get_inflation_data', dict(startPeriod='2015-01', endPeriod='2022-12')),
+    ('ecb', 'get_yield_data', dict(startPeriod='2022-01', endPeriod='2022-12')),
+    ('ecb', 'get_term_structure', dict(startPeriod='2022-10', endPeriod='2022-12')),
+    ('ecb', 'get_exchange_rate_data', dict(fx='USD', startPeriod='2022-01', endPeriod='2022-12')),
+    ('bbk', 'get_euribor_data', dict(startPeriod='2022-01-01', endPeriod='2022-12-31', long_term='12M')),
+    ('bbk', 'get_eonia_data', dict(startPeriod='2021-07-01', endPeriod='2022-06-30')),
+]
+
+SCENARIOS = [cache_scenario, refresh_scenario, fallback_scenario, batch_scenario, panel_scenario, splice_scenario, short_window_scenario, cli_scenario] + [benchmark_scenario(*call) for call in BENCHMARK_CALLS]
+
+
+def record(scenario):
+    """
+    Runs `scenario(ecb_client, bbk_client, upstream)` with empty caches against the synthetic upstream.
+    """
+    from ECBClient import ECBClientClass
+    from BBKClient import BBKClientClass
+    from FetchEngine import FetchEngineClass
+
+    upstream = SyntheticUpstreamClass()
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                engine = FetchEngineClass()
+                scenario(ECBClientClass(engine, session=upstream, headless=True), BBKClientClass(engine, session=upstream, headless=True), upstream)
+        finally:
+            os.chdir(cwd)
+
+
+def main():
+
+    shutil.rmtree(FIXTURES, ignore_errors=True)
+
+    for scenario in SCENARIOS:
+        record(scenario)
+
+    print(f'{len(os.listdir(FIXTURES)) // 2} responses written to {FIXTURES}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import asyncio
+
+import pandas as pd
+
+from AsyncClients import AsyncBBKClientClass
+from make_fixtures import SyntheticUpstreamClass, PUBLISHED
+
+
+class FakeAsyncTransportClass():
+    """
+    AsyncTransportClass answering from the synthetic upstream of make_fixtures.py, without aiohttp.
+    """
+
+    def __init__(self, folder_name):
+        self.upstream = SyntheticUpstreamClass(folder_name)
+        self.urls = []
+
+
+    async def send(self, request):
+        self.urls.append(request.url)
+        return self.upstream.send(request, stream=True)
+
+
+    async def close(self):
+        pass
+
+
+def run(transport, method, *args, **kwargs):
+
+    async def call():
+        async with AsyncBBKClientClass(transport=transport) as bbk:
+            return await getattr(bbk, method)(*args, **kwargs)
+
+    return asyncio.run(call())
+
+
+def test_last_observations_of_merged_series(workdir):
+
+    transport = FakeAsyncTransportClass(workdir / 'upstream')
+
+    frame = run(transport, 'load_euribor_data', short_term='3M', long_term='12M', lastNObservations=5)
+
+    assert transport.urls == ['https://api.statistiken.bundesbank.de/rest/data/BBK01/ST0316+ST0343?lastNObservations=5']
+    assert len(frame) == 5
+    assert frame.index.max() == pd.Timestamp(PUBLISHED)
+
+
+def test_concurrent_calls_share_planned_requests(workdir):
+
+    transport = FakeAsyncTransportClass(workdir / 'upstream')
+
+    async def calls():
+        async with AsyncBBKClientClass(transport=transport) as bbk:
+            frames = await asyncio.gather(
+                bbk.load_euribor_data('2020-01-01', '2020-06-30', short_term='3M', long_term='12M'),
+                bbk.load_euribor_data('2020-01-01', '2020-06-30', short_term='3M', long_term='12M'),
+            )
+            # Served from the cache
+            frames.append(await bbk.load_euribor_data('2020-02-01', '2020-03-31', short_term='12M'))
+            return frames
+
+    both, again, twelve_months = asyncio.run(calls())
+
+    assert transport.urls == ['https://api.statistiken.bundesbank.de/rest/data/BBK01/ST0316+ST0343?startPeriod=2020-01-01&endPeriod=2020-06-30']
+    assert both.equals(again)
+    assert both.index[0] == pd.Timestamp('2020-01-01')
+    assert twelve_months.index[0] == pd.Timestamp('2020-02-03')
@@ -0,0 +1,93 @@
+import pytest
+
+from BatchRunner import BatchRunnerClass
+from make_fixtures import BATCH_JOBS
+
+
+@pytest.fixture
+def runner(ecb, bbk, engine):
+    return BatchRunnerClass(ecb, bbk, engine)
+
+
+def test_expand_jobs_keeps_tenors_in_one_job(runner):
+
+    jobs = runner.expand_jobs(dict(jobs=[dict(dataset='term_structure', tenors=['2Y', '10Y'], currency=['USD'])]))
+
+    assert len(jobs) == 1
+    assert jobs[0]['tenors'] == '2Y,10Y'
+
+
+def test_expand_jobs_rejects_unknown_dataset(runner):
+
+    with pytest.raises(Exception, match='Invalid dataset'):
+        runner.expand_jobs(dict(jobs=[dict(dataset='gdp')]))
+
+
+def test_plan_merges_series_of_all_jobs(runner):
+
+    plan = runner.plan(runner.expand_jobs(BATCH_JOBS))
+
+    # Euribor 3M and 12M in one BBK request, USD and GBP in one ECB request
+    assert len(plan) == 2
+
+
+def test_plan_raises_on_invalid_job_unless_skipped(runner):
+
+    jobs = runner.expand_jobs(dict(jobs=[dict(dataset='euribor', shortterm='2W'), *BATCH_JOBS['jobs']], defaults=BATCH_JOBS['defaults']))
+
+    with pytest.raises(Exception, match='Invalid short term'):
+        runner.plan(jobs)
+
+    assert len(runner.plan(jobs, skip_invalid=True)) == 2
+
+
+def test_run_fetches_each_series_once(runner, transport):
+
+    summary = runner.run(BATCH_JOBS)
+
+    assert summary['error'].isna().all()
+    assert len(summary) == 3
+    assert sorted(url.split('?')[0].rsplit('/', 1)[1] for url in transport.data_urls()) == ['D.USD+GBP.EUR.SP00.A', 'ST0316+ST0343']
+
+
+def test_run_reports_invalid_job_and_runs_the_others(runner, transport):
+
+    summary = runner.run(dict(BATCH_JOBS, jobs=[dict(dataset='euribor', shortterm='2W', name='bad'), *BATCH_JOBS['jobs']]))
+
+    assert 'Invalid short term' in summary.loc['bad', 'error']
+    assert summary.drop('bad')['error'].isna().all()
+
+
+class FakeRendererClass():
+
+    def __init__(self, max_workers=None):
+        self.pending = []
+        self.running = False
+
+    def submit(self, fig, path, outputs):
+        self.running = True
+        self.pending.append(path)
+
+    def wait(self) -> dict:
+        results, self.pending = {path: [f'{path}.html'] for path in self.pending}, []
+        return results
+
+    def shutdown(self):
+        self.running = False
+
+
+def test_run_shuts_down_only_its_own_renderer(runner, ecb, bbk, engine, transport, monkeypatch):
+
+    import Renderer
+    monkeypatch.setattr(Renderer, 'RendererClass', FakeRendererClass)
+    spec = dict(BATCH_JOBS, jobs=[dict(dataset='fx', currency='USD', save='csv,html')])
+
+    summary = runner.run(spec)
+
+    assert summary['output'].str.endswith('.html').all()
+    assert not runner.renderer.running
+
+    renderer = FakeRendererClass()
+    BatchRunnerClass(ecb, bbk, engine, renderer).run(spec)
+
+    assert renderer.running
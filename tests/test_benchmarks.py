@@ -0,0 +1,89 @@
+"""
+End-to-end latency, parse throughput and peak memory of every get_* method, replayed from the committed
+fixtures with pytest-benchmark. Every round starts with an empty cache:
+
+    python -m pytest tests/test_benchmarks.py --benchmark-only
+"""
+import glob
+import json
+import os
+import tracemalloc
+
+import pandas as pd
+import pytest
+import requests
+
+pytest.importorskip('pytest_benchmark')
+
+import Metrics
+from BBKClient import BBKClientClass
+from ECBClient import ECBClientClass
+from Replay import _response
+from SDMXStream import read_frame
+from conftest import CountingReplayClass, FIXTURES
+from make_fixtures import BENCHMARK_CALLS
+
+
+CLIENTS = dict(ecb=ECBClientClass, bbk=BBKClientClass)
+
+
+@pytest.mark.parametrize('client_name, method, arguments', BENCHMARK_CALLS, ids=[method for _, method, _ in BENCHMARK_CALLS])
+def test_get(benchmark, tmp_path, monkeypatch, engine, client_name, method, arguments):
+
+    transport = CountingReplayClass()
+    rounds = []
+    monkeypatch.setattr(Metrics.METRICS, 'jsonl_path', str(tmp_path / 'metrics.jsonl'))
+
+    def setup():
+        rounds.append(tmp_path / f'round{len(rounds)}')
+        rounds[-1].mkdir()
+        monkeypatch.chdir(rounds[-1])
+        return (CLIENTS[client_name](engine, session=transport, headless=True),), {}
+
+    def call(client):
+        return getattr(client, method)(**arguments)
+
+    result = benchmark.pedantic(call, setup=setup, rounds=5)
+
+    # get_* methods return the traceback of a failure instead of raising
+    assert isinstance(result, pd.DataFrame) and not result.empty
+
+    with open(tmp_path / 'metrics.jsonl') as f:
+        record = json.loads(f.readlines()[-1])
+
+    # Memory in a separate run, tracemalloc slows down parsing considerably
+    (client,), _ = setup()
+    tracemalloc.start()
+    call(client)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    parse_s = record['stages_s'].get('parse', 0) + record['stages_s'].get('to_pandas', 0)
+    bytes_received = record['counters'].get('bytes_received', 0)
+
+    benchmark.extra_info.update(
+        observations=int(result.count().sum()),
+        bytes=bytes_received,
+        parse_mb_s=round(bytes_received / 2**20 / parse_s, 1) if parse_s else None,
+        peak_mb=round(peak / 2**20, 2),
+    )
+
+
+def test_read_frame(benchmark):
+
+    # The largest fixture: all tenors of the term structure
+    path = max(glob.glob(os.path.join(FIXTURES, 'YC_*.body')), key=os.path.getsize)
+
+    with open(path, 'rb') as f:
+        body = f.read()
+    with open(f'{path[:-len(".body")]}.json') as f:
+        meta = json.load(f)
+
+    def setup():
+        request = requests.Request('GET', meta['url']).prepare()
+        return (_response(request, meta['status'], meta['headers'], body, stream=True),), {}
+
+    frame = benchmark.pedantic(read_frame, setup=setup, rounds=20)
+
+    assert frame.shape[1] == 33
+    benchmark.extra_info.update(bytes=len(body), observations=int(frame.count().sum()))
@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+
+from make_fixtures import PUBLISHED
+
+
+def test_get_euribor_data_with_few_last_observations(bbk, transport):
+
+    frame = bbk.get_euribor_data(short_term='3M', lastNObservations=5)
+
+    assert isinstance(frame, pd.DataFrame)
+    assert len(frame) == 5
+    assert frame.index[-1] == pd.Timestamp(PUBLISHED)
+
+
+def test_get_inflation_data_for_less_than_a_year(ecb, transport):
+
+    frame = ecb.get_inflation_data('2020-01', '2020-06')
+
+    assert isinstance(frame, pd.DataFrame)
+    assert len(frame) == 6
+    assert frame['HICP_ann_delta'].isna().all()
+
+
+def test_metrics_are_only_written_when_configured(ecb, transport, workdir, monkeypatch):
+
+    import Metrics
+
+    ecb.load_inflation_data('2020-01', '2020-06')
+    assert not (workdir / 'output' / 'metrics.jsonl').exists()
+
+    monkeypatch.setattr(Metrics.METRICS, 'jsonl_path', str(workdir / 'metrics.jsonl'))
+    ecb.load_inflation_data('2020-01', '2020-06')
+
+    with open(workdir / 'metrics.jsonl') as f:
+        assert [json.loads(line)['call'] for line in f] == ['load_inflation_data']
@@ -0,0 +1,31 @@
+import os
+import subprocess
+import sys
+
+from conftest import FIXTURES
+
+INIT = os.path.join(os.path.dirname(FIXTURES), os.pardir, 'init.py')
+
+
+def run(workdir, *args):
+    return subprocess.run([sys.executable, INIT, *args, '--headless'], cwd=workdir, capture_output=True, text=True)
+
+
+def test_shared_tenors_invalid_for_one_dataset_are_rejected(workdir):
+
+    result = run(workdir, '-fx', '-c', 'USD', '-eur', '-y', '-st', '2Y', '-lt', '10Y')
+
+    assert result.returncode == 2
+    assert '--euribor-short' in result.stderr
+    # Rejected before any client was built
+    assert not os.path.exists(workdir / 'output')
+
+
+def test_per_dataset_tenors_in_one_run(workdir):
+
+    result = run(workdir, '-y', '-eur', '--yield-short', '2Y', '--euribor-long', '12M', '-b', '2020-01-01', '-e', '2020-06-30', '--replay', FIXTURES)
+
+    assert result.returncode == 0, result.stderr
+    report = result.stdout.splitlines()[-2:]
+    assert report[0].startswith('yield') and '2Y:' in report[0] and report[0].endswith('None')
+    assert report[1].startswith('euribor') and 'EURIBOR12M:' in report[1] and report[1].endswith('None')
@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from OutputWriter import OutputWriterClass, read_parquet_dataset
+
+
+def frame(start, end, offset=0.0):
+    index = pd.bdate_range(start, end, name='TIME_PERIOD')
+    return pd.DataFrame({'EURIBOR3M': np.arange(len(index), dtype='float64') + offset}, index=index)
+
+
+def partitions(root) -> dict:
+    return {
+        os.path.relpath(os.path.join(folder, name), root): os.stat(os.path.join(folder, name)).st_mtime_ns
+        for folder, _, names in os.walk(root) for name in names
+    }
+
+
+def test_parquet_rewrites_only_changed_partitions(workdir):
+
+    pytest.importorskip('pyarrow')
+
+    writer = OutputWriterClass()
+    history = frame('2020-01-01', '2022-12-30')
+    root = writer.write(history, {'parquet'}, str(workdir / 'EURIBOR3M_2020'), 'EURIBOR3M')[0]
+
+    # Backdate the partitions, so a rewrite shows in their mtime
+    for name in partitions(root):
+        os.utime(os.path.join(root, name), ns=(0, 0))
+
+    # Daily refresh: the whole history again, one revised 2022 observation and a new year
+    refresh = pd.concat([history, frame('2023-01-02', '2023-01-06', offset=1000.0)])
+    refresh.loc['2022-12-30', 'EURIBOR3M'] = -1.0
+    writer.write(refresh, {'parquet'}, str(workdir / 'EURIBOR3M_2023'), 'EURIBOR3M')
+
+    mtimes = partitions(root)
+
+    assert mtimes[os.path.join('series=EURIBOR3M', 'year=2020', 'data.parquet')] == 0
+    assert mtimes[os.path.join('series=EURIBOR3M', 'year=2021', 'data.parquet')] == 0
+    assert mtimes[os.path.join('series=EURIBOR3M', 'year=2022', 'data.parquet')] != 0
+    assert mtimes[os.path.join('series=EURIBOR3M', 'year=2023', 'data.parquet')] != 0
+
+    stored = read_parquet_dataset(root)
+
+    assert len(stored) == len(refresh)
+    assert stored.loc['2022-12-30', 'EURIBOR3M'] == -1.0
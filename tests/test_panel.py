@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from BatchRunner import BatchRunnerClass
+from Panel import align, PanelBuilderClass
+from make_fixtures import value, BATCH_JOBS
+
+
+def frame(column, dates, values):
+    return pd.DataFrame({column: values}, index=pd.DatetimeIndex(pd.to_datetime(dates), name='TIME_PERIOD'))
+
+
+def test_align_places_columns_on_union_of_dates():
+
+    daily = frame('A', ['2024-01-02', '2024-01-03', '2024-01-05'], [1.0, 2.0, 3.0])
+    other = frame('B', ['2024-01-03', '2024-01-04'], [10.0, 20.0])
+
+    panel = align([daily, other], frequency='D', fill='none')
+
+    assert list(panel.columns) == ['A', 'B']
+    assert list(panel.index) == list(pd.date_range('2024-01-02', '2024-01-05'))
+    assert np.isnan(panel.loc['2024-01-04', 'A'])
+    assert panel.loc['2024-01-04', 'B'] == 20.0
+
+
+def test_align_ffill_respects_limit():
+
+    monthly = frame('M', ['2024-01-31', '2024-04-30'], [1.0, 4.0])
+
+    panel = align([monthly], frequency='M', fill='ffill', limit=1)
+
+    assert list(panel['M'].isna()) == [False, False, True, False]
+
+
+def test_align_monthly_takes_last_observation():
+
+    daily = frame('A', pd.bdate_range('2024-01-01', '2024-02-29'), np.arange(44, dtype='float64'))
+
+    panel = align([daily], frequency='M')
+
+    assert list(panel['A']) == [22.0, 43.0]
+
+
+def test_align_business_days_skip_target_holidays():
+
+    daily = frame('A', pd.date_range('2023-12-22', '2024-01-03'), np.arange(13, dtype='float64'))
+
+    panel = align([daily], frequency='B')
+
+    assert pd.Timestamp('2023-12-25') not in panel.index
+    assert pd.Timestamp('2024-01-01') not in panel.index
+    assert pd.Timestamp('2023-12-27') in panel.index
+
+
+def test_align_rejects_duplicate_columns():
+
+    with pytest.raises(Exception, match='Duplicate panel columns'):
+        align([frame('A', ['2024-01-02'], [1.0]), frame('A', ['2024-01-03'], [2.0])])
+
+
+def test_build_aligns_sources_and_frequencies(ecb, bbk, transport):
+
+    panel = PanelBuilderClass(ecb, bbk).build(['EURIBOR3M', 'FX_USD', 'HICP'], '2020-01-01', '2020-06-30')
+
+    assert list(panel.columns) == ['EURIBOR3M', 'FX_USD', 'HICP']
+    assert panel.index[0] == pd.Timestamp('2020-01-02')
+    assert panel.index[-1] == pd.Timestamp('2020-06-30')
+    assert panel.loc['2020-03-02', 'EURIBOR3M'] == value('ST0316', pd.Timestamp('2020-03-02'))
+    # The monthly HICP is carried forward through the month
+    assert panel.loc['2020-03-31', 'HICP'] == value('M.U2.Y.000000.4.INX', pd.Timestamp('2020-03-01'))
+
+
+def test_build_names_wildcard_members(ecb, bbk, transport):
+
+    panel = PanelBuilderClass(ecb, bbk).build(['FX_*'], '2020-01-01', '2020-06-30')
+
+    assert transport.data_urls() == ['https://sdw-wsrest.ecb.europa.eu/service/data/EXR/D..EUR.SP00.A?startPeriod=2020-01-01&endPeriod=2020-06-30']
+    assert sorted(panel.columns) == ['FX_CHF', 'FX_GBP', 'FX_JPY', 'FX_USD']
+
+
+def test_build_after_batch_is_served_from_the_cache(ecb, bbk, engine, transport):
+
+    BatchRunnerClass(ecb, bbk, engine).run(BATCH_JOBS)
+    urls = len(transport.data_urls())
+
+    panel = PanelBuilderClass(ecb, bbk).build(['EURIBOR3M', 'EURIBOR12M', 'FX_USD', 'FX_GBP'], '2020-01-01', '2020-06-30')
+
+    assert len(transport.data_urls()) == urls
+    assert not panel.isna().all().any()
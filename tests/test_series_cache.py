@@ -0,0 +1,109 @@
+import threading
+
+import pandas as pd
+
+from make_fixtures import value, PUBLISHED, NEXT_PUBLISHED
+
+
+def test_get_downloads_only_uncovered_periods(bbk, transport):
+
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-01-01', '2020-06-30')
+
+    assert len(transport.data_urls()) == 1
+    assert frame.index[0] == pd.Timestamp('2020-01-01')
+    assert frame.index[-1] == pd.Timestamp('2020-06-30')
+    assert frame.iloc[0, 0] == value('ST0316', pd.Timestamp('2020-01-01'))
+
+    # Covered: served from the store, also for a sub-period
+    assert bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-01-01', '2020-06-30').equals(frame)
+    assert len(bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-02', '2020-03')) == 42
+    assert len(transport.data_urls()) == 1
+
+    # Only the uncovered half year before the coverage is requested
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2019-07-01', '2020-06-30')
+
+    assert transport.data_urls()[-1].endswith('ST0316?startPeriod=2019-07-01&endPeriod=2020-01-01')
+    assert frame.index[0] == pd.Timestamp('2019-07-01')
+    assert frame.index.is_unique
+
+
+def test_get_after_expire_requests_new_prints(bbk, transport):
+
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2024-01-01', '2099-12-31')
+    assert frame.index[-1] == pd.Timestamp(PUBLISHED)
+
+    # Checked within max_age: no request
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2024-01-01', '2099-12-31')
+    assert len(transport.data_urls()) == 1
+
+    # After a release: from the last cached day on
+    bbk.cache.expire('BBK', 'BBK01')
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2024-01-01', '2099-12-31')
+
+    assert transport.data_urls()[-1].endswith(f'ST0316?startPeriod={PUBLISHED}&endPeriod=2099-12-31')
+    assert frame.index[-1] == pd.Timestamp(NEXT_PUBLISHED)
+    assert frame.index[0] == pd.Timestamp('2024-01-01')
+    assert frame.index.is_unique
+
+
+def test_rejected_period_parameters_fall_back_to_full_history(bbk, transport):
+
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0325', '2020-01-01', '2020-06-30')
+
+    # 400 with period parameters, then the whole history without them
+    assert len(transport.data_urls()) == 2
+    assert ('BBK', 'startPeriod') in bbk.cache.unsupported_params
+    assert frame.index[0] == pd.Timestamp('2020-01-01')
+    assert frame.index[-1] == pd.Timestamp('2020-06-30')
+
+    # The stored history serves every other period
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0325', '2019-01-01', '2019-12-31')
+
+    assert len(transport.data_urls()) == 2
+    assert frame.index[0] == pd.Timestamp('2019-01-02')
+    assert frame.index[-1] == pd.Timestamp('2019-12-31')
+
+
+def test_concurrent_identical_gets_share_one_request(bbk, transport):
+
+    transport.delay = 0.2
+    frames = []
+
+    def get():
+        frames.append(bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-01-01', '2020-06-30'))
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(transport.data_urls()) == 1
+    assert len(frames) == 4
+    assert all(frame.equals(frames[0]) for frame in frames)
+    # Every caller gets its own frame
+    assert len({id(frame) for frame in frames}) == 4
+
+
+def test_later_period_extends_coverage_from_its_end(bbk, transport):
+
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-01-01', '2020-06-30')
+
+    # Coverage stays one period: the gap up to 2021H1 is requested along with it
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2021-01-01', '2021-06-30')
+
+    assert len(transport.data_urls()) == 2
+    assert transport.data_urls()[-1].endswith('ST0316?startPeriod=2020-06-30&endPeriod=2021-06-30')
+
+
+def test_merged_download_stores_each_member(bbk, transport):
+
+    bbk.registry.fetch(bbk.cache, bbk.ecb, bbk.engine, ['EURIBOR3M', 'EURIBOR12M'], '2020-01-01', '2020-06-30')
+
+    assert transport.data_urls() == ['https://api.statistiken.bundesbank.de/rest/data/BBK01/ST0316+ST0343?startPeriod=2020-01-01&endPeriod=2020-06-30']
+
+    frame = bbk.cache.get(bbk.ecb, 'BBK01', 'ST0343', '2020-01-01', '2020-06-30')
+
+    assert len(transport.data_urls()) == 1
+    assert list(frame.columns) == ['ST0343']
+    assert frame.iloc[-1, 0] == value('ST0343', pd.Timestamp('2020-06-30'))
@@ -0,0 +1,29 @@
+from SeriesRegistry import SeriesRegistryClass
+
+
+def test_plan_merges_series_of_one_dataflow():
+
+    plan = SeriesRegistryClass().plan(['EURIBOR3M', 'EURIBOR12M', 'FX_USD', 'FX_GBP'])
+
+    assert [(request['flow'], request['key'], request['series']) for request in plan] == [
+        ('BBK01', 'ST0316+ST0343', ['EURIBOR3M', 'EURIBOR12M']),
+        ('EXR', 'D.USD+GBP.EUR.SP00.A', ['FX_USD', 'FX_GBP']),
+    ]
+
+
+def test_plan_wildcard_absorbs_contained_series():
+
+    plan = SeriesRegistryClass().plan(['FX_*', 'FX_USD'])
+
+    assert len(plan) == 1
+    assert plan[0]['key'] == 'D..EUR.SP00.A'
+    assert plan[0]['series'] == ['FX_*', 'FX_USD']
+
+
+def test_plan_missing_leaves_out_cached_series(bbk, transport):
+
+    bbk.cache.get(bbk.ecb, 'BBK01', 'ST0316', '2020-01-01', '2020-06-30')
+
+    plan = bbk.registry.plan_missing(bbk.cache, bbk.ecb, ['EURIBOR3M', 'EURIBOR12M'], '2020-01-01', '2020-06-30')
+
+    assert [request['key'] for request in plan] == ['ST0343']
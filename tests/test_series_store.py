@@ -0,0 +1,91 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from SeriesStore import SeriesStoreClass
+
+
+def series(start, end, column='ST0316', offset=0.0):
+    index = pd.bdate_range(start, end, name='TIME_PERIOD')
+    return pd.DataFrame({column: np.arange(len(index), dtype='float64') + offset}, index=index)
+
+
+@pytest.fixture
+def store(workdir):
+    return SeriesStoreClass('series_store')
+
+
+def test_get_returns_stored_period(store):
+
+    frame = series('2020-01-01', '2020-06-30')
+    store.put('EURIBOR3M', frame, '2020-01-01', '2020-06-30', 'BBK', 'BBK01')
+
+    stored = store.get('EURIBOR3M', '2020-02-01', '2020-02-29')
+
+    pd.testing.assert_frame_equal(stored, frame.loc['2020-02-01':'2020-02-29'], check_freq=False)
+
+
+def test_get_outside_stored_period_misses(store):
+
+    store.put('EURIBOR3M', series('2020-01-01', '2020-06-30'), '2020-01-01', '2020-06-30', 'BBK', 'BBK01')
+
+    assert store.get('EURIBOR3M', '2019-12-01', '2020-06-30') is None
+    assert store.get('EURIBOR3M', '2020-01-01', '2020-07-31') is None
+    assert store.get('EURIBOR12M', '2020-01-01', '2020-06-30') is None
+
+
+def test_get_returns_read_only_views(store):
+
+    store.put('EURIBOR3M', series('2020-01-01', '2020-06-30'), '2020-01-01', '2020-06-30', 'BBK', 'BBK01')
+    stored = store.get('EURIBOR3M', '2020-01-01', '2020-06-30')
+
+    with pytest.raises(ValueError):
+        stored.to_numpy()[0, 0] = 1.0
+
+
+def test_put_merges_touching_periods(store):
+
+    store.put('EURIBOR3M', series('2020-01-01', '2020-06-30'), '2020-01-01', '2020-06-30', 'BBK', 'BBK01')
+    store.put('EURIBOR3M', series('2020-06-01', '2020-12-31', offset=100.0), '2020-06-01', '2020-12-31', 'BBK', 'BBK01')
+
+    stored = store.get('EURIBOR3M', '2020-01-01', '2020-12-31')
+
+    assert stored.index[0] == pd.Timestamp('2020-01-01')
+    assert stored.index[-1] == pd.Timestamp('2020-12-31')
+    assert stored.index.is_unique
+    # The newer observations win where the periods overlap
+    assert stored.loc['2020-05-29', 'ST0316'] == series('2020-01-01', '2020-06-30').loc['2020-05-29', 'ST0316']
+    assert stored.loc['2020-06-01', 'ST0316'] == 100.0
+
+
+def test_put_replaces_disjoint_period(store):
+
+    store.put('EURIBOR3M', series('2020-01-01', '2020-06-30'), '2020-01-01', '2020-06-30', 'BBK', 'BBK01')
+    store.put('EURIBOR3M', series('2022-01-01', '2022-06-30'), '2022-01-01', '2022-06-30', 'BBK', 'BBK01')
+
+    assert store.get('EURIBOR3M', '2020-01-01', '2020-06-30') is None
+    assert store.get('EURIBOR3M', '2022-01-01', '2022-06-30') is not None
+
+
+def test_put_merges_stale_period(store):
+
+    store.put('EURIBOR3M', series('1999-01-01', '2024-06-28'), '1999-01-01', '2099-12-31', 'BBK', 'BBK01')
+
+    # Published again since: stale for periods reaching the present, but still merged by the next put
+    path = store._path('EURIBOR3M')
+    with open(f'{path}.json') as f:
+        pointer = json.load(f)
+    pointer['checked'] = time.time() - 30 * 86400
+    with open(f'{path}.json', 'w') as f:
+        json.dump(pointer, f)
+
+    assert store.get('EURIBOR3M', '2024-01-01', '2099-12-31') is None
+
+    store.put('EURIBOR3M', series('2024-06-28', '2024-07-05', offset=100.0), '2024-06-28', '2099-12-31', 'BBK', 'BBK01')
+    stored = store.get('EURIBOR3M', '1999-01-01', '2099-12-31')
+
+    assert stored.index[0] == pd.Timestamp('1999-01-01')
+    assert stored.index[-1] == pd.Timestamp('2024-07-05')
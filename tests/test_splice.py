@@ -0,0 +1,36 @@
+import pandas as pd
+
+from make_fixtures import value
+
+
+def test_splice_switches_from_eonia_to_estr(bbk, transport):
+
+    frame = bbk.load_eonia_data('2021-12-01', '2022-01-31')
+
+    assert list(frame.columns) == ['EONIA_ESTR']
+    assert frame.index.is_unique and frame.index.is_monotonic_increasing
+    assert frame.index[0] == pd.Timestamp('2021-12-01')
+    assert frame.index[-1] == pd.Timestamp('2022-01-31')
+
+    # EONIA up to its last day, €STR from the next day on
+    assert frame.loc['2021-12-31', 'EONIA_ESTR'] == value('ST0304', pd.Timestamp('2021-12-31'))
+    assert frame.loc['2022-01-03', 'EONIA_ESTR'] == value('D.EU000A2X2A25.WT', pd.Timestamp('2022-01-03'))
+
+
+def test_cold_splice_fetches_segments_concurrently(bbk, transport):
+
+    transport.delay = 0.2
+    bbk.load_eonia_data('2021-12-01', '2022-01-31')
+
+    assert len(transport.data_urls()) == 2
+    assert transport.max_in_flight == 2
+
+
+def test_spliced_series_is_served_from_the_cache(bbk, transport):
+
+    frame = bbk.load_eonia_data('2021-12-01', '2022-01-31')
+    urls = len(transport.data_urls())
+
+    assert bbk.load_eonia_data('2021-12-01', '2022-01-31').equals(frame)
+    assert bbk.load_eonia_data('2021-12-15', '2022-01-15').equals(frame.loc['2021-12-15':'2022-01-15'])
+    assert len(transport.data_urls()) == urls